@@ -9,7 +9,10 @@ set -e
 APP_DIR="/opt/nongji_app"
 VENV_DIR="$APP_DIR/.venv"
 GUNICORN_BIND="0.0.0.0:8062"
-GUNICORN_WORKERS=4
+# worker数、线程数、超时等在 gunicorn.conf.py 中按CPU核数计算，可通过 GUNICORN_* 环境变量覆盖
+GUNICORN_CONF="$APP_DIR/gunicorn.conf.py"
+# 运行模式：wsgi（同步worker）或 asgi（uvicorn worker，OCR等待期间不占用worker）
+SERVER_MODE="${SERVER_MODE:-wsgi}"
 LOG_FILE="$APP_DIR/gunicorn.log"
 PID_FILE="$APP_DIR/gunicorn.pid"
 
@@ -45,8 +48,13 @@ install_dependencies() {
     fi
     
     # 使用国内镜像同步依赖（uv sync 自动管理虚拟环境）
+    # perf：orjson/msgpack，未安装时JSON渲染回退到标准库、MessagePack不可用
     export UV_INDEX_URL="https://pypi.tuna.tsinghua.edu.cn/simple/"
-    uv sync --frozen
+    if [ "$SERVER_MODE" = "asgi" ]; then
+        uv sync --frozen --extra perf --extra asgi
+    else
+        uv sync --frozen --extra perf
+    fi
     log_info "依赖安装完成!"
 }
 
@@ -68,16 +76,19 @@ apply_migrations() {
 
 # 杀掉旧进程
 kill_old_process() {
-    log_info "检查并杀掉旧的Gunicorn进程..."
+    log_info "检查并停止旧的Gunicorn进程..."
     
-    # 通过PID文件杀进程
+    # 通过PID文件停止进程（TERM：等待处理中的请求完成后退出）
     if [ -f "$PID_FILE" ]; then
         OLD_PID=$(cat "$PID_FILE")
         if kill -0 "$OLD_PID" 2>/dev/null; then
-            log_info "杀掉PID为 $OLD_PID 的进程..."
-            kill "$OLD_PID" 2>/dev/null || true
-            sleep 2
-            # 如果还没死，强制杀
+            log_info "停止PID为 $OLD_PID 的进程..."
+            kill -TERM "$OLD_PID" 2>/dev/null || true
+            for _ in $(seq 1 30); do
+                kill -0 "$OLD_PID" 2>/dev/null || break
+                sleep 1
+            done
+            # 如果还没退出，强制杀
             kill -9 "$OLD_PID" 2>/dev/null || true
         fi
         rm -f "$PID_FILE"
@@ -92,25 +103,39 @@ kill_old_process() {
     fi
     
     # 杀掉所有gunicorn进程 (与本项目相关的)
-    pkill -f "gunicorn.*config.wsgi" 2>/dev/null || true
+    pkill -f "gunicorn.*config.(wsgi|asgi)" 2>/dev/null || true
     
     log_info "旧进程清理完成!"
 }
 
+# 收集静态文件
+collect_static() {
+    log_info "收集静态文件..."
+    cd "$APP_DIR"
+    uv run python manage.py collectstatic --noinput
+}
+
 # 启动服务器
 start_server() {
     log_info "启动Gunicorn服务器..."
     cd "$APP_DIR"
     
-    # 收集静态文件
-    log_info "收集静态文件..."
-    uv run python manage.py collectstatic --noinput
+    collect_static
+    
+    # ASGI 模式使用 uvicorn worker 运行 config.asgi
+    if [ "$SERVER_MODE" = "asgi" ]; then
+        APP_MODULE="config.asgi:application"
+        WORKER_ARGS="--worker-class uvicorn.workers.UvicornWorker"
+    else
+        APP_MODULE="config.wsgi:application"
+        WORKER_ARGS=""
+    fi
+    log_info "运行模式: $SERVER_MODE"
     
     # 启动gunicorn (--daemon 自动后台运行)
-    uv run gunicorn config.wsgi:application \
+    uv run gunicorn "$APP_MODULE" $WORKER_ARGS \
+        --config "$GUNICORN_CONF" \
         --bind "$GUNICORN_BIND" \
-        --workers "$GUNICORN_WORKERS" \
-        --timeout 120 \
         --access-logfile "$APP_DIR/access.log" \
         --error-logfile "$LOG_FILE" \
         --pid "$PID_FILE" \
@@ -128,6 +153,54 @@ start_server() {
     fi
 }
 
+# 平滑重载：USR2 启动加载新代码的新主进程（与旧主进程共用监听端口），
+# 新主进程就绪后向旧主进程发送 TERM，旧 worker 处理完当前请求后退出，期间不中断服务
+reload_server() {
+    if [ ! -f "$PID_FILE" ] || ! kill -0 $(cat "$PID_FILE") 2>/dev/null; then
+        log_warn "Gunicorn未运行，直接启动"
+        start_server
+        return
+    fi
+    
+    OLD_PID=$(cat "$PID_FILE")
+    collect_static
+    
+    log_info "平滑重载: 向旧主进程 $OLD_PID 发送 USR2..."
+    kill -USR2 "$OLD_PID"
+    
+    # 新主进程在旧主进程退出前将PID写入 $PID_FILE.2
+    NEW_PID=""
+    for _ in $(seq 1 30); do
+        sleep 1
+        if [ -f "$PID_FILE.2" ]; then
+            CANDIDATE=$(cat "$PID_FILE.2")
+            if kill -0 "$CANDIDATE" 2>/dev/null; then
+                NEW_PID="$CANDIDATE"
+                break
+            fi
+        fi
+    done
+    
+    if [ -z "$NEW_PID" ]; then
+        log_error "新主进程启动失败，旧进程继续提供服务，请检查日志: $LOG_FILE"
+        return 1
+    fi
+    
+    # 留出新 worker 启动时间后再停止旧主进程
+    sleep 3
+    log_info "新主进程 $NEW_PID 已就绪，停止旧主进程 $OLD_PID..."
+    kill -TERM "$OLD_PID" 2>/dev/null || true
+    
+    # 旧主进程退出后新主进程接管PID文件
+    for _ in $(seq 1 60); do
+        if [ "$(cat "$PID_FILE" 2>/dev/null)" = "$NEW_PID" ]; then
+            break
+        fi
+        sleep 1
+    done
+    log_info "平滑重载完成! PID: $NEW_PID"
+}
+
 # 主函数
 main() {
     log_info "========== 开始部署 =========="
@@ -139,8 +212,7 @@ main() {
     install_dependencies
     make_migrations
     apply_migrations
-    kill_old_process
-    start_server
+    reload_server
     
     echo ""
     log_info "========== 部署完成 =========="
@@ -157,7 +229,8 @@ show_help() {
     echo "  (无参数)    执行完整部署流程"
     echo "  start       仅启动服务"
     echo "  stop        仅停止服务"
-    echo "  restart     重启服务"
+    echo "  restart     重启服务（停止后重新启动，有短暂中断）"
+    echo "  reload      平滑重载（加载新代码，不中断服务）"
     echo "  status      查看服务状态"
     echo "  logs        查看日志"
     echo "  help        显示帮助"
@@ -193,6 +266,9 @@ case "${1:-}" in
         kill_old_process
         start_server
         ;;
+    reload)
+        reload_server
+        ;;
     status)
         show_status
         ;;
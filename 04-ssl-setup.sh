@@ -149,10 +149,11 @@ server {
         add_header Cache-Control "public, immutable";
     }
 
-    # 媒体文件
-    location /media/ {
+    # 媒体文件：/media/ 由后端校验权限后通过 X-Accel-Redirect 转到此内部路径
+    # 需在 .env 中配置 MEDIA_ACCEL_REDIRECT_PREFIX=/protected-media/
+    location /protected-media/ {
+        internal;
         alias /opt/nongji_app/media/;
-        expires 7d;
     }
 }
 EOF
@@ -1,22 +1,123 @@
-from django.contrib import admin
-from django.urls import path
+import asyncio
+import hashlib
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.auth.views import redirect_to_login
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.urls import path, reverse
 from django.http import JsonResponse, HttpResponse
+from django.utils import timezone
+from django.utils.cache import add_never_cache_headers
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 from urllib.parse import quote
-from .models import InspectionRecord
-from .services import OCRService, WordExportService
+from .models import InspectionRecord, ArchivedInspectionRecord, InspectionDailyStat, Vehicle
+from .services import OCRService, WordExportService, InspectionArchiveService
+
+
+def admin_scaling_mode():
+    """
+    大表模式：缓存总数、按月份/类型筛选读取统计表、走索引的搜索。
+    每次请求读取配置，override_settings 可切换
+    """
+    return getattr(settings, 'INSPECTION_ADMIN_SCALING_MODE', True)
+
+# 大表模式下缓存的有效期（秒）
+ADMIN_COUNT_CACHE_TIMEOUT = 60
+ADMIN_FILTER_CACHE_TIMEOUT = 600
+
+
+class CachedCountPaginator(Paginator):
+    """总数缓存一段时间的分页器，相同筛选条件不重复执行 COUNT(*)"""
+    
+    @cached_property
+    def count(self):
+        try:
+            sql = str(self.object_list.query)
+        except Exception:
+            return super().count
+        key = 'admin:count:' + hashlib.md5(sql.encode('utf-8')).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, ADMIN_COUNT_CACHE_TIMEOUT)
+        return count
+
+
+def _stat_queryset(request):
+    """当前用户可见的每日统计"""
+    stats = InspectionDailyStat.objects.all()
+    if not request.user.is_superuser:
+        stats = stats.filter(inspector=request.user)
+    return stats
+
+
+class CreatedMonthFilter(admin.SimpleListFilter):
+    """按月份筛选，月份列表读取每日统计表并缓存，代替 date_hierarchy 的 DISTINCT 查询"""
+    title = '创建月份'
+    parameter_name = 'created_month'
+    
+    def lookups(self, request, model_admin):
+        key = f'admin:months:{request.user.pk if not request.user.is_superuser else "all"}'
+        months = cache.get(key)
+        if months is None:
+            months = [d.strftime('%Y-%m') for d in _stat_queryset(request).dates('date', 'month', order='DESC')]
+            cache.set(key, months, ADMIN_FILTER_CACHE_TIMEOUT)
+        return [(month, month) for month in months]
+    
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        try:
+            start = datetime.strptime(self.value(), '%Y-%m')
+        except ValueError:
+            return queryset.none()
+        end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+        tz = timezone.get_current_timezone()
+        return queryset.filter(
+            created_at__gte=timezone.make_aware(start, tz),
+            created_at__lt=timezone.make_aware(end, tz)
+        )
+
+
+class VehicleTypeFilter(admin.SimpleListFilter):
+    """按类型筛选，类型列表读取每日统计表并缓存，避免对检验记录表 DISTINCT 扫描"""
+    title = '类型'
+    parameter_name = 'vehicle_type'
+    
+    def lookups(self, request, model_admin):
+        key = f'admin:vehicle_types:{request.user.pk if not request.user.is_superuser else "all"}'
+        types = cache.get(key)
+        if types is None:
+            types = list(
+                _stat_queryset(request).exclude(vehicle_type='')
+                .order_by('vehicle_type').values_list('vehicle_type', flat=True).distinct()
+            )
+            cache.set(key, types, ADMIN_FILTER_CACHE_TIMEOUT)
+        return [(t, t) for t in types]
+    
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(vehicle_type=self.value())
+        return queryset
 
 
 @admin.register(InspectionRecord)
 class InspectionRecordAdmin(admin.ModelAdmin):
     list_display = ['id', 'license_plate_number', 'owner', 'vehicle_type', 'brand', 'created_by', 'created_at', 'export_link']
-    list_filter = ['vehicle_type', 'created_at']
+    list_select_related = ['created_by']
     search_fields = ['license_plate_number', 'owner', 'chassis_number', 'engine_number']
     readonly_fields = ['created_at', 'updated_at', 'created_by', 'ocr_button']
-    date_hierarchy = 'created_at'
     actions = ['export_selected_records']
     
+    list_filter = ['vehicle_type', 'created_at']
+    
     class Media:
         js = ('admin/js/ocr_recognize.js',)
     
@@ -102,15 +203,18 @@ class InspectionRecordAdmin(admin.ModelAdmin):
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
-            path('ocr-recognize/', self.admin_site.admin_view(self.ocr_recognize_view), name='inspection_ocr_recognize'),
+            # 异步视图不能使用 admin_view 包装（Django 4.2 的 admin_view 只支持同步视图），登录校验在视图内完成
+            path('ocr-recognize/', self.ocr_recognize_view, name='inspection_ocr_recognize'),
             path('export/<int:pk>/', self.admin_site.admin_view(self.export_single_view), name='inspection_export_single'),
         ]
         return custom_urls + urls
     
     def export_single_view(self, request, pk):
-        """导出单条检验记录为Word文档"""
+        """导出单条检验记录为Word文档（含已归档记录）"""
         try:
-            record = InspectionRecord.objects.get(pk=pk)
+            record = InspectionArchiveService.get(pk)
+            if record is None:
+                return HttpResponse('记录不存在', status=404)
             # 检查权限
             if not request.user.is_superuser and record.created_by != request.user:
                 return HttpResponse('无权限导出此记录', status=403)
@@ -122,57 +226,67 @@ class InspectionRecordAdmin(admin.ModelAdmin):
             )
             response['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
             return response
-        except InspectionRecord.DoesNotExist:
-            return HttpResponse('记录不存在', status=404)
         except Exception as e:
             return HttpResponse(f'导出失败: {str(e)}', status=500)
     
-    def ocr_recognize_view(self, request):
-        """OCR识别接口"""
+    async def ocr_recognize_view(self, request):
+        """OCR识别接口 - 三张图片并发识别，等待阿里云响应期间不占用 worker"""
+        # 与 admin_view 相同的登录校验；CSRF 由 CsrfViewMiddleware 校验
+        if not await sync_to_async(self.admin_site.has_permission)(request):
+            return redirect_to_login(
+                request.get_full_path(), reverse('admin:login', current_app=self.admin_site.name)
+            )
+        
+        response = await self._ocr_recognize(request)
+        add_never_cache_headers(response)
+        return response
+    
+    async def _ocr_recognize(self, request):
         if request.method != 'POST':
             return JsonResponse({'success': False, 'message': '仅支持POST请求'})
         
         if not request.user.can_use_ocr:
             return JsonResponse({'success': False, 'message': '您没有OCR识别权限'})
         
-        result = {}
+        files = await sync_to_async(lambda: request.FILES)()
+        license_front = files.get('license_front_image')
+        license_back = files.get('license_back_image')
+        plate_image = files.get('plate_image')
         
-        # 识别行驶证正面
-        license_front = request.FILES.get('license_front_image')
+        # (说明, 识别任务)，按行驶证正面、副页、车牌的顺序处理结果
+        tasks = []
         if license_front:
-            try:
-                ocr_result = OCRService.recognize_vehicle_license(license_front)
-                ocr_result.pop('raw_data', None)
-                result.update(ocr_result)
-            except Exception as e:
-                return JsonResponse({'success': False, 'message': f'行驶证正面识别失败: {str(e)}'})
-        
-        # 识别行驶证副页
-        license_back = request.FILES.get('license_back_image')
+            tasks.append(('行驶证正面', 'front', OCRService.arecognize_vehicle_license(license_front)))
         if license_back:
-            try:
-                ocr_result = OCRService.recognize_vehicle_license(license_back)
-                ocr_result.pop('raw_data', None)
+            tasks.append(('行驶证副页', 'back', OCRService.arecognize_vehicle_license(license_back)))
+        if plate_image:
+            tasks.append(('车牌', 'plate', OCRService.arecognize_car_number(plate_image)))
+        
+        if not tasks:
+            return JsonResponse({'success': False, 'message': '请先上传图片'})
+        
+        results = await asyncio.gather(*(task for _, _, task in tasks), return_exceptions=True)
+        
+        result = {}
+        for (label, kind, _), ocr_result in zip(tasks, results):
+            if isinstance(ocr_result, Exception):
+                return JsonResponse({'success': False, 'message': f'{label}识别失败: {str(ocr_result)}'})
+            ocr_result.pop('raw_data', None)
+            
+            if kind == 'front':
+                # 识别行驶证正面
+                result.update(ocr_result)
+            elif kind == 'back':
                 # 副页主要提取这些字段
                 for key in ['tractor_min_weight', 'harvester_weight', 'tractor_max_load', 
                            'passenger_capacity', 'overall_dimension', 'inspection_record']:
                     if ocr_result.get(key):
                         result[key] = ocr_result[key]
-            except Exception as e:
-                return JsonResponse({'success': False, 'message': f'行驶证副页识别失败: {str(e)}'})
-        
-        # 识别车牌
-        plate_image = request.FILES.get('plate_image')
-        if plate_image:
-            try:
-                ocr_result = OCRService.recognize_car_number(plate_image)
-                ocr_result.pop('raw_data', None)
-                if ocr_result.get('license_plate_number'):
-                    result['plate_ocr_result'] = ocr_result['license_plate_number']
-                    if not result.get('license_plate_number'):
-                        result['license_plate_number'] = ocr_result['license_plate_number']
-            except Exception as e:
-                return JsonResponse({'success': False, 'message': f'车牌识别失败: {str(e)}'})
+            elif ocr_result.get('license_plate_number'):
+                # 识别车牌
+                result['plate_ocr_result'] = ocr_result['license_plate_number']
+                if not result.get('license_plate_number'):
+                    result['license_plate_number'] = ocr_result['license_plate_number']
         
         if not result:
             return JsonResponse({'success': False, 'message': '请先上传图片'})
@@ -185,6 +299,50 @@ class InspectionRecordAdmin(admin.ModelAdmin):
             return qs
         return qs.filter(created_by=request.user)
     
+    # 以下属性与方法按 admin_scaling_mode() 在每次请求时切换
+    
+    @property
+    def date_hierarchy(self):
+        # 大表模式下由 CreatedMonthFilter 代替，避免 DISTINCT 日期查询
+        return None if admin_scaling_mode() else 'created_at'
+    
+    @property
+    def show_full_result_count(self):
+        return not admin_scaling_mode()
+    
+    @property
+    def search_help_text(self):
+        if admin_scaling_mode():
+            return '号牌号码、底盘号、发动机号按开头匹配（如输入“豫A01”），所有人需输入完整姓名'
+        return '号牌号码、所有人、底盘号、发动机号包含输入内容即匹配'
+    
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        paginator = CachedCountPaginator if admin_scaling_mode() else self.paginator
+        return paginator(queryset, per_page, orphans, allow_empty_first_page)
+    
+    def get_list_filter(self, request):
+        if admin_scaling_mode():
+            return [VehicleTypeFilter, CreatedMonthFilter, 'created_at']
+        return super().get_list_filter(request)
+    
+    def get_search_results(self, request, queryset, search_term):
+        """
+        大表模式下按号牌/底盘号/发动机号前缀、所有人精确匹配搜索，
+        前缀匹配写成范围查询以使用索引（icontains 需要全表扫描）
+        """
+        if not admin_scaling_mode():
+            return super().get_search_results(request, queryset, search_term)
+        
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        
+        condition = Q(owner=term)
+        for value in {term, term.upper()}:
+            for field in ('license_plate_number', 'chassis_number', 'engine_number'):
+                condition |= Q(**{f'{field}__gte': value, f'{field}__lt': value + '\U0010ffff'})
+        return queryset.filter(condition), False
+    
     def has_change_permission(self, request, obj=None):
         if request.user.is_superuser:
             return True
@@ -239,3 +397,92 @@ class InspectionRecordAdmin(admin.ModelAdmin):
             except Exception as e:
                 self.message_user(request, f'批量导出失败: {str(e)}', level='error')
                 return
+
+
+
+@admin.register(InspectionDailyStat)
+class InspectionDailyStatAdmin(admin.ModelAdmin):
+    """每日统计（只读，由检验记录增删改自动维护）"""
+    list_display = ['date', 'vehicle_type', 'inspector', 'count']
+    list_filter = ['vehicle_type', 'inspector']
+    list_select_related = ['inspector']
+    date_hierarchy = 'date'
+    
+    def has_module_permission(self, request):
+        # 只有超级管理员能看到统计模块
+        return request.user.is_superuser
+    
+    def has_view_permission(self, request, obj=None):
+        return request.user.is_superuser
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+
+@admin.register(Vehicle)
+class VehicleAdmin(admin.ModelAdmin):
+    """农机档案（由检验记录自动维护）"""
+    list_display = ['id', 'license_plate_number', 'vehicle_type', 'brand', 'model_name', 'chassis_number', 'last_inspected_at']
+    list_filter = ['vehicle_type']
+    search_fields = ['=plate_key', '=chassis_number']
+    readonly_fields = ['plate_key', 'last_record_id', 'last_inspected_at']
+    
+    def has_module_permission(self, request):
+        # 只有超级管理员能看到农机档案模块
+        return request.user.is_superuser
+    
+    def has_view_permission(self, request, obj=None):
+        return request.user.is_superuser
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return request.user.is_superuser
+    
+    def has_delete_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+
+
+@admin.register(ArchivedInspectionRecord)
+class ArchivedInspectionRecordAdmin(admin.ModelAdmin):
+    """归档检验记录（只读，由 archive_inspections 命令写入，可恢复到检验记录后修改/删除）"""
+    list_display = ['id', 'license_plate_number', 'vehicle_type', 'owner', 'created_by', 'created_at', 'archived_at', 'export_link']
+    list_select_related = ['created_by']
+    search_fields = ['=id', 'license_plate_number']
+    show_full_result_count = False
+    actions = ['restore_selected']
+    
+    @admin.action(description='恢复到检验记录')
+    def restore_selected(self, request, queryset):
+        count = InspectionArchiveService.restore(list(queryset.values_list('pk', flat=True)))
+        self.message_user(request, f'已恢复 {count} 条记录', messages.SUCCESS)
+    
+    def export_link(self, obj):
+        url = reverse('admin:inspection_export_single', args=[obj.pk])
+        return format_html('<a href="{}">导出</a>', url)
+    export_link.short_description = '导出'
+    
+    def has_module_permission(self, request):
+        # 只有超级管理员能看到归档模块
+        return request.user.is_superuser
+    
+    def has_view_permission(self, request, obj=None):
+        return request.user.is_superuser
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -5,3 +5,6 @@ class InspectionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.inspection'
     verbose_name = '检验管理'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,137 @@
+"""
+检验记录缓存工具
+- 用户变更标记：每个用户一个版本号，记录增删改时刷新
+- ETag：详情基于 id + updated_at，列表基于用户变更标记 + 查询参数，
+  均附加图片签名地址的签发周期，周期切换后客户端重新获取未过期的图片地址
+- 列表响应缓存：缓存键包含用户变更标记和签发周期，记录变更后旧缓存自动失效
+"""
+import hashlib
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import parse_etags, quote_etag
+
+from config.metrics import collect, registry
+from .media import media_url_epoch
+
+
+USER_VERSION_KEY = 'inspection:user_version:{user_id}'
+
+
+def get_user_version(user_id):
+    """获取用户的变更标记，缓存中不存在时生成新标记"""
+    key = USER_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        # 缓存被淘汰时生成新标记，旧的ETag自然失效
+        version = uuid.uuid4().hex
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+    return version
+
+
+def bump_user_version(user_id):
+    """刷新用户的变更标记（记录创建/更新/删除时调用）"""
+    if user_id is None:
+        return
+    cache.set(USER_VERSION_KEY.format(user_id=user_id), uuid.uuid4().hex, None)
+
+
+def normalize_query(query_params):
+    """规范化查询参数，参数顺序不同的请求视为同一请求"""
+    items = sorted(
+        (key, value)
+        for key in query_params
+        for value in query_params.getlist(key)
+    )
+    return urlencode(items)
+
+
+def make_etag(*parts):
+    """根据若干组成部分生成强ETag：内容摘要.签名地址签发周期"""
+    raw = ':'.join(str(part) for part in parts)
+    return quote_etag(f"{hashlib.md5(raw.encode('utf-8')).hexdigest()}.{media_url_epoch()}")
+
+
+def _content_tag(etag):
+    """去掉ETag中的签发周期，只保留内容摘要"""
+    return etag.rsplit('.', 1)[0]
+
+
+def record_etag(obj):
+    """检验记录详情的ETag"""
+    return make_etag('record', obj.pk, obj.updated_at.isoformat() if obj.updated_at else '')
+
+
+def list_etag(user_id, version, query):
+    """检验记录列表的ETag"""
+    return make_etag('list', user_id, version, query)
+
+
+def if_none_match(request, etag):
+    """If-None-Match 是否命中（弱比较）"""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = [e[2:] if e.startswith('W/') else e for e in parse_etags(header)]
+    return '*' in etags or etag in etags
+
+
+def etag_mismatch(header, etag):
+    """If-Match 取值与ETag是否不一致（强比较，忽略签发周期）"""
+    etags = {_content_tag(e) for e in parse_etags(header)}
+    return not ('*' in etags or _content_tag(etag) in etags)
+
+
+def if_match_failed(request, etag):
+    """If-Match 是否不满足，未携带该请求头时视为满足"""
+    header = request.META.get('HTTP_IF_MATCH')
+    return bool(header) and etag_mismatch(header, etag)
+
+
+class ListResponseCache:
+    """
+    检验记录列表响应缓存
+    缓存键 = 用户 + 变更标记 + 签发周期 + 规范化查询参数，记录变更时刷新变更标记即完成失效，
+    旧键由缓存后端按 MAX_ENTRIES / 过期时间淘汰
+    """
+    
+    KEY = 'inspection:list:{user_id}:{version}:{epoch}:{digest}'
+    METRIC = 'inspection_list_cache_requests_total'
+    
+    @staticmethod
+    def _timeout():
+        return getattr(settings, 'INSPECTION_LIST_CACHE_TIMEOUT', 300)
+    
+    @classmethod
+    def _key(cls, user_id, version, query):
+        digest = hashlib.md5(query.encode('utf-8')).hexdigest()
+        return cls.KEY.format(user_id=user_id, version=version, epoch=media_url_epoch(), digest=digest)
+    
+    @classmethod
+    def get(cls, user_id, version, query):
+        """读取缓存的列表数据，未命中返回 None；命中次数计入本进程的运行指标，不写共享缓存"""
+        data = cache.get(cls._key(user_id, version, query))
+        registry.inc(cls.METRIC, result='hit' if data is not None else 'miss')
+        return data
+    
+    @classmethod
+    def set(cls, user_id, version, query, data):
+        cache.set(cls._key(user_id, version, query), data, cls._timeout())
+    
+    @classmethod
+    def stats(cls):
+        """命中统计：合并全部 worker 的运行指标（各 worker 按 METRICS_FLUSH_INTERVAL 写入）"""
+        counts = {'hit': 0, 'miss': 0}
+        for name, labels, value in collect().get('counters', []):
+            if name == cls.METRIC:
+                result = dict(labels).get('result')
+                counts[result] = counts.get(result, 0) + value
+        total = counts['hit'] + counts['miss']
+        return {
+            'hits': counts['hit'],
+            'misses': counts['miss'],
+            'hit_rate': counts['hit'] / total if total else 0.0,
+        }
@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.inspection.models import InspectionRecord
+from apps.inspection.services import InspectionArchiveService
+
+
+class Command(BaseCommand):
+    help = '将创建时间超过保留期的检验记录分批移入归档表，中断后重新执行即可继续'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='归档创建超过该天数的记录，默认 INSPECTION_ARCHIVE_DAYS')
+        parser.add_argument('--batch-size', type=int, default=500, help='每批（每个事务）归档的记录数')
+        parser.add_argument('--limit', type=int, default=0, help='本次最多归档的记录数，0 表示不限')
+        parser.add_argument('--dry-run', action='store_true', help='只统计，不归档')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.INSPECTION_ARCHIVE_DAYS
+        cutoff = timezone.now() - timedelta(days=days)
+        self.stdout.write(f'归档 {timezone.localtime(cutoff):%Y-%m-%d %H:%M} 之前创建的检验记录')
+
+        if options['dry_run']:
+            count = InspectionRecord.objects.filter(created_at__lt=cutoff).count()
+            self.stdout.write(self.style.SUCCESS(f'待归档 {count} 条记录'))
+            return
+
+        total = 0
+        limit = options['limit']
+        while not limit or total < limit:
+            batch_size = min(options['batch_size'], limit - total) if limit else options['batch_size']
+            archived = InspectionArchiveService.archive_batch(cutoff, batch_size)
+            if not archived:
+                break
+            total += archived
+            self.stdout.write(f'已归档 {total} 条记录')
+        self.stdout.write(self.style.SUCCESS(f'归档完成：{total} 条记录'))
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+
+from apps.inspection.caches import bump_user_version
+from apps.inspection.models import InspectionRecord, ArchivedInspectionRecord, NUMERIC_FIELDS
+
+
+class Command(BaseCommand):
+    help = '由副页文字字段（质量、载质量、准乘人数、外廓尺寸）解析并回填数值字段（含归档记录），可重复执行'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批处理的记录数')
+        parser.add_argument('--dry-run', action='store_true', help='只统计，不写入')
+        parser.add_argument('--show-unparsed', type=int, default=0,
+                            help='输出前N个无法解析的文字值，便于补充解析规则')
+
+    def handle(self, *args, **options):
+        sources = sorted(set(NUMERIC_FIELDS.values()))
+        total = updated = 0
+        unparsed = {}
+        users = set()
+        for model in (InspectionRecord, ArchivedInspectionRecord):
+            last_id = 0
+            while True:
+                records = list(
+                    model.objects
+                    .filter(id__gt=last_id)
+                    .order_by('id')
+                    .only('id', 'created_by', *sources, *NUMERIC_FIELDS)[:options['batch_size']]
+                )
+                if not records:
+                    break
+                last_id = records[-1].id
+
+                changed_records = []
+                for record in records:
+                    if record.fill_numeric_fields():
+                        changed_records.append(record)
+                    for field, source in NUMERIC_FIELDS.items():
+                        text = getattr(record, source)
+                        if text and getattr(record, field) is None:
+                            unparsed.setdefault(source, {}).setdefault(text, 0)
+                            unparsed[source][text] += 1
+
+                # bulk_update 不刷新 updated_at，记录的 ETag 与增量同步游标不受影响
+                if changed_records and not options['dry_run']:
+                    model.objects.bulk_update(changed_records, list(NUMERIC_FIELDS))
+                    users.update(record.created_by_id for record in changed_records)
+                total += len(records)
+                updated += len(changed_records)
+                self.stdout.write(f'{model._meta.verbose_name}: 已处理 {total} 条记录')
+
+        # 范围筛选结果变化，刷新相关用户的列表缓存与列表ETag
+        for user_id in users:
+            bump_user_version(user_id)
+
+        action = '需更新' if options['dry_run'] else '已更新'
+        self.stdout.write(self.style.SUCCESS(f'处理完成：{total} 条记录，{action} {updated} 条'))
+        for source, values in unparsed.items():
+            self.stdout.write(self.style.WARNING(
+                f'{source}: {sum(values.values())} 条记录无法解析（{len(values)} 种写法）'
+            ))
+            top = sorted(values.items(), key=lambda item: item[1], reverse=True)[:options['show_unparsed']]
+            for text, count in top:
+                self.stdout.write(f'  {text!r} × {count}')
@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from config.renderers import FastJSONRenderer, MessagePackRenderer, msgpack
+
+
+def build_list_page(page_size):
+    """构造与列表接口结构一致、包含中文字段的分页数据"""
+    now = timezone.now()
+    results = [
+        {
+            'id': 100000 + i,
+            'license_plate_number': f'豫A·{i:05d}',
+            'vehicle_type': '轮式拖拉机' if i % 2 else '履带式联合收割机',
+            'owner': '张三丰' if i % 3 else '李四光',
+            'brand': '东方红',
+            'model_name': f'LX{904 + i % 10}',
+            'created_at': now.isoformat(),
+        }
+        for i in range(page_size)
+    ]
+    return {
+        'code': 200,
+        'message': 'success',
+        'data': {
+            'total': 12345,
+            'page': 1,
+            'page_size': page_size,
+            'total_pages': (12345 + page_size - 1) // page_size,
+            'results': results,
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = '对比各渲染器在列表数据上的渲染耗时与响应体大小'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100, help='每页记录数')
+        parser.add_argument('--iterations', type=int, default=2000, help='渲染次数')
+
+    def handle(self, *args, **options):
+        data = build_list_page(options['page_size'])
+        iterations = options['iterations']
+
+        # DRF 默认渲染器 + ensure_ascii 对照组
+        class AsciiJSONRenderer(JSONRenderer):
+            ensure_ascii = True
+
+        renderers = [
+            ('JSONRenderer(ensure_ascii)', AsciiJSONRenderer()),
+            ('JSONRenderer', JSONRenderer()),
+            ('FastJSONRenderer', FastJSONRenderer()),
+        ]
+        if msgpack is not None:
+            renderers.append(('MessagePackRenderer', MessagePackRenderer()))
+        else:
+            self.stdout.write(self.style.WARNING('未安装 msgpack，跳过 MessagePackRenderer'))
+
+        self.stdout.write(f"每页 {options['page_size']} 条，渲染 {iterations} 次")
+        self.stdout.write(f"{'渲染器':<28}{'单次耗时(μs)':>14}{'大小(字节)':>12}")
+        for name, renderer in renderers:
+            body = renderer.render(data, renderer.media_type, {})
+            start = time.perf_counter()
+            for _ in range(iterations):
+                renderer.render(data, renderer.media_type, {})
+            elapsed = (time.perf_counter() - start) / iterations * 1e6
+            self.stdout.write(f'{name:<28}{elapsed:>14.1f}{len(body):>12}')
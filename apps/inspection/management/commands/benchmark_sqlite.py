@@ -0,0 +1,146 @@
+import copy
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+BENCH_ALIAS = 'sqlite_benchmark'
+
+
+def configure(profile, path):
+    """注册压测用数据库连接（不影响 default）"""
+    databases = connections.configure_settings({
+        DEFAULT_DB_ALIAS: {}, BENCH_ALIAS: dict(copy.deepcopy(profile), NAME=path)
+    })
+    connections.settings[BENCH_ALIAS] = databases[BENCH_ALIAS]
+    try:
+        # 丢弃上一个配置留下的连接对象
+        del connections[BENCH_ALIAS]
+    except AttributeError:
+        pass
+    return connections[BENCH_ALIAS]
+
+
+def prepare(profile, path, rows):
+    conn = configure(profile, path)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            'CREATE TABLE bench_record ('
+            'id INTEGER PRIMARY KEY, plate VARCHAR(20), image VARCHAR(100), updated_at REAL)'
+        )
+        cursor.executemany(
+            'INSERT INTO bench_record (plate, image, updated_at) VALUES (%s, %s, %s)',
+            [(f'豫A{i:05d}', '', time.time()) for i in range(rows)]
+        )
+    conn.close()
+
+
+def worker(profile, path, rows, operations, write_ratio, seed, queue):
+    """
+    模拟一个 gunicorn worker：每次操作视为一个请求，请求前后按 CONN_MAX_AGE 决定是否关闭连接；
+    写操作为“先读后写”的事务（与保存检验记录时的 pre_save 查询 + UPDATE 相同）
+    """
+    conn = configure(profile, path)
+    rng = random.Random(seed)
+    result = {'reads': [], 'writes': [], 'locked': 0}
+    for _ in range(operations):
+        conn.close_if_unusable_or_obsolete()
+        pk = rng.randint(1, rows)
+        start = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                with transaction.atomic(using=BENCH_ALIAS), conn.cursor() as cursor:
+                    cursor.execute('SELECT image FROM bench_record WHERE id = %s', [pk])
+                    cursor.fetchone()
+                    cursor.execute(
+                        'UPDATE bench_record SET image = %s, updated_at = %s WHERE id = %s',
+                        [f'inspection/{pk:02x}/{seed}.jpg', time.time(), pk]
+                    )
+                result['writes'].append(time.perf_counter() - start)
+            else:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT id, plate, image FROM bench_record WHERE id >= %s ORDER BY id LIMIT 20', [pk]
+                    )
+                    cursor.fetchall()
+                result['reads'].append(time.perf_counter() - start)
+        except OperationalError:
+            result['locked'] += 1
+        conn.close_if_unusable_or_obsolete()
+    conn.close()
+    queue.put(result)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+class Command(BaseCommand):
+    help = '多进程并发读写压测：对比默认 SQLite 配置与 production 配置（WAL 等）的锁等待与吞吐量'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='并发进程数（对应 gunicorn worker 数）')
+        parser.add_argument('--operations', type=int, default=500, help='每个进程的操作次数')
+        parser.add_argument('--write-ratio', type=float, default=0.3, help='写操作占比')
+        parser.add_argument('--rows', type=int, default=10000, help='预置记录数')
+
+    def handle(self, *args, **options):
+        profiles = [
+            ('default', {'ENGINE': 'django.db.backends.sqlite3'}),
+            ('production', copy.deepcopy(settings.SQLITE_PRODUCTION_PROFILE)),
+        ]
+        self.stdout.write(
+            f"{options['workers']} 个进程 × {options['operations']} 次操作，写占比 {options['write_ratio']:.0%}"
+        )
+        self.stdout.write(
+            f"{'配置':<12}{'吞吐(次/秒)':>12}{'锁失败':>8}{'读p50(ms)':>11}{'读p99(ms)':>11}"
+            f"{'写p50(ms)':>11}{'写p99(ms)':>11}"
+        )
+        for name, profile in profiles:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                row = self.run_profile(profile, os.path.join(tmpdir, 'bench.sqlite3'), options)
+            self.stdout.write(
+                f"{name:<12}{row['throughput']:>12.0f}{row['locked']:>8}"
+                f"{row['read_p50']:>11.2f}{row['read_p99']:>11.2f}"
+                f"{row['write_p50']:>11.2f}{row['write_p99']:>11.2f}"
+            )
+
+    def run_profile(self, profile, path, options):
+        prepare(profile, path, options['rows'])
+        # fork 前不保留打开的连接
+        connections.close_all()
+
+        queue = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(
+                profile, path, options['rows'], options['operations'], options['write_ratio'], seed, queue
+            ))
+            for seed in range(options['workers'])
+        ]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        results = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        reads = [t for r in results for t in r['reads']]
+        writes = [t for r in results for t in r['writes']]
+        return {
+            'throughput': (len(reads) + len(writes)) / elapsed,
+            'locked': sum(r['locked'] for r in results),
+            'read_p50': statistics.median(reads) * 1000 if reads else 0.0,
+            'read_p99': percentile(reads, 0.99) * 1000,
+            'write_p50': statistics.median(writes) * 1000 if writes else 0.0,
+            'write_p99': percentile(writes, 0.99) * 1000,
+        }
@@ -0,0 +1,56 @@
+import os
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.inspection.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = '清理过期的分片上传会话及其临时文件'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=settings.CHUNKED_UPLOAD_EXPIRE_HOURS,
+                            help='超过该时长（小时）未更新的会话视为过期')
+        parser.add_argument('--dry-run', action='store_true', help='仅统计，不删除')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        expired = UploadSession.objects.filter(updated_at__lt=cutoff)
+        count = expired.count()
+        if not options['dry_run']:
+            for session in expired.iterator():
+                session.discard()
+        orphans = self.clean_orphan_files(cutoff, options['dry_run'])
+
+        action = '可清理' if options['dry_run'] else '已清理'
+        self.stdout.write(self.style.SUCCESS(f'{action}过期会话 {count} 个，残留临时文件 {orphans} 个'))
+
+    def clean_orphan_files(self, cutoff, dry_run):
+        """删除没有对应会话的临时文件（如会话随检验记录级联删除后留下的文件）"""
+        try:
+            entries = list(os.scandir(settings.CHUNKED_UPLOAD_DIR))
+        except FileNotFoundError:
+            return 0
+        names = {entry.name[:-len('.part')]: entry for entry in entries
+                 if entry.is_file() and entry.name.endswith('.part')}
+        ids = []
+        for name in names:
+            try:
+                ids.append(uuid.UUID(name))
+            except ValueError:
+                continue
+        alive = {str(pk) for pk in UploadSession.objects.filter(pk__in=ids).values_list('pk', flat=True)}
+        removed = 0
+        for name, entry in names.items():
+            if name in alive:
+                continue
+            if datetime.fromtimestamp(entry.stat().st_mtime, tz=dt_timezone.utc) >= cutoff:
+                continue
+            removed += 1
+            if not dry_run:
+                os.remove(entry.path)
+        return removed
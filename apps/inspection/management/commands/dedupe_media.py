@@ -0,0 +1,147 @@
+import os
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.inspection.caches import bump_user_version
+from apps.inspection.models import (
+    InspectionRecord, ArchivedInspectionRecord, InspectionChange, MediaBlob, IMAGE_FIELDS
+)
+from apps.inspection.storage import (
+    media_storage,
+    hash_file,
+    content_addressed_name,
+    is_content_addressed,
+)
+
+# 引用图片的表：检验记录与归档检验记录
+RECORD_MODELS = [InspectionRecord, ArchivedInspectionRecord]
+
+
+class Command(BaseCommand):
+    help = '将已有图片迁移为内容寻址存储：按内容哈希重命名、合并重复文件并重建引用计数'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='仅统计，不移动文件、不修改数据库')
+        parser.add_argument('--batch-size', type=int, default=500, help='每批读取的记录数')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        renamed = {}       # 旧文件名 -> 新文件名
+        missing = set()
+        stats = Counter()
+
+        for model in RECORD_MODELS:
+            changed_ids = []
+            for row in self.iter_rows(model, options['batch_size']):
+                pk, names = row[0], row[1:]
+                updates = {}
+                for field, name in zip(IMAGE_FIELDS, names):
+                    if not name or is_content_addressed(name) or name in missing:
+                        continue
+                    if name not in renamed:
+                        new_name = self.migrate_file(name, dry_run, stats)
+                        if new_name is None:
+                            missing.add(name)
+                            continue
+                        renamed[name] = new_name
+                    updates[field] = renamed[name]
+                if updates and not dry_run:
+                    # 图片地址已变化，刷新 updated_at 使客户端的 ETag/本地缓存失效
+                    model.objects.filter(pk=pk).update(updated_at=timezone.now(), **updates)
+                    changed_ids.append(pk)
+                stats['records'] += bool(updates)
+            if not dry_run:
+                self.notify_changed(model, changed_ids)
+
+        if not dry_run:
+            self.rebuild_refcounts()
+
+        self.stdout.write(
+            f"涉及记录: {stats['records']}  迁移文件: {stats['moved']}  "
+            f"重复文件: {stats['duplicates']}  可释放: {stats['freed_bytes'] / 1024 / 1024:.1f} MB  "
+            f"缺失文件: {len(missing)}"
+        )
+        if dry_run:
+            self.stdout.write(self.style.WARNING('dry-run 模式，未做任何修改'))
+
+    def iter_rows(self, model, batch_size):
+        """按主键分批读取（SQLite 下边遍历边更新同一张表时不使用服务端游标）"""
+        last_id = 0
+        while True:
+            rows = list(
+                model.objects
+                .filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', *IMAGE_FIELDS)[:batch_size]
+            )
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1][0]
+
+    def migrate_file(self, name, dry_run, stats):
+        """按内容哈希重命名文件，目标已存在时删除当前副本；返回新文件名"""
+        if not media_storage.exists(name):
+            return None
+        with media_storage.open(name, 'rb') as f:
+            new_name = content_addressed_name(name, hash_file(f))
+
+        if media_storage.exists(new_name):
+            stats['duplicates'] += 1
+            stats['freed_bytes'] += media_storage.size(name)
+            if not dry_run:
+                media_storage.delete(name)
+        else:
+            stats['moved'] += 1
+            if not dry_run:
+                target = media_storage.path(new_name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(media_storage.path(name), target)
+        return new_name
+
+    def notify_changed(self, model, ids, batch_size=500):
+        """queryset.update 不触发信号，手动写入增量同步变更并刷新用户变更标记"""
+        user_ids = set()
+        for start in range(0, len(ids), batch_size):
+            records = list(model.objects.filter(pk__in=ids[start:start + batch_size]).only('id', 'created_by'))
+            InspectionChange.log(records)
+            user_ids.update(record.created_by_id for record in records)
+        for user_id in user_ids:
+            bump_user_version(user_id)
+
+    def rebuild_refcounts(self, batch_size=1000):
+        """
+        根据检验记录与归档记录的五个图片字段重新统计引用次数，只改写计数有偏差的行：
+        已有行原地更新（保留待删除队列 released_at），缺失的补建，不清空整张表。
+        统计与写入在同一事务内，期间上传/删除对引用计数的修改等待事务结束，不会被覆盖
+        """
+        now = timezone.now()
+        queue = getattr(settings, 'MEDIA_GC_QUEUE_ON_RELEASE', False)
+        with transaction.atomic():
+            counts = Counter()
+            for model in RECORD_MODELS:
+                for row in model.objects.values_list(*IMAGE_FIELDS).iterator():
+                    counts.update(name for name in row if name)
+
+            changed = []
+            for blob in MediaBlob.objects.select_for_update().only('id', 'name', 'refcount', 'released_at'):
+                count = counts.pop(blob.name, 0)
+                if blob.refcount == count:
+                    continue
+                if count > 0:
+                    blob.released_at = None
+                elif queue and blob.released_at is None:
+                    # 引用降为0，与 MediaBlob.apply 一致进入待删除队列
+                    blob.released_at = now
+                blob.refcount = count
+                blob.updated_at = now
+                changed.append(blob)
+            MediaBlob.objects.bulk_update(changed, ['refcount', 'released_at', 'updated_at'], batch_size=batch_size)
+            MediaBlob.objects.bulk_create(
+                [MediaBlob(name=name, refcount=count) for name, count in counts.items()],
+                batch_size=batch_size
+            )
@@ -0,0 +1,148 @@
+import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.inspection.models import InspectionRecord, ArchivedInspectionRecord, MediaBlob, IMAGE_FIELDS
+from apps.inspection.services import ImageDerivativeService
+from apps.inspection.storage import media_storage
+
+
+def owner_name(name):
+    """衍生图归属于其原图，其余文件归属于自身"""
+    return ImageDerivativeService.original_name(name) or name
+
+
+class Command(BaseCommand):
+    help = '清理不再被检验记录引用的媒体文件（标记-清除，带宽限期）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='宽限期（小时），修改时间在宽限期内的文件不删除')
+        parser.add_argument('--dry-run', action='store_true', help='仅输出待删除文件，不删除')
+        parser.add_argument('--queue-only', action='store_true',
+                            help='只处理待删除队列，不扫描媒体目录')
+        parser.add_argument('--batch-size', type=int, default=500, help='每批检查的文件数')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.batch_size = options['batch_size']
+        self.cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        self.deleted = 0
+        self.freed_bytes = 0
+
+        self.process_queue()
+        if not options['queue_only']:
+            self.sweep()
+
+        action = '可删除' if self.dry_run else '已删除'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {self.deleted} 个文件，共 {self.freed_bytes / 1024 / 1024:.1f} MB'
+        ))
+
+    def process_queue(self):
+        """处理引用次数降为0且超过宽限期的文件"""
+        last_id = 0
+        while True:
+            blobs = list(
+                MediaBlob.objects
+                .filter(id__gt=last_id, refcount__lte=0, released_at__lt=self.cutoff)
+                .order_by('id')
+                .values_list('id', 'name')[:self.batch_size]
+            )
+            if not blobs:
+                return
+            last_id = blobs[-1][0]
+            self.collect([name for _, name in blobs])
+
+    def sweep(self):
+        """流式遍历媒体目录，逐批检查引用"""
+        batch = []
+        for name in self.walk():
+            batch.append(name)
+            if len(batch) >= self.batch_size:
+                self.check_batch(batch)
+                batch = []
+        if batch:
+            self.check_batch(batch)
+
+    def walk(self):
+        """按目录逐层生成文件的相对路径，不一次性加载整棵目录树"""
+        media_root = str(settings.MEDIA_ROOT)
+        stack = [os.path.join(media_root, root) for root in settings.MEDIA_GC_ROOTS]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = os.scandir(directory)
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield os.path.relpath(entry.path, media_root).replace(os.sep, '/')
+
+    def check_batch(self, names):
+        """引用次数大于0的文件（及其衍生图）直接跳过，其余文件再核对检验记录"""
+        owners = {owner_name(name) for name in names}
+        referenced = set(
+            MediaBlob.objects.filter(name__in=owners, refcount__gt=0).values_list('name', flat=True)
+        )
+        self.collect([name for name in names if owner_name(name) not in referenced])
+
+    def collect(self, candidates):
+        """核对检验记录（含归档记录）的五个图片字段，确认无引用且超过宽限期后删除（原图连同衍生图）"""
+        if not candidates:
+            return
+        owners = list({owner_name(name) for name in candidates})
+        condition = reduce(or_, (Q(**{f'{field}__in': owners}) for field in IMAGE_FIELDS))
+        referenced = set()
+        for model in (InspectionRecord, ArchivedInspectionRecord):
+            for row in model.objects.filter(condition).values_list(*IMAGE_FIELDS):
+                referenced.update(row)
+
+        if referenced and not self.dry_run:
+            # 引用计数有偏差的文件移出待删除队列
+            MediaBlob.objects.filter(
+                name__in=[name for name in candidates if name in referenced],
+                released_at__isnull=False
+            ).update(released_at=None)
+
+        orphans = []
+        for name in candidates:
+            if owner_name(name) in referenced:
+                continue
+            path = media_storage.path(name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                orphans.append(name)
+                continue
+            modified = datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc)
+            if modified >= self.cutoff:
+                continue
+            self.deleted += 1
+            self.freed_bytes += stat.st_size
+            if self.dry_run:
+                self.stdout.write(f'  {name} ({stat.st_size} 字节)')
+            else:
+                media_storage.delete(name)
+                self.delete_derivatives(name)
+            orphans.append(name)
+
+        if orphans and not self.dry_run:
+            MediaBlob.objects.filter(name__in=orphans, refcount__lte=0).delete()
+
+    def delete_derivatives(self, name):
+        """原图删除后一并删除其衍生图"""
+        if ImageDerivativeService.original_name(name):
+            return
+        for derivative in ImageDerivativeService.derivative_names(name):
+            if media_storage.exists(derivative):
+                media_storage.delete(derivative)
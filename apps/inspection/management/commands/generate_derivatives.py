@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from apps.inspection.models import InspectionRecord, ArchivedInspectionRecord, IMAGE_FIELDS
+from apps.inspection.services import ImageDerivativeService
+
+
+class Command(BaseCommand):
+    help = '为检验记录（含归档记录）的图片补齐缺失的缩略图/中图（接口访问时也会在后台补齐，本命令用于批量预生成）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每批读取的记录数')
+        parser.add_argument('--dry-run', action='store_true', help='只统计缺失的衍生图，不生成')
+
+    def handle(self, *args, **options):
+        checked = set()
+        images = missing = 0
+        for model in (InspectionRecord, ArchivedInspectionRecord):
+            last_id = 0
+            while True:
+                rows = list(
+                    model.objects
+                    .filter(id__gt=last_id)
+                    .order_by('id')
+                    .values_list('id', *IMAGE_FIELDS)[:options['batch_size']]
+                )
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                for name in {name for row in rows for name in row[1:] if name} - checked:
+                    # 内容寻址存储下多条记录可能引用同一文件，只处理一次
+                    checked.add(name)
+                    targets = ImageDerivativeService.missing(name)
+                    if not targets:
+                        continue
+                    images += 1
+                    missing += len(targets)
+                    if not options['dry_run']:
+                        ImageDerivativeService.generate(name)
+                self.stdout.write(f'{model._meta.verbose_name}: 已检查至 id={last_id}')
+
+        action = '待生成' if options['dry_run'] else '已生成'
+        self.stdout.write(self.style.SUCCESS(
+            f'检查图片 {len(checked)} 张，{action} {images} 张图片的 {missing} 个衍生图'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apps.inspection.caches import ListResponseCache
+
+
+class Command(BaseCommand):
+    help = '查看检验记录列表响应缓存的命中统计（来自运行指标，自服务启动起累计）'
+
+    def handle(self, *args, **options):
+        stats = ListResponseCache.stats()
+        self.stdout.write(
+            f"命中: {stats['hits']}  未命中: {stats['misses']}  命中率: {stats['hit_rate']:.2%}"
+        )
@@ -0,0 +1,515 @@
+import http.client
+import io
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .seed_loadtest import Command as SeedCommand
+
+
+# 默认请求比例（权重），可用 --mix list=50,export=0 覆盖
+DEFAULT_MIX = {
+    'login': 2,
+    'list': 30,
+    'detail': 25,
+    'create': 8,
+    'upload': 8,
+    'ocr_plate': 10,
+    'ocr_license': 5,
+    'export': 8,
+    'export_batch': 4,
+}
+
+# 模拟OCR返回（结构与阿里云接口一致，Data 为JSON字符串）
+OCR_STUB_RESULTS = {
+    'RecognizeCarNumber': {'data': [{'plateNumber': '豫A12345', 'confidence': 99}]},
+    'RecognizeVehicleLicense': {'data': {
+        'face': {'data': {
+            'licensePlateNumber': '豫A12345', 'vehicleType': '轮式拖拉机', 'owner': '农户',
+            'address': '中华人民共和国拖拉机和联合收割机行驶证河南省郑州市',
+            'model': 'LS0000000001', 'engineNumber': 'E00000001', 'vinCode': 'LX904',
+            'registrationDate': '2020-05-01', 'issueDate': '2020-05-01', 'issueAuthority': '郑州市农业机械管理局',
+        }},
+        'back': {'data': {
+            'curbWeight': '3500kg', 'totalWeight': '', 'permittedWeight': '1200kg',
+            'passengerCapacity': '1人', 'overallDimension': '4200×2000×2800',
+        }},
+    }},
+}
+
+
+class OCRStubHandler(BaseHTTPRequestHandler):
+    """本地OCR模拟服务：按 x-acs-action 返回固定识别结果，可模拟接口延迟"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.read_body()
+        time.sleep(self.server.latency)
+        action = self.headers.get('x-acs-action', '')
+        body = json.dumps({
+            'RequestId': str(uuid.uuid4()),
+            'Data': json.dumps(OCR_STUB_RESULTS.get(action, {}), ensure_ascii=False),
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json;charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                self.rfile.read(size + 2)
+                if size == 0:
+                    return
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_ocr_stub(latency):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), OCRStubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentile(values, p):
+    """最近秩百分位数，values 需已排序"""
+    if not values:
+        return 0.0
+    return values[max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))]
+
+
+def multipart(files):
+    """构造 multipart/form-data 请求体，files: {字段名: (文件名, 内容, 类型)}"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, (filename, content, content_type) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode()
+        )
+        parts.append(content)
+        parts.append(b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def sample_image():
+    """压测上传用的JPEG（噪点图，压缩后约与手机照片缩放后的大小相当）"""
+    from PIL import Image
+
+    image = Image.effect_noise((1024, 768), 64).convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+class VirtualUser:
+    """一个并发用户：独立的长连接与统计，按权重随机选择请求"""
+
+    def __init__(self, runner, index):
+        self.runner = runner
+        self.username = f"{runner.options['prefix']}{index % runner.options['users']}"
+        self.rng = random.Random(index)
+        self.stats = {}
+        self.conn = None
+        self.token = None
+        self.record_ids = []
+
+    def request(self, name, method, path, body=None, content_type=None, expected=200):
+        headers = {}
+        if self.token:
+            headers['Authorization'] = f'Token {self.token}'
+        if content_type:
+            headers['Content-Type'] = content_type
+        start = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(
+                    self.runner.host, self.runner.port, timeout=self.runner.options['timeout']
+                )
+            self.conn.request(method, self.runner.prefix + path, body, headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            status = response.status
+        except (http.client.HTTPException, OSError):
+            # 连接异常计为错误，下一次请求重新建立连接
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+            data, status = b'', 0
+        self.record(name, time.perf_counter() - start, status, status == expected)
+        return status, data
+
+    def request_json(self, name, method, path, payload, expected=200):
+        return self.request(
+            name, method, path, json.dumps(payload).encode(), 'application/json', expected
+        )
+
+    def record(self, name, elapsed, status, ok):
+        if time.perf_counter() < self.runner.measure_from:
+            return
+        stat = self.stats.setdefault(name, {'latencies': [], 'errors': 0, 'statuses': Counter()})
+        stat['latencies'].append(elapsed)
+        stat['statuses'][status] += 1
+        if not ok:
+            stat['errors'] += 1
+
+    def run(self):
+        self.login()
+        status, data = self.request('GET inspections/', 'GET', 'inspections/?page_size=100')
+        if status == 200:
+            self.record_ids = [item['id'] for item in json.loads(data)['data']['results']]
+        scenarios, weights = zip(*self.runner.mix.items())
+        while time.perf_counter() < self.runner.deadline:
+            getattr(self, self.rng.choices(scenarios, weights)[0])()
+        if self.conn is not None:
+            self.conn.close()
+
+    def pick_id(self):
+        return self.rng.choice(self.record_ids) if self.record_ids else 0
+
+    # ---------- 场景 ----------
+
+    def login(self):
+        status, data = self.request_json('POST auth/login/', 'POST', 'auth/login/', {
+            'username': self.username, 'password': self.runner.options['password'],
+        })
+        if status == 200:
+            self.token = json.loads(data)['data']['token']
+
+    def list(self):
+        self.request('GET inspections/', 'GET', f'inspections/?page={self.rng.randint(1, 5)}')
+
+    def detail(self):
+        self.request('GET inspections/<pk>/', 'GET', f'inspections/{self.pick_id()}/')
+
+    def create(self):
+        status, data = self.request_json(
+            'POST inspections/', 'POST', 'inspections/',
+            SeedCommand.fake_record(self.rng), expected=201
+        )
+        if status == 201:
+            self.record_ids.append(json.loads(data)['data']['id'])
+
+    def upload(self):
+        body, content_type = multipart({
+            'plate_image': ('plate.jpg', self.runner.image, 'image/jpeg'),
+        })
+        self.request(
+            'POST inspections/<pk>/upload-image/', 'POST',
+            f'inspections/{self.pick_id()}/upload-image/', body, content_type
+        )
+
+    def ocr_plate(self):
+        body, content_type = multipart({'image': ('plate.jpg', self.runner.image, 'image/jpeg')})
+        self.request('POST ocr/license-plate/', 'POST', 'ocr/license-plate/', body, content_type)
+
+    def ocr_license(self):
+        body, content_type = multipart({'image': ('license.jpg', self.runner.image, 'image/jpeg')})
+        self.request('POST ocr/driving-license/', 'POST', 'ocr/driving-license/', body, content_type)
+
+    def export(self):
+        self.request('GET inspections/<pk>/export/', 'GET', f'inspections/{self.pick_id()}/export/')
+
+    def export_batch(self):
+        ids = self.rng.sample(self.record_ids, min(len(self.record_ids), self.runner.options['batch_size']))
+        self.request_json('POST inspections/export-batch/', 'POST', 'inspections/export-batch/', {'ids': ids})
+
+
+class Command(BaseCommand):
+    help = (
+        '端到端压测：在临时目录中准备数据库与压测数据，启动本地 gunicorn 与OCR模拟服务，'
+        '按比例发送请求，输出各接口吞吐量、p50/p95/p99 延迟与错误率（可保存为JSON并与基线对比）'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=60, help='压测时长（秒，不含预热）')
+        parser.add_argument('--warmup', type=float, default=5, help='预热时长（秒），期间的请求不计入结果')
+        parser.add_argument('--concurrency', type=int, default=10, help='并发用户数')
+        parser.add_argument('--mix', default='', help='请求比例，如 list=50,export=0（未列出的保持默认）')
+        parser.add_argument('--users', type=int, default=10, help='压测账号数')
+        parser.add_argument('--records-per-user', type=int, default=200, help='每个账号的检验记录数')
+        parser.add_argument('--prefix', default='loadtest_', help='压测账号用户名前缀')
+        parser.add_argument('--password', default='loadtest', help='压测账号密码')
+        parser.add_argument('--batch-size', type=int, default=10, help='批量导出的记录数')
+        parser.add_argument('--ocr-latency', type=float, default=300, help='OCR模拟服务的响应延迟（毫秒）')
+        parser.add_argument('--workers', type=int, help='gunicorn worker 数（默认按 gunicorn.conf.py）')
+        parser.add_argument('--threads', type=int, help='gthread 每个 worker 的线程数')
+        parser.add_argument('--asgi', action='store_true', help='以 ASGI 模式（uvicorn worker）启动')
+        parser.add_argument('--url', help='压测已运行的服务（如 http://127.0.0.1:8062），'
+                                          '不启动本地服务，需先用 seed_loadtest 准备数据')
+        parser.add_argument('--workdir', help='数据库、媒体文件、缓存与服务日志目录（默认临时目录，结束后删除）')
+        parser.add_argument('--timeout', type=float, default=60, help='单个请求超时（秒）')
+        parser.add_argument('--output', help='结果保存为JSON文件')
+        parser.add_argument('--baseline', help='与之前保存的JSON结果对比，出现性能回退时返回非0')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='对比时允许的 p95 延迟增长与吞吐量下降比例')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.mix = self.parse_mix(options['mix'])
+        self.image = sample_image()
+
+        workdir = options['workdir'] or tempfile.mkdtemp(prefix='nongji-loadtest-')
+        self.server = self.ocr_stub = None
+        try:
+            if options['url']:
+                parts = urlsplit(options['url'])
+                self.host, self.port = parts.hostname, parts.port or 80
+            else:
+                self.start_stack(workdir)
+            self.prefix = '/api/v1/'
+            results = self.run_load()
+        finally:
+            self.stop_stack()
+            if not options['workdir']:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        self.print_results(results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"\n结果已保存: {options['output']}")
+        if options['baseline']:
+            self.compare(results, options['baseline'])
+
+    def parse_mix(self, value):
+        mix = dict(DEFAULT_MIX)
+        for item in filter(None, value.split(',')):
+            name, _, weight = item.partition('=')
+            if name not in mix:
+                raise CommandError(f"未知的请求类型: {name}（可选: {', '.join(DEFAULT_MIX)}）")
+            mix[name] = float(weight)
+        mix = {name: weight for name, weight in mix.items() if weight > 0}
+        if not mix:
+            raise CommandError('请求比例不能全部为0')
+        return mix
+
+    # ---------- 本地服务 ----------
+
+    def start_stack(self, workdir):
+        self.ocr_stub = start_ocr_stub(self.options['ocr_latency'] / 1000)
+        env = dict(
+            os.environ,
+            DEBUG='False',
+            SQLITE_PATH=os.path.join(workdir, 'db.sqlite3'),
+            MEDIA_ROOT=os.path.join(workdir, 'media'),
+            CACHE_LOCATION=os.path.join(workdir, 'cache'),
+            METRICS_DIR=os.path.join(workdir, 'metrics'),
+            PROFILING_DIR=os.path.join(workdir, 'profiles'),
+            CHUNKED_UPLOAD_DIR=os.path.join(workdir, 'upload_sessions'),
+            ALIBABA_CLOUD_OCR_ENDPOINT=f'127.0.0.1:{self.ocr_stub.server_port}',
+            ALIBABA_CLOUD_OCR_PROTOCOL='http',
+        )
+        manage = [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py')]
+        self.stdout.write(f'工作目录: {workdir}')
+        subprocess.run([*manage, 'migrate', '--noinput'], cwd=settings.BASE_DIR, env=env,
+                       check=True, capture_output=True)
+        subprocess.run([
+            *manage, 'seed_loadtest',
+            '--users', str(self.options['users']),
+            '--records-per-user', str(self.options['records_per_user']),
+            '--prefix', self.options['prefix'],
+            '--password', self.options['password'],
+        ], cwd=settings.BASE_DIR, env=env, check=True)
+
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.host, self.port = '127.0.0.1', sock.getsockname()[1]
+        app = 'config.asgi:application' if self.options['asgi'] else 'config.wsgi:application'
+        if self.options['asgi']:
+            env['GUNICORN_WORKER_CLASS'] = 'uvicorn.workers.UvicornWorker'
+        if self.options['workers']:
+            env['GUNICORN_WORKERS'] = str(self.options['workers'])
+        if self.options['threads']:
+            env['GUNICORN_THREADS'] = str(self.options['threads'])
+
+        self.server_log = open(os.path.join(workdir, 'gunicorn.log'), 'w+')
+        self.server = subprocess.Popen([
+            sys.executable, '-m', 'gunicorn', app,
+            '--config', os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'),
+            '--bind', f'{self.host}:{self.port}',
+        ], cwd=settings.BASE_DIR, env=env, stdout=self.server_log, stderr=subprocess.STDOUT)
+        self.wait_for_server()
+
+    def wait_for_server(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.server.poll() is not None:
+                break
+            try:
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=2)
+                conn.request('GET', '/api/v1/auth/profile/')
+                conn.getresponse().read()
+                conn.close()
+                self.stdout.write(f'gunicorn 已启动: http://{self.host}:{self.port}/')
+                return
+            except OSError:
+                time.sleep(0.2)
+        self.server_log.seek(0)
+        raise CommandError(f'gunicorn 启动失败:\n{self.server_log.read()[-3000:]}')
+
+    def stop_stack(self):
+        if self.server is not None and self.server.poll() is None:
+            self.server.send_signal(signal.SIGTERM)
+            try:
+                self.server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.server.kill()
+        if self.server is not None:
+            self.server_log.close()
+        if self.ocr_stub is not None:
+            self.ocr_stub.shutdown()
+
+    # ---------- 压测 ----------
+
+    def run_load(self):
+        users = [VirtualUser(self, i) for i in range(self.options['concurrency'])]
+        started_at = datetime.now()
+        self.measure_from = time.perf_counter() + self.options['warmup']
+        self.deadline = self.measure_from + self.options['duration']
+        self.stdout.write(
+            f"压测 {self.options['duration']:g} 秒（预热 {self.options['warmup']:g} 秒），"
+            f"{self.options['concurrency']} 个并发用户"
+        )
+        threads = [threading.Thread(target=user.run, daemon=True) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - self.measure_from
+
+        merged = {}
+        for user in users:
+            for name, stat in user.stats.items():
+                target = merged.setdefault(name, {'latencies': [], 'errors': 0, 'statuses': Counter()})
+                target['latencies'].extend(stat['latencies'])
+                target['errors'] += stat['errors']
+                target['statuses'].update(stat['statuses'])
+
+        endpoints = {name: self.summarize(stat, elapsed) for name, stat in sorted(merged.items())}
+        total = self.summarize({
+            'latencies': [value for stat in merged.values() for value in stat['latencies']],
+            'errors': sum(stat['errors'] for stat in merged.values()),
+            'statuses': sum((stat['statuses'] for stat in merged.values()), Counter()),
+        }, elapsed)
+        return {
+            'meta': self.describe(started_at, elapsed),
+            'endpoints': endpoints,
+            'total': total,
+        }
+
+    @staticmethod
+    def summarize(stat, elapsed):
+        latencies = sorted(stat['latencies'])
+        count = len(latencies)
+        return {
+            'requests': count,
+            'errors': stat['errors'],
+            'error_rate': stat['errors'] / count if count else 0.0,
+            'rps': count / elapsed if elapsed > 0 else 0.0,
+            'mean_ms': sum(latencies) / count * 1000 if count else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'max_ms': latencies[-1] * 1000 if count else 0.0,
+            'statuses': {str(code): n for code, n in sorted(stat['statuses'].items())},
+        }
+
+    def describe(self, started_at, elapsed):
+        """运行环境与参数，便于对比不同硬件与版本的结果"""
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = ''
+        options = self.options
+        return {
+            'started_at': started_at.isoformat(timespec='seconds'),
+            'duration': elapsed,
+            'warmup': options['warmup'],
+            'concurrency': options['concurrency'],
+            'mix': self.mix,
+            'users': options['users'],
+            'records_per_user': options['records_per_user'],
+            'ocr_latency_ms': options['ocr_latency'],
+            'target': options['url'] or 'local',
+            'server': {
+                'mode': 'asgi' if options['asgi'] else 'wsgi',
+                'workers': options['workers'],
+                'threads': options['threads'],
+            },
+            'git_commit': commit,
+            'cpu_count': os.cpu_count(),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+        }
+
+    # ---------- 输出 ----------
+
+    def print_results(self, results):
+        header = f"{'接口':<40}{'请求数':>8}{'错误率':>9}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'最大':>9}"
+        self.stdout.write(f'\n{header}\n' + '-' * 102)
+        rows = list(results['endpoints'].items()) + [('合计', results['total'])]
+        for name, row in rows:
+            line = (
+                f"{name:<40}{row['requests']:>10}{row['error_rate']:>10.2%}{row['rps']:>9.1f}"
+                f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['max_ms']:>9.1f}"
+            )
+            self.stdout.write(self.style.ERROR(line) if row['errors'] else line)
+        self.stdout.write('（延迟单位：毫秒）')
+
+    def compare(self, results, baseline_path):
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        tolerance = self.options['tolerance']
+        regressions = []
+        self.stdout.write(f'\n与基线对比: {baseline_path}（{baseline["meta"].get("git_commit", "")}）')
+        for name, row in results['endpoints'].items():
+            base = baseline['endpoints'].get(name)
+            if not base or not base['requests']:
+                continue
+            p95_change = row['p95_ms'] / base['p95_ms'] - 1 if base['p95_ms'] else 0.0
+            rps_change = row['rps'] / base['rps'] - 1 if base['rps'] else 0.0
+            problems = []
+            if p95_change > tolerance:
+                problems.append(f'p95 {base["p95_ms"]:.1f} -> {row["p95_ms"]:.1f} ms')
+            if rps_change < -tolerance:
+                problems.append(f'吞吐量 {base["rps"]:.1f} -> {row["rps"]:.1f} req/s')
+            if row['error_rate'] > base['error_rate'] + 0.01:
+                problems.append(f'错误率 {base["error_rate"]:.2%} -> {row["error_rate"]:.2%}')
+            line = f'  {name:<40}p95 {p95_change:+.0%}  吞吐量 {rps_change:+.0%}'
+            if problems:
+                regressions.append(f"{name}: {'，'.join(problems)}")
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        if regressions:
+            raise CommandError('性能回退:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('未发现性能回退'))
@@ -0,0 +1,103 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+# 在子进程中模拟 worker 启动：加载 WSGI 应用后处理第一个请求
+PROBE_SCRIPT = '''
+import json
+import sys
+import time
+
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+setup = time.perf_counter() - start
+
+from wsgiref.util import setup_testing_defaults
+environ = {'PATH_INFO': sys.argv[1], 'REQUEST_METHOD': 'GET'}
+setup_testing_defaults(environ)
+statuses = []
+b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+first_request = time.perf_counter() - start - setup
+
+print(json.dumps({'setup': setup, 'first_request': first_request, 'status': statuses[0]}))
+'''
+
+# 按需加载的重量级依赖，启动阶段不应出现在导入列表中
+HEAVY_PACKAGES = ['docxtpl', 'docx', 'PIL', 'alibabacloud_ocr_api20210707']
+
+
+class Command(BaseCommand):
+    help = '分析启动耗时：模块导入的累计耗时（-X importtime）与首个请求耗时'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/api/v1/inspections/', help='首个请求的路径')
+        parser.add_argument('--runs', type=int, default=3, help='计时的运行次数（取中位数）')
+        parser.add_argument('--top', type=int, default=20, help='输出导入耗时最高的前N个顶层包')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get(
+            'DJANGO_SETTINGS_MODULE', 'config.settings'
+        ))
+
+        # 计时不开启 -X importtime，避免其自身开销
+        timings = [self.probe(options['url'], env) for _ in range(options['runs'])]
+        self.stdout.write(f"运行 {options['runs']} 次（中位数），首个请求 GET {options['url']}")
+        for key, label in [('process', '进程总耗时'), ('setup', 'Django 启动'), ('first_request', '首个请求')]:
+            value = statistics.median(t[key] for t in timings)
+            self.stdout.write(f'  {label:<12}{value * 1000:>10.1f} ms')
+        self.stdout.write(f"  响应状态: {timings[-1]['status']}")
+
+        imports = self.probe_imports(options['url'], env)
+        packages = {}
+        for name, (self_us, _) in imports.items():
+            top = name.split('.')[0]
+            packages[top] = packages.get(top, 0) + self_us
+        top_level = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:options['top']]
+        self.stdout.write(
+            f"\n导入耗时前 {options['top']} 的顶层包（-X importtime，包内全部模块自身耗时之和）"
+        )
+        for name, total in top_level:
+            self.stdout.write(f'  {name:<40}{total / 1000:>10.1f} ms')
+        self.stdout.write(f"  {'合计':<38}{sum(packages.values()) / 1000:>10.1f} ms")
+
+        loaded = [name for name in HEAVY_PACKAGES if name in imports]
+        if loaded:
+            self.stdout.write(self.style.WARNING('\n启动阶段已加载重量级依赖（累计耗时）:'))
+            for name in loaded:
+                self.stdout.write(f'  {name:<40}{imports[name][1] / 1000:>10.1f} ms')
+        else:
+            self.stdout.write(self.style.SUCCESS(f"\n启动阶段未加载: {', '.join(HEAVY_PACKAGES)}"))
+
+    def probe(self, url, env):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-c', PROBE_SCRIPT, url],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True
+        )
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        data['process'] = time.perf_counter() - start
+        return data
+
+    def probe_imports(self, url, env):
+        """解析 -X importtime 输出：模块名 -> (自身耗时, 累计耗时)，单位微秒"""
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE_SCRIPT, url],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True
+        )
+        imports = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            parts = line[len('import time:'):].split('|')
+            if len(parts) != 3 or not parts[0].strip().isdigit():
+                continue
+            imports[parts[2].strip()] = (int(parts[0]), int(parts[1]))
+        return imports
@@ -0,0 +1,72 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+from apps.inspection.models import InspectionRecord, ArchivedInspectionRecord, InspectionDailyStat
+
+
+class Command(BaseCommand):
+    help = '根据检验记录重新核对每日统计（回填/修正增量维护产生的偏差）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', help='起始日期 YYYY-MM-DD，默认全部')
+        parser.add_argument('--end-date', help='结束日期 YYYY-MM-DD，默认全部')
+        parser.add_argument('--dry-run', action='store_true', help='仅输出差异，不写入')
+
+    def handle(self, *args, **options):
+        stats = InspectionDailyStat.objects.all()
+        if options['start_date']:
+            stats = stats.filter(date__gte=options['start_date'])
+        if options['end_date']:
+            stats = stats.filter(date__lte=options['end_date'])
+
+        # 已归档的记录仍计入每日统计
+        expected = Counter()
+        for model in (InspectionRecord, ArchivedInspectionRecord):
+            records = model.objects.annotate(date=TruncDate('created_at'))
+            if options['start_date']:
+                records = records.filter(date__gte=options['start_date'])
+            if options['end_date']:
+                records = records.filter(date__lte=options['end_date'])
+            for row in records.values('date', 'vehicle_type', 'created_by_id').annotate(count=Count('id')).order_by():
+                expected[(row['date'], row['vehicle_type'], row['created_by_id'])] += row['count']
+        actual = {}
+        for stat in stats.iterator():
+            key = (stat.date, stat.vehicle_type, stat.inspector_id)
+            # 重复行（检验员为空时唯一约束不生效）合并处理
+            actual.setdefault(key, []).append(stat)
+
+        to_create = []
+        to_update = []
+        to_delete = []
+        for key, count in expected.items():
+            rows = actual.pop(key, [])
+            if not rows:
+                to_create.append(InspectionDailyStat(
+                    date=key[0], vehicle_type=key[1], inspector_id=key[2], count=count
+                ))
+                continue
+            first, duplicates = rows[0], rows[1:]
+            to_delete.extend(duplicates)
+            if first.count != count:
+                first.count = count
+                to_update.append(first)
+        for rows in actual.values():
+            to_delete.extend(rows)
+
+        self.stdout.write(
+            f'新增: {len(to_create)}  修正: {len(to_update)}  删除: {len(to_delete)}'
+        )
+        if options['dry_run']:
+            for stat in to_create + to_update:
+                self.stdout.write(f'  {stat.date} {stat.vehicle_type or "-"} 检验员#{stat.inspector_id}: {stat.count}')
+            return
+
+        with transaction.atomic():
+            InspectionDailyStat.objects.bulk_create(to_create, batch_size=1000)
+            InspectionDailyStat.objects.bulk_update(to_update, ['count'], batch_size=1000)
+            InspectionDailyStat.objects.filter(pk__in=[stat.pk for stat in to_delete]).delete()
+        self.stdout.write(self.style.SUCCESS('每日统计核对完成'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from apps.inspection.models import InspectionRecord, ArchivedInspectionRecord, Vehicle
+
+
+class Command(BaseCommand):
+    help = '根据已有检验记录生成/更新农机档案'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每批读取的记录数')
+
+    def handle(self, *args, **options):
+        total = 0
+        # 先处理归档记录再处理检验记录，各自按更新时间升序，较新的记录覆盖较旧的记录
+        for model in (ArchivedInspectionRecord, InspectionRecord):
+            records = (
+                model.objects
+                .only('id', 'updated_at', *Vehicle.SYNC_FIELDS)
+                .order_by('updated_at', 'id')
+                .iterator(chunk_size=options['batch_size'])
+            )
+            for record in records:
+                Vehicle.update_from_record(record)
+                total += 1
+                if total % 1000 == 0:
+                    self.stdout.write(f'已处理 {total} 条记录')
+        self.stdout.write(self.style.SUCCESS(
+            f'处理完成：{total} 条记录，农机档案 {Vehicle.objects.count()} 条'
+        ))
@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.inspection.models import ArchivedInspectionRecord
+from apps.inspection.services import InspectionArchiveService
+
+
+class Command(BaseCommand):
+    help = '将归档的检验记录移回检验记录表（之后可修改/删除）；创建时间早于保留期的记录会在下次归档时再次移入'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='要恢复的记录ID')
+        parser.add_argument('--user', help='恢复该用户（用户名）的全部归档记录')
+        parser.add_argument('--batch-size', type=int, default=500, help='每批（每个事务）恢复的记录数')
+
+    def handle(self, *args, **options):
+        if not options['ids'] and not options['user']:
+            raise CommandError('请指定记录ID或 --user')
+
+        queryset = ArchivedInspectionRecord.objects.all()
+        user = None
+        if options['user']:
+            user = get_user_model().objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f'用户不存在: {options["user"]}')
+            queryset = queryset.filter(created_by=user)
+        if options['ids']:
+            queryset = queryset.filter(pk__in=options['ids'])
+
+        ids = list(queryset.order_by('id').values_list('id', flat=True))
+        total = 0
+        for start in range(0, len(ids), options['batch_size']):
+            total += InspectionArchiveService.restore(ids[start:start + options['batch_size']], user)
+            self.stdout.write(f'已恢复 {total} 条记录')
+        self.stdout.write(self.style.SUCCESS(f'恢复完成：{total} 条记录'))
@@ -0,0 +1,98 @@
+import random
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.inspection.models import InspectionRecord
+from apps.inspection.services import InspectionBulkService
+from apps.users.models import SystemConfig, User
+
+
+VEHICLE_TYPES = ['轮式拖拉机', '履带拖拉机', '联合收割机', '手扶拖拉机']
+BRANDS = ['东方红', '雷沃', '约翰迪尔', '久保田', '沃得']
+REGIONS = ['豫A', '豫B', '豫C', '豫D', '豫E']
+
+
+class Command(BaseCommand):
+    help = '生成压测数据：压测账号（可使用OCR）及其检验记录，供 loadtest 命令使用'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='压测账号数')
+        parser.add_argument('--records-per-user', type=int, default=200, help='每个账号的检验记录数')
+        parser.add_argument('--prefix', default='loadtest_', help='账号用户名前缀')
+        parser.add_argument('--password', default='loadtest', help='账号密码')
+        parser.add_argument('--reset', action='store_true', help='先删除已有压测账号的检验记录')
+        parser.add_argument('--seed', type=int, default=0, help='随机数种子（数据可复现）')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        users = self.ensure_users(options['prefix'], options['password'], options['users'])
+        self.ensure_ocr_config()
+
+        if options['reset']:
+            deleted, _ = InspectionRecord.objects.filter(created_by__in=users).delete()
+            self.stdout.write(f'已删除 {deleted} 条旧记录')
+
+        total = 0
+        for user in users:
+            missing = options['records_per_user'] - InspectionRecord.objects.filter(created_by=user).count()
+            # 通过批量同步服务写入，变更日志、统计表、农机档案与正常提交一致
+            while missing > 0:
+                size = min(missing, InspectionBulkService.MAX_ITEMS)
+                items = [self.fake_record(rng) for _ in range(size)]
+                InspectionBulkService.save(user, items, False)
+                missing -= size
+                total += size
+
+        self.stdout.write(self.style.SUCCESS(
+            f"压测账号 {len(users)} 个（{options['prefix']}0..{len(users) - 1}，"
+            f"密码 {options['password']}），新增检验记录 {total} 条"
+        ))
+
+    def ensure_users(self, prefix, password, count):
+        existing = {user.username: user for user in User.objects.filter(username__startswith=prefix)}
+        template = User(username=prefix)
+        template.set_password(password)
+        users = []
+        with transaction.atomic():
+            for i in range(count):
+                username = f'{prefix}{i}'
+                user = existing.get(username)
+                if user is None:
+                    # 复用同一个密码哈希，避免逐个计算 PBKDF2
+                    user = User.objects.create(
+                        username=username, password=template.password, role=User.Role.OCR_USER
+                    )
+                users.append(user)
+        return users
+
+    def ensure_ocr_config(self):
+        """OCR接口需要一条启用的配置，压测环境下请求发往本地模拟服务"""
+        if SystemConfig.get_active_config() is None:
+            SystemConfig.objects.create(
+                name='loadtest', access_key_id='loadtest', access_key_secret='loadtest',
+                is_active=True, remark='压测数据'
+            )
+
+    @staticmethod
+    def fake_record(rng):
+        registered = date(2015, 1, 1) + timedelta(days=rng.randrange(3000))
+        return {
+            'license_plate_number': f'{rng.choice(REGIONS)}{rng.randrange(100000):05d}',
+            'vehicle_type': rng.choice(VEHICLE_TYPES),
+            'owner': f'农户{rng.randrange(10000)}',
+            'address': f'河南省郑州市某县某乡{rng.randrange(100)}号',
+            'chassis_number': f'LS{rng.randrange(10 ** 10):010d}',
+            'engine_number': f'E{rng.randrange(10 ** 8):08d}',
+            'brand': rng.choice(BRANDS),
+            'model_name': f'LX{rng.randrange(100, 2000)}',
+            'registration_date': registered.isoformat(),
+            'issue_date': registered.isoformat(),
+            'issue_authority': '郑州市农业机械管理局',
+            'tractor_min_weight': f'{rng.randrange(1500, 6000)}kg',
+            'harvester_weight': f'{rng.randrange(3000, 9000)}kg',
+            'tractor_max_load': f'{rng.randrange(500, 3000)}kg',
+            'passenger_capacity': f'{rng.randrange(1, 3)}人',
+            'overall_dimension': f'{rng.randrange(3000, 6000)}×{rng.randrange(1500, 2500)}×{rng.randrange(2000, 3200)}',
+        }
@@ -0,0 +1,162 @@
+"""
+媒体文件下发
+- 权限：超级管理员可访问全部文件，其他用户只能访问自己检验记录（含已归档记录）引用的图片（含衍生图）
+- 认证：接口返回的图片地址为短期签名地址（小程序 <image> 组件无法携带 Authorization 请求头），
+  签名覆盖文件路径 + 用户 + 签发时间，有效期 MEDIA_URL_EXPIRE_SECONDS；也可使用请求头/会话认证访问
+- 生产环境配置 MEDIA_ACCEL_REDIRECT_PREFIX 后交由 nginx 通过 X-Accel-Redirect 发送文件；
+  未配置时由 Django 使用 FileResponse（wsgi.file_wrapper / sendfile）发送，支持 Range 请求
+"""
+import mimetypes
+import os
+import re
+import time
+from functools import reduce
+from operator import or_
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.exceptions import SuspiciousFileOperation
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from rest_framework.exceptions import NotAuthenticated, PermissionDenied
+from rest_framework.permissions import AllowAny
+from rest_framework.views import APIView
+
+from .models import InspectionRecord, ArchivedInspectionRecord, IMAGE_FIELDS
+from .services import ImageDerivativeService
+from .storage import media_storage
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# 内容寻址的文件名不会变化，允许客户端长期缓存
+MEDIA_CACHE_CONTROL = 'private, max-age=604800, immutable'
+
+MEDIA_URL_SALT = 'inspection.media'
+
+
+def _expire_seconds():
+    return getattr(settings, 'MEDIA_URL_EXPIRE_SECONDS', 3600)
+
+
+def media_url_epoch():
+    """
+    签名地址的签发时间：按半个有效期取整，同一周期内地址不变（列表缓存、客户端图片缓存可复用），
+    签发的地址至少还有半个有效期
+    """
+    step = max(_expire_seconds() // 2, 1)
+    return int(time.time()) // step * step
+
+
+class MediaURLSigner(signing.TimestampSigner):
+    """签发时间取 media_url_epoch() 的 TimestampSigner"""
+    
+    def __init__(self):
+        super().__init__(salt=MEDIA_URL_SALT)
+    
+    def timestamp(self):
+        return signing.b62_encode(media_url_epoch())
+
+
+def signed_media_url(name, user):
+    """文件名对应的签名地址，仅对签发时的用户有效"""
+    value = f'{user.pk}:{name}'
+    signature = MediaURLSigner().sign(value)[len(value) + 1:]
+    return f'{media_storage.url(name)}?{urlencode({"uid": user.pk, "sig": signature})}'
+
+
+def signed_user(query_params, name):
+    """校验签名地址，返回签发时的用户；签名无效、过期或用户已停用时抛出 PermissionDenied"""
+    uid = query_params.get('uid', '')
+    try:
+        MediaURLSigner().unsign(f'{uid}:{name}:{query_params["sig"]}', max_age=_expire_seconds())
+    except signing.BadSignature:
+        raise PermissionDenied('图片链接无效或已过期')
+    user = get_user_model().objects.filter(pk=uid, is_active=True).first()
+    if user is None:
+        raise PermissionDenied('图片链接无效或已过期')
+    return user
+
+
+def can_access(user, name):
+    """用户是否可以访问该媒体文件"""
+    if user.is_superuser:
+        return True
+    owner = ImageDerivativeService.original_name(name) or name
+    condition = reduce(or_, (Q(**{field: owner}) for field in IMAGE_FIELDS))
+    # 先按创建人过滤（走索引），只在该用户的记录中匹配文件名；热表未命中再查归档表
+    return any(
+        model.objects.filter(created_by=user).filter(condition).exists()
+        for model in (InspectionRecord, ArchivedInspectionRecord)
+    )
+
+
+def _file_iterator(path, start, length, chunk_size=64 * 1024):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, path, content_type):
+    """发送文件，支持单段 Range 请求"""
+    size = os.path.getsize(path)
+    match = RANGE_RE.match(request.META.get('HTTP_RANGE', '').strip())
+    if match and any(match.groups()):
+        start, end = match.groups()
+        if start:
+            start, end = int(start), min(int(end) if end else size - 1, size - 1)
+        else:
+            # bytes=-N 表示最后 N 个字节
+            start, end = max(size - int(end), 0), size - 1
+        if start > end or start >= size:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        response = StreamingHttpResponse(
+            _file_iterator(path, start, end - start + 1), status=206, content_type=content_type
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+class MediaFileView(APIView):
+    """受权限控制的媒体文件：签名地址或请求头/会话认证"""
+    permission_classes = [AllowAny]
+    
+    def get(self, request, name):
+        if 'sig' in request.query_params:
+            user = signed_user(request.query_params, name)
+        elif request.user.is_authenticated:
+            user = request.user
+        else:
+            raise NotAuthenticated
+        
+        try:
+            path = media_storage.path(name)
+        except SuspiciousFileOperation:
+            raise Http404
+        
+        # 无权限与文件不存在返回相同结果，不暴露文件是否存在
+        if not os.path.isfile(path) or not can_access(user, name):
+            raise Http404
+        
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '')
+        if prefix:
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(name)
+        else:
+            response = serve_file(request, path, content_type)
+        response['Cache-Control'] = MEDIA_CACHE_CONTROL
+        return response
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.27 on 2026-10-19 01:38
+
+from django.db import migrations, models
+
+
+def seed_changes(apps, schema_editor):
+    """为已有记录生成变更行，客户端从游标0开始即可全量同步"""
+    InspectionRecord = apps.get_model('inspection', 'InspectionRecord')
+    InspectionChange = apps.get_model('inspection', 'InspectionChange')
+    rows = InspectionRecord.objects.order_by('id').values_list('id', 'created_by_id').iterator()
+    batch = []
+    for record_id, user_id in rows:
+        batch.append(InspectionChange(record_id=record_id, user_id=user_id))
+        if len(batch) >= 1000:
+            InspectionChange.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        InspectionChange.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspection', '0004_remove_inspectionrecord_ocr_raw_data_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InspectionChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False, verbose_name='变更序号')),
+                ('record_id', models.BigIntegerField(unique=True, verbose_name='检验记录ID')),
+                ('user_id', models.BigIntegerField(null=True, verbose_name='所属用户ID')),
+                ('deleted', models.BooleanField(default=False, verbose_name='是否已删除')),
+                ('changed_at', models.DateTimeField(auto_now=True, verbose_name='变更时间')),
+            ],
+            options={
+                'verbose_name': '检验记录变更',
+                'verbose_name_plural': '检验记录变更',
+                'db_table': 'inspection_change',
+                'indexes': [models.Index(fields=['user_id', 'seq'], name='inspection_change_user_seq')],
+            },
+        ),
+        migrations.RunPython(seed_changes, migrations.RunPython.noop),
+    ]
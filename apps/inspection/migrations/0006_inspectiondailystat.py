@@ -0,0 +1,60 @@
+# Generated by Django 4.2.27 on 2026-10-19 01:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_stats(apps, schema_editor):
+    """根据已有记录生成每日统计"""
+    InspectionRecord = apps.get_model('inspection', 'InspectionRecord')
+    InspectionDailyStat = apps.get_model('inspection', 'InspectionDailyStat')
+    rows = (
+        InspectionRecord.objects
+        .annotate(date=TruncDate('created_at'))
+        .values('date', 'vehicle_type', 'created_by_id')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    InspectionDailyStat.objects.bulk_create([
+        InspectionDailyStat(
+            date=row['date'], vehicle_type=row['vehicle_type'],
+            inspector_id=row['created_by_id'], count=row['count']
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('inspection', '0005_inspectionchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InspectionDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('vehicle_type', models.CharField(blank=True, max_length=50, verbose_name='类型')),
+                ('count', models.IntegerField(default=0, verbose_name='检验数量')),
+                ('inspector', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='检验员')),
+            ],
+            options={
+                'verbose_name': '每日统计',
+                'verbose_name_plural': '每日统计',
+                'db_table': 'inspection_daily_stat',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date'], name='inspection_daily_stat_date')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='inspectiondailystat',
+            constraint=models.UniqueConstraint(fields=('date', 'vehicle_type', 'inspector'), name='inspection_daily_stat_unique'),
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
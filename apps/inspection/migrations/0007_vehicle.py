@@ -0,0 +1,45 @@
+# Generated by Django 4.2.27 on 2026-10-19 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspection', '0006_inspectiondailystat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Vehicle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plate_key', models.CharField(max_length=20, unique=True, verbose_name='规范化号牌')),
+                ('license_plate_number', models.CharField(max_length=20, verbose_name='号牌号码')),
+                ('vehicle_type', models.CharField(blank=True, max_length=50, verbose_name='类型')),
+                ('chassis_number', models.CharField(blank=True, db_index=True, max_length=50, verbose_name='底盘号/机架号')),
+                ('trailer_frame_number', models.CharField(blank=True, max_length=50, verbose_name='挂车架号码')),
+                ('engine_number', models.CharField(blank=True, max_length=50, verbose_name='发动机号码')),
+                ('brand', models.CharField(blank=True, max_length=50, verbose_name='品牌')),
+                ('model_name', models.CharField(blank=True, max_length=50, verbose_name='型号名称')),
+                ('registration_date', models.DateField(blank=True, null=True, verbose_name='登记日期')),
+                ('issue_date', models.DateField(blank=True, null=True, verbose_name='发证日期')),
+                ('issue_authority', models.CharField(blank=True, max_length=100, verbose_name='发证机关')),
+                ('tractor_min_weight', models.CharField(blank=True, max_length=50, verbose_name='拖拉机最小使用质量')),
+                ('harvester_weight', models.CharField(blank=True, max_length=50, verbose_name='联合收割机质量')),
+                ('tractor_max_load', models.CharField(blank=True, max_length=50, verbose_name='拖拉机最大允许载质量')),
+                ('passenger_capacity', models.CharField(blank=True, max_length=20, verbose_name='准乘人数')),
+                ('overall_dimension', models.CharField(blank=True, max_length=50, verbose_name='外廓尺寸(毫米)')),
+                ('body_color', models.CharField(blank=True, max_length=50, verbose_name='机身颜色')),
+                ('production_date', models.DateField(blank=True, null=True, verbose_name='生产日期')),
+                ('last_record_id', models.BigIntegerField(blank=True, null=True, verbose_name='最近检验记录ID')),
+                ('last_inspected_at', models.DateTimeField(blank=True, null=True, verbose_name='最近检验时间')),
+            ],
+            options={
+                'verbose_name': '农机档案',
+                'verbose_name_plural': '农机档案',
+                'db_table': 'vehicle',
+                'ordering': ['-last_inspected_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.27 on 2026-10-19 01:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspection', '0007_vehicle'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inspectionrecord',
+            index=models.Index(fields=['created_by', '-created_at'], name='inspection_user_created'),
+        ),
+        migrations.AddIndex(
+            model_name='inspectionrecord',
+            index=models.Index(fields=['-created_at'], name='inspection_created_at'),
+        ),
+        migrations.AddIndex(
+            model_name='inspectionrecord',
+            index=models.Index(fields=['chassis_number'], name='inspection_chassis_number'),
+        ),
+        migrations.AddIndex(
+            model_name='inspectionrecord',
+            index=models.Index(fields=['engine_number'], name='inspection_engine_number'),
+        ),
+        migrations.AddIndex(
+            model_name='inspectionrecord',
+            index=models.Index(fields=['owner'], name='inspection_owner'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.27 on 2026-10-19 01:43
+
+from collections import Counter
+
+import apps.inspection.storage
+from django.db import migrations, models
+
+
+IMAGE_FIELDS = [
+    'license_front_image', 'license_back_image', 'plate_image',
+    'brake_report_image', 'headlight_report_image',
+]
+
+
+def seed_refcounts(apps, schema_editor):
+    """统计已有记录对图片文件的引用次数"""
+    InspectionRecord = apps.get_model('inspection', 'InspectionRecord')
+    MediaBlob = apps.get_model('inspection', 'MediaBlob')
+    counts = Counter()
+    for row in InspectionRecord.objects.values_list(*IMAGE_FIELDS).iterator():
+        counts.update(name for name in row if name)
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name, refcount=count) for name, count in counts.items()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspection', '0008_inspection_record_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='文件路径')),
+                ('refcount', models.IntegerField(default=0, verbose_name='引用次数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '媒体文件',
+                'verbose_name_plural': '媒体文件',
+                'db_table': 'media_blob',
+            },
+        ),
+        migrations.AlterField(
+            model_name='inspectionrecord',
+            name='brake_report_image',
+            field=models.ImageField(blank=True, storage=apps.inspection.storage.ContentAddressedStorage(), upload_to='inspection/brake/', verbose_name='制动性能检验报告图片'),
+        ),
+        migrations.AlterField(
+            model_name='inspectionrecord',
+            name='headlight_report_image',
+            field=models.ImageField(blank=True, storage=apps.inspection.storage.ContentAddressedStorage(), upload_to='inspection/headlight/', verbose_name='前照灯检验报告图片'),
+        ),
+        migrations.AlterField(
+            model_name='inspectionrecord',
+            name='license_back_image',
+            field=models.ImageField(blank=True, storage=apps.inspection.storage.ContentAddressedStorage(), upload_to='inspection/license/', verbose_name='行驶证副页图片'),
+        ),
+        migrations.AlterField(
+            model_name='inspectionrecord',
+            name='license_front_image',
+            field=models.ImageField(blank=True, storage=apps.inspection.storage.ContentAddressedStorage(), upload_to='inspection/license/', verbose_name='行驶证正面图片'),
+        ),
+        migrations.AlterField(
+            model_name='inspectionrecord',
+            name='plate_image',
+            field=models.ImageField(blank=True, storage=apps.inspection.storage.ContentAddressedStorage(), upload_to='inspection/plate/', verbose_name='车牌号图片'),
+        ),
+        migrations.RunPython(seed_refcounts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 01:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspection', '0009_media_blob_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediablob',
+            name='released_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='释放时间'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.27 on 2026-10-19 01:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('inspection', '0010_mediablob_released_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('field', models.CharField(max_length=50, verbose_name='图片字段')),
+                ('filename', models.CharField(max_length=100, verbose_name='文件名')),
+                ('size', models.BigIntegerField(verbose_name='文件大小')),
+                ('received', models.BigIntegerField(default=0, verbose_name='已接收字节数')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='inspection.inspectionrecord', verbose_name='检验记录')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='上传人')),
+            ],
+            options={
+                'verbose_name': '分片上传',
+                'verbose_name_plural': '分片上传',
+                'db_table': 'upload_session',
+                'indexes': [models.Index(fields=['updated_at'], name='upload_session_updated_at')],
+            },
+        ),
+    ]
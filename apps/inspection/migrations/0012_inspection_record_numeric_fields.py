@@ -0,0 +1,72 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspection', '0011_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inspectionrecord',
+            name='harvester_weight_kg',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='联合收割机质量(kg)'),
+        ),
+        migrations.AddField(
+            model_name='inspectionrecord',
+            name='overall_height_mm',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='外廓高(毫米)'),
+        ),
+        migrations.AddField(
+            model_name='inspectionrecord',
+            name='overall_length_mm',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='外廓长(毫米)'),
+        ),
+        migrations.AddField(
+            model_name='inspectionrecord',
+            name='overall_width_mm',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='外廓宽(毫米)'),
+        ),
+        migrations.AddField(
+            model_name='inspectionrecord',
+            name='passenger_capacity_num',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='准乘人数(数值)'),
+        ),
+        migrations.AddField(
+            model_name='inspectionrecord',
+            name='tractor_max_load_kg',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='拖拉机最大允许载质量(kg)'),
+        ),
+        migrations.AddField(
+            model_name='inspectionrecord',
+            name='tractor_min_weight_kg',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='拖拉机最小使用质量(kg)'),
+        ),
+        migrations.AddIndex(
+            model_name='inspectionrecord',
+            index=models.Index(condition=models.Q(('tractor_min_weight_kg__isnull', False)), fields=['created_by', 'tractor_min_weight_kg'], name='inspection_user_min_weight'),
+        ),
+        migrations.AddIndex(
+            model_name='inspectionrecord',
+            index=models.Index(condition=models.Q(('harvester_weight_kg__isnull', False)), fields=['created_by', 'harvester_weight_kg'], name='inspection_user_harv_weight'),
+        ),
+        migrations.AddIndex(
+            model_name='inspectionrecord',
+            index=models.Index(condition=models.Q(('tractor_max_load_kg__isnull', False)), fields=['created_by', 'tractor_max_load_kg'], name='inspection_user_max_load'),
+        ),
+        migrations.AddIndex(
+            model_name='inspectionrecord',
+            index=models.Index(condition=models.Q(('overall_length_mm__isnull', False)), fields=['created_by', 'overall_length_mm'], name='inspection_user_length'),
+        ),
+        migrations.AddIndex(
+            model_name='inspectionrecord',
+            index=models.Index(condition=models.Q(('overall_width_mm__isnull', False)), fields=['created_by', 'overall_width_mm'], name='inspection_user_width'),
+        ),
+        migrations.AddIndex(
+            model_name='inspectionrecord',
+            index=models.Index(condition=models.Q(('overall_height_mm__isnull', False)), fields=['created_by', 'overall_height_mm'], name='inspection_user_height'),
+        ),
+    ]
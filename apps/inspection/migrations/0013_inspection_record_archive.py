@@ -0,0 +1,67 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:19
+
+import apps.inspection.storage
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('inspection', '0012_inspection_record_numeric_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedInspectionRecord',
+            fields=[
+                ('license_plate_number', models.CharField(db_index=True, max_length=20, verbose_name='号牌号码')),
+                ('vehicle_type', models.CharField(blank=True, max_length=50, verbose_name='类型')),
+                ('owner', models.CharField(blank=True, max_length=50, verbose_name='所有人')),
+                ('address', models.CharField(blank=True, max_length=200, verbose_name='住址')),
+                ('chassis_number', models.CharField(blank=True, max_length=50, verbose_name='底盘号/机架号')),
+                ('trailer_frame_number', models.CharField(blank=True, max_length=50, verbose_name='挂车架号码')),
+                ('engine_number', models.CharField(blank=True, max_length=50, verbose_name='发动机号码')),
+                ('brand', models.CharField(blank=True, max_length=50, verbose_name='品牌')),
+                ('model_name', models.CharField(blank=True, max_length=50, verbose_name='型号名称')),
+                ('registration_date', models.DateField(blank=True, null=True, verbose_name='登记日期')),
+                ('issue_date', models.DateField(blank=True, null=True, verbose_name='发证日期')),
+                ('issue_authority', models.CharField(blank=True, max_length=100, verbose_name='发证机关')),
+                ('tractor_min_weight', models.CharField(blank=True, max_length=50, verbose_name='拖拉机最小使用质量')),
+                ('harvester_weight', models.CharField(blank=True, max_length=50, verbose_name='联合收割机质量')),
+                ('tractor_max_load', models.CharField(blank=True, max_length=50, verbose_name='拖拉机最大允许载质量')),
+                ('passenger_capacity', models.CharField(blank=True, max_length=20, verbose_name='准乘人数')),
+                ('overall_dimension', models.CharField(blank=True, max_length=50, verbose_name='外廓尺寸(毫米)')),
+                ('inspection_record', models.CharField(blank=True, max_length=200, verbose_name='检验记录')),
+                ('tractor_min_weight_kg', models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='拖拉机最小使用质量(kg)')),
+                ('harvester_weight_kg', models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='联合收割机质量(kg)')),
+                ('tractor_max_load_kg', models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='拖拉机最大允许载质量(kg)')),
+                ('passenger_capacity_num', models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='准乘人数(数值)')),
+                ('overall_length_mm', models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='外廓长(毫米)')),
+                ('overall_width_mm', models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='外廓宽(毫米)')),
+                ('overall_height_mm', models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='外廓高(毫米)')),
+                ('brake_report_image', models.ImageField(blank=True, storage=apps.inspection.storage.ContentAddressedStorage(), upload_to='inspection/brake/', verbose_name='制动性能检验报告图片')),
+                ('headlight_report_image', models.ImageField(blank=True, storage=apps.inspection.storage.ContentAddressedStorage(), upload_to='inspection/headlight/', verbose_name='前照灯检验报告图片')),
+                ('license_front_image', models.ImageField(blank=True, storage=apps.inspection.storage.ContentAddressedStorage(), upload_to='inspection/license/', verbose_name='行驶证正面图片')),
+                ('license_back_image', models.ImageField(blank=True, storage=apps.inspection.storage.ContentAddressedStorage(), upload_to='inspection/license/', verbose_name='行驶证副页图片')),
+                ('plate_image', models.ImageField(blank=True, storage=apps.inspection.storage.ContentAddressedStorage(), upload_to='inspection/plate/', verbose_name='车牌号图片')),
+                ('plate_ocr_result', models.CharField(blank=True, max_length=50, verbose_name='车牌识别结果')),
+                ('body_color', models.CharField(blank=True, max_length=50, verbose_name='机身颜色')),
+                ('production_date', models.DateField(blank=True, null=True, verbose_name='生产日期')),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(verbose_name='更新时间')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='归档时间')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_inspections', to=settings.AUTH_USER_MODEL, verbose_name='创建人')),
+            ],
+            options={
+                'verbose_name': '归档检验记录',
+                'verbose_name_plural': '归档检验记录',
+                'db_table': 'inspection_record_archive',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_by', '-created_at'], name='inspection_archive_user')],
+            },
+        ),
+    ]
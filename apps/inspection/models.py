@@ -1,9 +1,22 @@
-from django.db import models
+import contextvars
+import os
+import re
+import unicodedata
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
 from django.conf import settings
+from django.utils import timezone
 
+from .storage import media_storage
 
-class InspectionRecord(models.Model):
-    """检验记录 - 农机行驶证"""
+
+class InspectionRecordFields(models.Model):
+    """检验记录的业务字段 - 检验记录与归档检验记录共用"""
     
     # ========== 正页信息 ==========
     license_plate_number = models.CharField(max_length=20, verbose_name='号牌号码', db_index=True)
@@ -27,20 +40,53 @@ class InspectionRecord(models.Model):
     overall_dimension = models.CharField(max_length=50, blank=True, verbose_name='外廓尺寸(毫米)')
     inspection_record = models.CharField(max_length=200, blank=True, verbose_name='检验记录')
     
+    # ========== 副页数值（由上方文字字段解析，保存时自动填充，用于范围筛选/统计） ==========
+    tractor_min_weight_kg = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name='拖拉机最小使用质量(kg)')
+    harvester_weight_kg = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name='联合收割机质量(kg)')
+    tractor_max_load_kg = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name='拖拉机最大允许载质量(kg)')
+    passenger_capacity_num = models.PositiveSmallIntegerField(null=True, blank=True, editable=False, verbose_name='准乘人数(数值)')
+    overall_length_mm = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name='外廓长(毫米)')
+    overall_width_mm = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name='外廓宽(毫米)')
+    overall_height_mm = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name='外廓高(毫米)')
+    
     # ========== 检验报告图片 ==========
-    brake_report_image = models.ImageField(upload_to='inspection/brake/', blank=True, verbose_name='制动性能检验报告图片')
-    headlight_report_image = models.ImageField(upload_to='inspection/headlight/', blank=True, verbose_name='前照灯检验报告图片')
+    brake_report_image = models.ImageField(upload_to='inspection/brake/', storage=media_storage, blank=True, verbose_name='制动性能检验报告图片')
+    headlight_report_image = models.ImageField(upload_to='inspection/headlight/', storage=media_storage, blank=True, verbose_name='前照灯检验报告图片')
 
     # ========== OCR上传图片 ==========
-    license_front_image = models.ImageField(upload_to='inspection/license/', blank=True, verbose_name='行驶证正面图片')
-    license_back_image = models.ImageField(upload_to='inspection/license/', blank=True, verbose_name='行驶证副页图片')
-    plate_image = models.ImageField(upload_to='inspection/plate/', blank=True, verbose_name='车牌号图片')
+    license_front_image = models.ImageField(upload_to='inspection/license/', storage=media_storage, blank=True, verbose_name='行驶证正面图片')
+    license_back_image = models.ImageField(upload_to='inspection/license/', storage=media_storage, blank=True, verbose_name='行驶证副页图片')
+    plate_image = models.ImageField(upload_to='inspection/plate/', storage=media_storage, blank=True, verbose_name='车牌号图片')
     plate_ocr_result = models.CharField(max_length=50, blank=True, verbose_name='车牌识别结果')
 
     # ========== Word文档需要 ==========
     body_color = models.CharField(max_length=50, blank=True, verbose_name='机身颜色')
     production_date = models.DateField(null=True, blank=True, verbose_name='生产日期')
     
+    class Meta:
+        abstract = True
+    
+    def fill_numeric_fields(self):
+        """由副页文字字段解析数值字段，返回值有变化的字段名"""
+        values = {
+            'tractor_min_weight_kg': parse_weight(self.tractor_min_weight),
+            'harvester_weight_kg': parse_weight(self.harvester_weight),
+            'tractor_max_load_kg': parse_weight(self.tractor_max_load),
+            'passenger_capacity_num': parse_count(self.passenger_capacity),
+        }
+        values.update(zip(
+            ['overall_length_mm', 'overall_width_mm', 'overall_height_mm'],
+            parse_dimension(self.overall_dimension)
+        ))
+        changed = [field for field, value in values.items() if getattr(self, field) != value]
+        for field in changed:
+            setattr(self, field, values[field])
+        return changed
+
+
+class InspectionRecord(InspectionRecordFields):
+    """检验记录 - 农机行驶证"""
+    
     # ========== 系统字段 ==========
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL, 
@@ -57,6 +103,524 @@ class InspectionRecord(models.Model):
         verbose_name = '检验记录'
         verbose_name_plural = verbose_name
         ordering = ['-created_at']
+        indexes = [
+            # 用户列表按创建时间倒序
+            models.Index(fields=['created_by', '-created_at'], name='inspection_user_created'),
+            # 后台按时间筛选/排序、按号码前缀搜索
+            models.Index(fields=['-created_at'], name='inspection_created_at'),
+            models.Index(fields=['chassis_number'], name='inspection_chassis_number'),
+            models.Index(fields=['engine_number'], name='inspection_engine_number'),
+            models.Index(fields=['owner'], name='inspection_owner'),
+            # 用户列表按数值范围筛选；部分索引，不含未填写（NULL）的记录
+            models.Index(fields=['created_by', 'tractor_min_weight_kg'], name='inspection_user_min_weight',
+                         condition=models.Q(tractor_min_weight_kg__isnull=False)),
+            models.Index(fields=['created_by', 'harvester_weight_kg'], name='inspection_user_harv_weight',
+                         condition=models.Q(harvester_weight_kg__isnull=False)),
+            models.Index(fields=['created_by', 'tractor_max_load_kg'], name='inspection_user_max_load',
+                         condition=models.Q(tractor_max_load_kg__isnull=False)),
+            models.Index(fields=['created_by', 'overall_length_mm'], name='inspection_user_length',
+                         condition=models.Q(overall_length_mm__isnull=False)),
+            models.Index(fields=['created_by', 'overall_width_mm'], name='inspection_user_width',
+                         condition=models.Q(overall_width_mm__isnull=False)),
+            models.Index(fields=['created_by', 'overall_height_mm'], name='inspection_user_height',
+                         condition=models.Q(overall_height_mm__isnull=False)),
+        ]
+    
+    def __str__(self):
+        return f"{self.license_plate_number} - {self.created_at.strftime('%Y-%m-%d') if self.created_at else ''}"
     
+    def save(self, *args, **kwargs):
+        self.fill_numeric_fields()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = numeric_update_fields(kwargs['update_fields'])
+        super().save(*args, **kwargs)
+
+
+_moving_records = contextvars.ContextVar('inspection_moving_records', default=False)
+
+
+@contextmanager
+def moving_records():
+    """
+    归档/恢复时在热表与归档表之间移动记录：记录并未新增或删除，
+    期间删除检验记录不写删除标记、不减少每日统计与图片引用计数
+    """
+    token = _moving_records.set(True)
+    try:
+        yield
+    finally:
+        _moving_records.reset(token)
+
+
+def is_moving_records():
+    return _moving_records.get()
+
+
+class ArchivedInspectionRecord(InspectionRecordFields):
+    """
+    归档检验记录 - 超过保留期的检验记录由 archive_inspections 命令移入此表（冷数据），只读
+    主键与原检验记录相同，按id查询、增量同步与导出时透明回查此表；
+    修改/删除时先移回检验记录表（InspectionArchiveService.restore）
+    """
+
+    id = models.BigIntegerField(primary_key=True, verbose_name='ID')
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='archived_inspections',
+        verbose_name='创建人'
+    )
+    created_at = models.DateTimeField(verbose_name='创建时间')
+    updated_at = models.DateTimeField(verbose_name='更新时间')
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name='归档时间')
+
+    class Meta:
+        db_table = 'inspection_record_archive'
+        verbose_name = '归档检验记录'
+        verbose_name_plural = verbose_name
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_by', '-created_at'], name='inspection_archive_user'),
+        ]
+
     def __str__(self):
         return f"{self.license_plate_number} - {self.created_at.strftime('%Y-%m-%d') if self.created_at else ''}"
+
+    @staticmethod
+    def copy_fields():
+        """与检验记录共有的字段（含主键、创建人与时间）"""
+        return [
+            field.attname for field in ArchivedInspectionRecord._meta.concrete_fields
+            if field.name != 'archived_at'
+        ]
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(**{name: getattr(record, name) for name in cls.copy_fields()})
+
+    def to_record(self):
+        """转换为（未保存的）检验记录实例，供序列化与导出使用；is_archived 为 True"""
+        record = InspectionRecord(**{name: getattr(self, name) for name in self.copy_fields()})
+        record._state.adding = False
+        record._state.db = self._state.db
+        record.is_archived = True
+        return record
+
+
+# 检验记录的图片字段
+IMAGE_FIELDS = [
+    'license_front_image',
+    'license_back_image',
+    'plate_image',
+    'brake_report_image',
+    'headlight_report_image',
+]
+
+
+def image_names(record):
+    """记录引用的图片文件名"""
+    return [name for name in (getattr(record, field).name for field in IMAGE_FIELDS) if name]
+
+
+# 数值字段 -> 来源文字字段
+NUMERIC_FIELDS = {
+    'tractor_min_weight_kg': 'tractor_min_weight',
+    'harvester_weight_kg': 'harvester_weight',
+    'tractor_max_load_kg': 'tractor_max_load',
+    'passenger_capacity_num': 'passenger_capacity',
+    'overall_length_mm': 'overall_dimension',
+    'overall_width_mm': 'overall_dimension',
+    'overall_height_mm': 'overall_dimension',
+}
+
+NUMBER_RE = re.compile(r'\d+(?:\.\d+)?')
+
+# 超出该值视为识别错误（PositiveIntegerField 上限以内）
+MAX_NUMERIC_VALUE = 10 ** 7
+# 准乘人数为 PositiveSmallIntegerField（上限 32767）
+MAX_COUNT_VALUE = 2 ** 15
+
+
+def numeric_update_fields(update_fields):
+    """update_fields 含来源文字字段时，一并保存对应的数值字段"""
+    fields = set(update_fields)
+    fields.update(field for field, source in NUMERIC_FIELDS.items() if source in fields)
+    return fields
+
+
+def _clean_text(text):
+    """全角转半角、去掉千分位逗号"""
+    return unicodedata.normalize('NFKC', text or '').lower().replace(',', '')
+
+
+def _bounded(value, maximum=MAX_NUMERIC_VALUE):
+    value = round(value)
+    return value if 0 <= value < maximum else None
+
+
+def parse_weight(text):
+    """质量转为千克：3500kg、3500千克、3.5t、3.5吨；无法解析返回 None"""
+    text = _clean_text(text)
+    match = re.search(r'(\d+(?:\.\d+)?)\s*(kg|千克|公斤|t|吨)?', text)
+    if not match:
+        return None
+    value = float(match.group(1))
+    if match.group(2) in ('t', '吨'):
+        value *= 1000
+    return _bounded(value)
+
+
+def parse_count(text):
+    """人数：1人、2"""
+    match = NUMBER_RE.search(_clean_text(text))
+    return _bounded(float(match.group()), MAX_COUNT_VALUE) if match else None
+
+
+def parse_dimension(text):
+    """
+    外廓尺寸拆分为 (长, 宽, 高) 毫米：4200×2000×2800、4200*2000*2800mm；
+    三个数都小于100且未注明 mm 时按米换算；不是三个数时返回 (None, None, None)
+    """
+    text = _clean_text(text)
+    numbers = [float(n) for n in NUMBER_RE.findall(text)]
+    if len(numbers) != 3:
+        return None, None, None
+    if 'mm' not in text and '毫米' not in text and all(n < 100 for n in numbers):
+        numbers = [n * 1000 for n in numbers]
+    return tuple(_bounded(n) for n in numbers)
+
+
+class MediaBlob(models.Model):
+    """
+    媒体文件引用计数 - 内容寻址存储下同一文件可被多条记录/多个字段引用
+    引用次数降为0时记录释放时间，作为待删除队列由 gc_media 命令清理（MEDIA_GC_QUEUE_ON_RELEASE）
+    """
+    
+    name = models.CharField(max_length=255, unique=True, verbose_name='文件路径')
+    refcount = models.IntegerField(default=0, verbose_name='引用次数')
+    released_at = models.DateTimeField(null=True, blank=True, db_index=True, verbose_name='释放时间')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        db_table = 'media_blob'
+        verbose_name = '媒体文件'
+        verbose_name_plural = verbose_name
+    
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
+    
+    @classmethod
+    def apply(cls, deltas):
+        """
+        按文件增减引用次数
+        :param deltas: {文件路径: 增量}
+        """
+        now = timezone.now()
+        released = []
+        for name, delta in Counter(deltas).items():
+            if not name or not delta:
+                continue
+            values = {'refcount': F('refcount') + delta, 'updated_at': now}
+            if delta > 0:
+                values['released_at'] = None
+            if cls.objects.filter(name=name).update(**values):
+                if delta < 0:
+                    released.append(name)
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(name=name, refcount=max(delta, 0))
+            except IntegrityError:
+                cls.objects.filter(name=name).update(**values)
+        
+        if released and getattr(settings, 'MEDIA_GC_QUEUE_ON_RELEASE', False):
+            cls.objects.filter(
+                name__in=released, refcount__lte=0, released_at__isnull=True
+            ).update(released_at=now)
+
+
+class InspectionChange(models.Model):
+    """检验记录变更日志 - 增量同步使用，每条记录只保留最新一次变更"""
+    
+    seq = models.BigAutoField(primary_key=True, verbose_name='变更序号')
+    record_id = models.BigIntegerField(unique=True, verbose_name='检验记录ID')
+    user_id = models.BigIntegerField(null=True, verbose_name='所属用户ID')
+    deleted = models.BooleanField(default=False, verbose_name='是否已删除')
+    changed_at = models.DateTimeField(auto_now=True, verbose_name='变更时间')
+    
+    class Meta:
+        db_table = 'inspection_change'
+        verbose_name = '检验记录变更'
+        verbose_name_plural = verbose_name
+        indexes = [
+            models.Index(fields=['user_id', 'seq'], name='inspection_change_user_seq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.seq} - {self.record_id}{' (已删除)' if self.deleted else ''}"
+    
+    @classmethod
+    def log(cls, records, deleted=False):
+        """
+        记录变更：删除这些记录之前的变更行，再插入新行获取更大的变更序号
+        """
+        records = [r for r in records if r.pk]
+        if not records:
+            return
+        cls.objects.filter(record_id__in=[r.pk for r in records]).delete()
+        cls.objects.bulk_create([
+            cls(record_id=r.pk, user_id=r.created_by_id, deleted=deleted)
+            for r in records
+        ])
+
+
+class InspectionDailyStat(models.Model):
+    """检验记录每日统计 - 按日期/类型/检验员预聚合，记录增删改时增量维护"""
+    
+    date = models.DateField(verbose_name='日期')
+    vehicle_type = models.CharField(max_length=50, blank=True, verbose_name='类型')
+    inspector = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='+',
+        verbose_name='检验员'
+    )
+    count = models.IntegerField(default=0, verbose_name='检验数量')
+    
+    class Meta:
+        db_table = 'inspection_daily_stat'
+        verbose_name = '每日统计'
+        verbose_name_plural = verbose_name
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'vehicle_type', 'inspector'],
+                name='inspection_daily_stat_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='inspection_daily_stat_date'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.vehicle_type or '-'} {self.count}"
+    
+    @staticmethod
+    def key_for(record):
+        """记录对应的统计维度 (日期, 类型, 检验员ID)"""
+        if not record.created_at:
+            return None
+        return (
+            timezone.localdate(record.created_at),
+            record.vehicle_type or '',
+            record.created_by_id,
+        )
+    
+    @classmethod
+    def apply(cls, deltas):
+        """
+        按维度增减计数
+        :param deltas: {(日期, 类型, 检验员ID): 增量}
+        """
+        deltas = Counter({key: delta for key, delta in deltas.items() if key and delta})
+        for (date, vehicle_type, inspector_id), delta in deltas.items():
+            lookup = {'date': date, 'vehicle_type': vehicle_type, 'inspector_id': inspector_id}
+            if cls.objects.filter(**lookup).update(count=F('count') + delta):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(count=delta, **lookup)
+            except IntegrityError:
+                # 并发创建，改为累加
+                cls.objects.filter(**lookup).update(count=F('count') + delta)
+
+
+def normalize_plate(plate):
+    """规范化号牌号码：全角转半角、去除空白及分隔符、转大写"""
+    plate = unicodedata.normalize('NFKC', plate or '')
+    return re.sub(r'[\s·•.\-_]', '', plate).upper()
+
+
+class Vehicle(models.Model):
+    """农机档案 - 按号牌去重，保存最近一次检验的车辆信息用于预填"""
+    
+    # 同步自检验记录的车辆固有信息（不含所有人/住址等个人信息）
+    SYNC_FIELDS = [
+        'license_plate_number', 'vehicle_type', 'chassis_number', 'trailer_frame_number',
+        'engine_number', 'brand', 'model_name', 'registration_date', 'issue_date',
+        'issue_authority', 'tractor_min_weight', 'harvester_weight', 'tractor_max_load',
+        'passenger_capacity', 'overall_dimension', 'body_color', 'production_date',
+    ]
+    
+    plate_key = models.CharField(max_length=20, unique=True, verbose_name='规范化号牌')
+    license_plate_number = models.CharField(max_length=20, verbose_name='号牌号码')
+    vehicle_type = models.CharField(max_length=50, blank=True, verbose_name='类型')
+    chassis_number = models.CharField(max_length=50, blank=True, db_index=True, verbose_name='底盘号/机架号')
+    trailer_frame_number = models.CharField(max_length=50, blank=True, verbose_name='挂车架号码')
+    engine_number = models.CharField(max_length=50, blank=True, verbose_name='发动机号码')
+    brand = models.CharField(max_length=50, blank=True, verbose_name='品牌')
+    model_name = models.CharField(max_length=50, blank=True, verbose_name='型号名称')
+    registration_date = models.DateField(null=True, blank=True, verbose_name='登记日期')
+    issue_date = models.DateField(null=True, blank=True, verbose_name='发证日期')
+    issue_authority = models.CharField(max_length=100, blank=True, verbose_name='发证机关')
+    tractor_min_weight = models.CharField(max_length=50, blank=True, verbose_name='拖拉机最小使用质量')
+    harvester_weight = models.CharField(max_length=50, blank=True, verbose_name='联合收割机质量')
+    tractor_max_load = models.CharField(max_length=50, blank=True, verbose_name='拖拉机最大允许载质量')
+    passenger_capacity = models.CharField(max_length=20, blank=True, verbose_name='准乘人数')
+    overall_dimension = models.CharField(max_length=50, blank=True, verbose_name='外廓尺寸(毫米)')
+    body_color = models.CharField(max_length=50, blank=True, verbose_name='机身颜色')
+    production_date = models.DateField(null=True, blank=True, verbose_name='生产日期')
+    last_record_id = models.BigIntegerField(null=True, blank=True, verbose_name='最近检验记录ID')
+    last_inspected_at = models.DateTimeField(null=True, blank=True, verbose_name='最近检验时间')
+    
+    class Meta:
+        db_table = 'vehicle'
+        verbose_name = '农机档案'
+        verbose_name_plural = verbose_name
+        ordering = ['-last_inspected_at']
+    
+    def __str__(self):
+        return self.license_plate_number
+    
+    @classmethod
+    def values_from_record(cls, record):
+        """记录中要同步到档案的非空字段"""
+        values = {
+            field: getattr(record, field)
+            for field in cls.SYNC_FIELDS
+            if getattr(record, field) not in ('', None)
+        }
+        values.update(last_record_id=record.pk, last_inspected_at=record.updated_at)
+        return values
+    
+    @classmethod
+    def update_from_record(cls, record):
+        """
+        用检验记录更新档案：只接受不早于档案的记录，空字段不覆盖已有值
+        """
+        plate_key = normalize_plate(record.license_plate_number)
+        if not plate_key:
+            return None
+        
+        values = cls.values_from_record(record)
+        
+        vehicle = cls.objects.filter(plate_key=plate_key).first()
+        if vehicle is None:
+            try:
+                with transaction.atomic():
+                    return cls.objects.create(plate_key=plate_key, **values)
+            except IntegrityError:
+                vehicle = cls.objects.get(plate_key=plate_key)
+        
+        if vehicle.last_inspected_at and record.updated_at and record.updated_at < vehicle.last_inspected_at:
+            return vehicle
+        changed = [field for field, value in values.items() if getattr(vehicle, field) != value]
+        if changed:
+            for field in changed:
+                setattr(vehicle, field, values[field])
+            vehicle.save(update_fields=changed)
+        return vehicle
+    
+    @classmethod
+    def update_from_records(cls, records):
+        """
+        批量更新档案（已保存的记录）：同一号牌的记录按更新时间先后合并，规则与 update_from_record 相同；
+        一次查询已有档案，bulk_create / bulk_update 写入
+        """
+        grouped = {}
+        for record in sorted(records, key=lambda r: (r.updated_at, r.pk)):
+            plate_key = normalize_plate(record.license_plate_number)
+            if plate_key:
+                grouped.setdefault(plate_key, []).append(record)
+        if not grouped:
+            return
+        
+        vehicles = cls.objects.in_bulk(list(grouped), field_name='plate_key')
+        to_create = []
+        to_update = []
+        update_fields = set()
+        for plate_key, plate_records in grouped.items():
+            vehicle = vehicles.get(plate_key)
+            if vehicle is not None and vehicle.last_inspected_at:
+                plate_records = [r for r in plate_records if r.updated_at >= vehicle.last_inspected_at]
+            values = {}
+            for record in plate_records:
+                values.update(cls.values_from_record(record))
+            if not values:
+                continue
+            if vehicle is None:
+                to_create.append(cls(plate_key=plate_key, **values))
+                continue
+            changed = [field for field, value in values.items() if getattr(vehicle, field) != value]
+            if changed:
+                for field in changed:
+                    setattr(vehicle, field, values[field])
+                to_update.append(vehicle)
+                update_fields.update(changed)
+        
+        if to_update:
+            cls.objects.bulk_update(to_update, sorted(update_fields))
+        if to_create:
+            try:
+                with transaction.atomic():
+                    cls.objects.bulk_create(to_create)
+            except IntegrityError:
+                # 并发创建了同一号牌，逐条处理
+                for vehicle in to_create:
+                    for record in grouped[vehicle.plate_key]:
+                        cls.update_from_record(record)
+
+
+class UploadSession(models.Model):
+    """分片上传会话 - 断点续传图片，完成后写入检验记录的图片字段"""
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='上传人'
+    )
+    record = models.ForeignKey(
+        InspectionRecord,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='检验记录'
+    )
+    field = models.CharField(max_length=50, verbose_name='图片字段')
+    filename = models.CharField(max_length=100, verbose_name='文件名')
+    size = models.BigIntegerField(verbose_name='文件大小')
+    received = models.BigIntegerField(default=0, verbose_name='已接收字节数')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        db_table = 'upload_session'
+        verbose_name = '分片上传'
+        verbose_name_plural = verbose_name
+        indexes = [
+            models.Index(fields=['updated_at'], name='upload_session_updated_at'),
+        ]
+    
+    def __str__(self):
+        return f"{self.filename} {self.received}/{self.size}"
+    
+    @property
+    def path(self):
+        """分片临时文件路径"""
+        return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{self.pk}.part')
+    
+    @property
+    def is_expired(self):
+        expire = timedelta(hours=settings.CHUNKED_UPLOAD_EXPIRE_HOURS)
+        return self.updated_at < timezone.now() - expire
+    
+    def discard(self):
+        """删除临时文件与会话"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self.delete()
@@ -1,43 +1,73 @@
 from rest_framework import serializers
-from .models import InspectionRecord
+from .media import signed_media_url
+from .models import InspectionRecord, Vehicle, IMAGE_FIELDS
+from .services import ImageDerivativeService
 
 
-class InspectionListSerializer(serializers.ModelSerializer):
+class SignedMediaMixin:
+    """图片地址签发给 context['request'] 的用户（短期有效）"""
+    
+    def media_url(self, name):
+        return signed_media_url(name, self.context['request'].user)
+    
+    def image_url(self, image_field):
+        return self.media_url(image_field.name) if image_field else None
+    
+    def derivative_urls(self, image_field):
+        return ImageDerivativeService.urls(image_field, url=self.media_url)
+
+
+class InspectionListSerializer(SignedMediaMixin, serializers.ModelSerializer):
     """列表序列化器"""
+    thumbnail = serializers.SerializerMethodField()
+    
     class Meta:
         model = InspectionRecord
         fields = [
             'id', 'license_plate_number', 'vehicle_type', 'owner', 
-            'brand', 'model_name', 'created_at'
+            'brand', 'model_name', 'created_at', 'thumbnail'
         ]
+    
+    def get_thumbnail(self, obj):
+        """列表缩略图：优先车牌照片，其次行驶证正面；缩略图未生成时为原图地址"""
+        for field in ('plate_image', 'license_front_image'):
+            urls = self.derivative_urls(getattr(obj, field))
+            if urls:
+                return urls['thumb']
+        return None
 
 
-class InspectionDetailSerializer(serializers.ModelSerializer):
+class InspectionDetailSerializer(SignedMediaMixin, serializers.ModelSerializer):
     """详情序列化器"""
     license_front_image = serializers.SerializerMethodField()
     license_back_image = serializers.SerializerMethodField()
     plate_image = serializers.SerializerMethodField()
     brake_report_image = serializers.SerializerMethodField()
     headlight_report_image = serializers.SerializerMethodField()
+    image_derivatives = serializers.SerializerMethodField()
     
     class Meta:
         model = InspectionRecord
         exclude = ['created_by']
     
+    def get_image_derivatives(self, obj):
+        """各图片的缩略图/中图地址 {字段: {尺寸: {格式: url}}}，未生成时为原图地址"""
+        return {field: self.derivative_urls(getattr(obj, field)) for field in IMAGE_FIELDS}
+    
     def get_license_front_image(self, obj):
-        return obj.license_front_image.url if obj.license_front_image else None
+        return self.image_url(obj.license_front_image)
     
     def get_license_back_image(self, obj):
-        return obj.license_back_image.url if obj.license_back_image else None
+        return self.image_url(obj.license_back_image)
     
     def get_plate_image(self, obj):
-        return obj.plate_image.url if obj.plate_image else None
+        return self.image_url(obj.plate_image)
     
     def get_brake_report_image(self, obj):
-        return obj.brake_report_image.url if obj.brake_report_image else None
+        return self.image_url(obj.brake_report_image)
     
     def get_headlight_report_image(self, obj):
-        return obj.headlight_report_image.url if obj.headlight_report_image else None
+        return self.image_url(obj.headlight_report_image)
 
 
 class InspectionCreateSerializer(serializers.ModelSerializer):
@@ -52,6 +82,13 @@ class InspectionCreateSerializer(serializers.ModelSerializer):
         return value.strip()
 
 
+class VehiclePrefillSerializer(serializers.ModelSerializer):
+    """农机档案预填序列化器"""
+    class Meta:
+        model = Vehicle
+        fields = Vehicle.SYNC_FIELDS + ['last_inspected_at']
+
+
 class OCRResultSerializer(serializers.Serializer):
     """OCR识别结果序列化器"""
     license_plate_number = serializers.CharField(allow_blank=True, default='')
@@ -1,12 +1,26 @@
+import asyncio
 import io
 import json
+import logging
 import os
+import re
+import threading
+import uuid
 import zipfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from docxtpl import DocxTemplate, InlineImage
-from docx.shared import Mm
-from PIL import Image
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from config.metrics import observe_export, observe_ocr
+from config.profiling import profiled
+
+
+logger = logging.getLogger(__name__)
 
 
 class OCRService:
@@ -27,11 +41,13 @@ class OCRService:
         config = open_api_models.Config(
             access_key_id=ocr_config.access_key_id,
             access_key_secret=ocr_config.access_key_secret,
-            endpoint='ocr-api.cn-hangzhou.aliyuncs.com'
+            endpoint=settings.ALIBABA_CLOUD_OCR_ENDPOINT,
+            protocol=settings.ALIBABA_CLOUD_OCR_PROTOCOL
         )
         return Client(config)
     
     @classmethod
+    @observe_ocr('vehicle_license')
     def recognize_vehicle_license(cls, image_file):
         """
         识别行驶证（正面/副页）
@@ -48,8 +64,35 @@ class OCRService:
         runtime = util_models.RuntimeOptions()
         
         response = client.recognize_vehicle_license_with_options(request, runtime)
-        result = json.loads(response.body.data)
+        return cls._parse_vehicle_license(json.loads(response.body.data))
+    
+    @classmethod
+    @observe_ocr('vehicle_license')
+    async def arecognize_vehicle_license(cls, image_file):
+        """
+        识别行驶证（异步）- 使用SDK的异步接口，等待阿里云响应期间不阻塞事件循环
+        """
+        from alibabacloud_ocr_api20210707 import models
+        from alibabacloud_tea_util import models as util_models
         
+        client = await sync_to_async(cls._get_client)()
+        
+        request = models.RecognizeVehicleLicenseRequest(body=cls._read_image(image_file))
+        runtime = util_models.RuntimeOptions()
+        
+        response = await client.recognize_vehicle_license_with_options_async(request, runtime)
+        return cls._parse_vehicle_license(json.loads(response.body.data))
+    
+    @staticmethod
+    def _read_image(image_file):
+        """读取上传图片为内存文件（异步HTTP客户端不直接读取上传文件对象）"""
+        if hasattr(image_file, 'seek'):
+            image_file.seek(0)
+        return io.BytesIO(image_file.read())
+    
+    @staticmethod
+    def _parse_vehicle_license(result):
+        """解析行驶证识别结果"""
         # 解析数据 - 结构是 data.face.data 和 data.back.data
         data = result.get('data', {})
         face_info = data.get('face', {})
@@ -89,6 +132,7 @@ class OCRService:
         }
     
     @classmethod
+    @observe_ocr('car_number')
     def recognize_car_number(cls, image_file):
         """
         识别车牌号
@@ -108,8 +152,28 @@ class OCRService:
         runtime = util_models.RuntimeOptions()
         
         response = client.recognize_car_number_with_options(request, runtime)
-        result = json.loads(response.body.data)
+        return cls._parse_car_number(json.loads(response.body.data))
+    
+    @classmethod
+    @observe_ocr('car_number')
+    async def arecognize_car_number(cls, image_file):
+        """
+        识别车牌号（异步）
+        """
+        from alibabacloud_ocr_api20210707 import models
+        from alibabacloud_tea_util import models as util_models
+        
+        client = await sync_to_async(cls._get_client)()
+        
+        request = models.RecognizeCarNumberRequest(body=cls._read_image(image_file))
+        runtime = util_models.RuntimeOptions()
         
+        response = await client.recognize_car_number_with_options_async(request, runtime)
+        return cls._parse_car_number(json.loads(response.body.data))
+    
+    @staticmethod
+    def _parse_car_number(result):
+        """解析车牌识别结果"""
         # 提取车牌号
         plates = result.get('data', [])
         plate_number = plates[0].get('plateNumber', '') if plates else ''
@@ -153,6 +217,8 @@ class WordExportService:
         计算图片插入尺寸，保持比例且不超过最大尺寸
         返回 (width_mm, height_mm)
         """
+        from PIL import Image
+        
         try:
             with Image.open(image_path) as img:
                 img_width, img_height = img.size
@@ -173,11 +239,16 @@ class WordExportService:
             return max_width_mm, max_height_mm
     
     @classmethod
+    @observe_export('single')
     def export_single(cls, record):
         """
         导出单个检验记录为Word文档
         使用docxtpl模板引擎，支持占位符替换和图片插入
         """
+        # docxtpl/python-docx 导入较慢，首次导出时再加载
+        from docxtpl import DocxTemplate, InlineImage
+        from docx.shared import Mm
+        
         # 加载模板
         doc = DocxTemplate(cls.TEMPLATE_PATH)
         
@@ -249,6 +320,7 @@ class WordExportService:
         return buffer, filename
     
     @classmethod
+    @observe_export('batch')
     def export_batch(cls, records):
         """批量导出为ZIP压缩包"""
         zip_buffer = io.BytesIO()
@@ -262,3 +334,418 @@ class WordExportService:
         filename = f"检验记录_{datetime.now().strftime('%Y-%m-%d')}.zip"
         
         return zip_buffer, filename
+    
+    _executor = None
+    
+    @classmethod
+    def _get_executor(cls):
+        """文档渲染线程池（限制同时渲染的文档数）"""
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=settings.EXPORT_MAX_WORKERS, thread_name_prefix='word-export'
+            )
+        return cls._executor
+    
+    @classmethod
+    async def aexport_single(cls, record):
+        """在线程池中渲染单个文档，事件循环继续处理其他请求"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(cls._get_executor(), profiled(cls.export_single), record)
+    
+    @classmethod
+    async def aexport_batch(cls, records):
+        """在线程池中批量渲染，records 需已从数据库读出（线程池中不查询数据库）"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(cls._get_executor(), profiled(cls.export_batch), records)
+
+
+class ImageDerivativeService:
+    """
+    图片衍生图服务 - 生成缩略图/中图（WebP、JPEG），与原图存放在同一目录：
+    <原图路径>.<尺寸>.<webp|jpg>
+    """
+    
+    # 尺寸名 -> 最长边像素
+    SIZES = {
+        'thumb': 240,
+        'medium': 960,
+    }
+    # 格式名 -> (PIL格式, 扩展名)
+    FORMATS = {
+        'webp': ('WEBP', 'webp'),
+        'jpeg': ('JPEG', 'jpg'),
+    }
+    QUALITY = 80
+    
+    DERIVATIVE_RE = re.compile(r'^(?P<original>.+)\.(?:thumb|medium)\.(?:webp|jpg)$')
+    
+    @classmethod
+    def derivative_name(cls, name, size, fmt):
+        return f'{name}.{size}.{cls.FORMATS[fmt][1]}'
+    
+    @classmethod
+    def derivative_names(cls, name):
+        return [cls.derivative_name(name, size, fmt) for size in cls.SIZES for fmt in cls.FORMATS]
+    
+    @classmethod
+    def original_name(cls, name):
+        """衍生图对应的原图路径，非衍生图返回 None"""
+        match = cls.DERIVATIVE_RE.match(name or '')
+        return match.group('original') if match else None
+    
+    @classmethod
+    def _formats(cls):
+        from PIL import features
+        
+        return [fmt for fmt in cls.FORMATS if fmt != 'webp' or features.check('webp')]
+    
+    @classmethod
+    def missing(cls, name):
+        """缺失的衍生图 [(尺寸, 格式)]"""
+        from .storage import media_storage
+        
+        return [
+            (size, fmt) for size in cls.SIZES for fmt in cls._formats()
+            if not media_storage.exists(cls.derivative_name(name, size, fmt))
+        ]
+    
+    @classmethod
+    def generate(cls, name):
+        """为原图生成全部衍生图，已存在的跳过；失败只记录日志"""
+        from PIL import Image, ImageOps
+        from .storage import media_storage
+        
+        targets = cls.missing(name)
+        if not targets or not name or not media_storage.exists(name):
+            return
+        
+        try:
+            with media_storage.open(name, 'rb') as f, Image.open(f) as img:
+                # JPEG 按目标尺寸降采样解码，大图显著减少解码耗时
+                largest = max(cls.SIZES.values())
+                img.draft('RGB', (largest, largest))
+                img = ImageOps.exif_transpose(img).convert('RGB')
+                
+                for size in dict.fromkeys(size for size, _ in targets):
+                    resized = img.copy()
+                    resized.thumbnail((cls.SIZES[size], cls.SIZES[size]), Image.LANCZOS)
+                    for target_size, fmt in targets:
+                        if target_size == size:
+                            cls._write(cls.derivative_name(name, size, fmt), resized, fmt)
+        except Exception:
+            logger.exception('生成衍生图失败: %s', name)
+    
+    @classmethod
+    def _write(cls, name, img, fmt):
+        """先写临时文件再原子重命名"""
+        from .storage import media_storage
+        
+        path = media_storage.path(name)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        img.save(tmp_path, format=cls.FORMATS[fmt][0], quality=cls.QUALITY, optimize=True)
+        os.replace(tmp_path, path)
+    
+    _executor = None
+    _pending = set()
+    _pending_lock = threading.Lock()
+    
+    @classmethod
+    def _get_executor(cls):
+        """后台生成衍生图的线程池（限制同时解码的图片数）"""
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_DERIVATIVE_MAX_WORKERS, thread_name_prefix='image-derivatives'
+            )
+        return cls._executor
+    
+    @classmethod
+    def schedule(cls, name):
+        """事务提交后在后台线程生成衍生图，不阻塞当前请求"""
+        transaction.on_commit(lambda: cls._submit(name))
+    
+    @classmethod
+    def _submit(cls, name):
+        # 同一图片在生成完成前只排队一次
+        with cls._pending_lock:
+            if name in cls._pending:
+                return
+            cls._pending.add(name)
+        cls._get_executor().submit(cls._generate_pending, name)
+    
+    @classmethod
+    def _generate_pending(cls, name):
+        try:
+            cls.generate(name)
+        finally:
+            with cls._pending_lock:
+                cls._pending.discard(name)
+    
+    @classmethod
+    def urls(cls, image_field, url=None):
+        """
+        衍生图地址 {尺寸: {格式: url}}，衍生图缺失时各尺寸使用原图地址
+        请求中不生成衍生图：缺失时在后台补齐（schedule），后续请求即返回衍生图地址；
+        最后生成的衍生图作为完成标记，每张图只检查一个文件
+        url: 文件名 -> 地址，默认为存储地址（接口传入签名地址）
+        """
+        from .storage import media_storage
+        
+        if not image_field or not image_field.name:
+            return None
+        url = url or media_storage.url
+        name = image_field.name
+        formats = cls._formats()
+        if not media_storage.exists(cls.derivative_name(name, list(cls.SIZES)[-1], formats[-1])):
+            cls.schedule(name)
+            original = url(name)
+            return {size: {fmt: original for fmt in formats} for size in cls.SIZES}
+        return {
+            size: {fmt: url(cls.derivative_name(name, size, fmt)) for fmt in formats}
+            for size in cls.SIZES
+        }
+
+
+class InspectionBulkService:
+    """批量创建/更新检验记录服务 - 离线同步使用"""
+    
+    # 单次最多提交的记录数
+    MAX_ITEMS = 100
+    
+    @classmethod
+    def save(cls, user, items, partial_success=False):
+        """
+        校验并批量写入检验记录，带 id 的条目为更新，否则为创建
+        更新条目可携带前置条件 if_match（详情ETag）或 updated_at（客户端上次读取的更新时间），
+        与当前记录不一致时该条目返回 code=412 的冲突错误，与单条 PUT 的 If-Match 一致
+        读取、校验与写入在同一事务内，每条记录只写入其提交的字段，不覆盖其他设备的修改
+        :param partial_success: True 时写入校验通过的条目并返回其余条目的错误；
+                                False 时任一条目校验失败则全部不写入
+        :return: (results, has_errors)，results 与 items 一一对应
+        """
+        from .models import (
+            InspectionRecord, InspectionChange, InspectionDailyStat, Vehicle, numeric_update_fields
+        )
+        from .serializers import InspectionCreateSerializer
+        from .caches import bump_user_version, etag_mismatch, record_etag
+        
+        def _pk(item):
+            try:
+                return int(item.get('id') or 0) or None
+            except (TypeError, ValueError):
+                return None
+        
+        def _conflict(item, obj):
+            if item.get('if_match'):
+                return etag_mismatch(str(item['if_match']), record_etag(obj))
+            if item.get('updated_at'):
+                seen = parse_datetime(str(item['updated_at']))
+                return seen is None or seen != obj.updated_at
+            return False
+        
+        update_ids = [_pk(item) for item in items if isinstance(item, dict) and _pk(item)]
+        
+        results = []
+        to_create = []   # (index, instance)
+        to_update = []   # (index, instance, 提交的字段)
+        stat_deltas = Counter()
+        
+        with transaction.atomic():
+            existing = (
+                InspectionRecord.objects.select_for_update()
+                .filter(created_by=user).in_bulk(update_ids)
+            )
+            
+            for index, item in enumerate(items):
+                if not isinstance(item, dict):
+                    results.append({'index': index, 'errors': {'non_field_errors': ['数据格式错误']}})
+                    continue
+                
+                pk = _pk(item)
+                if item.get('id') and pk is None:
+                    results.append({'index': index, 'errors': {'id': ['id格式错误']}})
+                    continue
+                if pk:
+                    obj = existing.get(pk)
+                    if obj is None:
+                        results.append({'index': index, 'errors': {'id': ['记录不存在']}})
+                        continue
+                    if _conflict(item, obj):
+                        results.append({
+                            'index': index,
+                            'code': 412,
+                            'errors': {'non_field_errors': ['记录已被修改，请刷新后重试']}
+                        })
+                        continue
+                    serializer = InspectionCreateSerializer(obj, data=item, partial=True)
+                else:
+                    serializer = InspectionCreateSerializer(data=item)
+                
+                if not serializer.is_valid():
+                    results.append({'index': index, 'errors': serializer.errors})
+                    continue
+                
+                if pk:
+                    old_key = InspectionDailyStat.key_for(obj)
+                    for field, value in serializer.validated_data.items():
+                        setattr(obj, field, value)
+                    new_key = InspectionDailyStat.key_for(obj)
+                    if old_key != new_key:
+                        stat_deltas[old_key] -= 1
+                        stat_deltas[new_key] += 1
+                    to_update.append((index, obj, set(serializer.validated_data)))
+                else:
+                    to_create.append((index, InspectionRecord(created_by=user, **serializer.validated_data)))
+                results.append({'index': index})
+            
+            has_errors = any('errors' in result for result in results)
+            if has_errors and not partial_success:
+                return results, True
+            
+            # bulk_create/bulk_update 不调用 save()：手动刷新 auto_now 字段并解析数值字段
+            # 同一记录出现在多个条目中时合并为一次写入
+            submitted = {}
+            for _, obj, fields in to_update:
+                submitted.setdefault(obj.pk, (obj, set()))[1].update(fields)
+            now = timezone.now()
+            updated = [obj for obj, _ in submitted.values()]
+            created = [obj for _, obj in to_create]
+            for obj in updated:
+                obj.updated_at = now
+            for obj in created + updated:
+                obj.fill_numeric_fields()
+            
+            # 按提交的字段分组写入，每条记录只更新自己提交的字段
+            groups = {}
+            for obj, fields in submitted.values():
+                groups.setdefault(frozenset(numeric_update_fields(fields)), []).append(obj)
+            
+            if created:
+                InspectionRecord.objects.bulk_create(created)
+            for fields, objs in groups.items():
+                InspectionRecord.objects.bulk_update(objs, sorted(fields) + ['updated_at'])
+            # 批量写入不触发 post_save 信号，手动记录变更、维护统计并刷新变更标记
+            InspectionChange.log(created + updated)
+            for obj in created:
+                stat_deltas[InspectionDailyStat.key_for(obj)] += 1
+            InspectionDailyStat.apply(stat_deltas)
+            Vehicle.update_from_records(created + updated)
+            transaction.on_commit(lambda: bump_user_version(user.pk))
+        
+        for index, obj in to_create:
+            results[index].update({'id': obj.id, 'action': 'created'})
+        for index, obj, _ in to_update:
+            results[index].update({'id': obj.id, 'action': 'updated'})
+        
+        return results, has_errors
+
+
+class InspectionArchiveService:
+    """
+    检验记录归档服务 - 冷热分离
+    - 超过保留期的记录按批移入归档表，每批一个事务，中断后重新执行即从剩余记录继续
+    - 图片引用随记录一起移动，引用计数、每日统计与变更日志保持不变
+    - 按id读取时先查热表，未命中再回查归档表
+    - 修改/删除已归档的记录时先移回热表（restore），也可由 restore_inspections 命令或后台操作恢复
+    """
+    
+    @classmethod
+    def archive_batch(cls, cutoff, batch_size):
+        """
+        将一批创建时间早于 cutoff 的记录移入归档表
+        :return: 本批归档的记录数，0 表示已全部归档
+        """
+        from .models import InspectionRecord, ArchivedInspectionRecord, UploadSession, moving_records
+        from .caches import bump_user_version
+        
+        with transaction.atomic():
+            records = list(
+                InspectionRecord.objects
+                .filter(created_at__lt=cutoff)
+                .order_by('id')[:batch_size]
+            )
+            if not records:
+                return 0
+            ids = [record.pk for record in records]
+            
+            # 归档记录只读，未完成的分片上传会话一并清理
+            for session in UploadSession.objects.filter(record_id__in=ids):
+                session.discard()
+            ArchivedInspectionRecord.objects.bulk_create(
+                [ArchivedInspectionRecord.from_record(record) for record in records]
+            )
+            # 记录并未删除：不写删除标记、不减少每日统计与图片引用计数
+            with moving_records():
+                InspectionRecord.objects.filter(pk__in=ids).delete()
+            
+            user_ids = {record.created_by_id for record in records}
+            
+            def _bump_versions():
+                for user_id in user_ids:
+                    bump_user_version(user_id)
+            transaction.on_commit(_bump_versions)
+        return len(records)
+    
+    @classmethod
+    def restore(cls, ids, user=None):
+        """
+        将归档记录移回检验记录表（之后可修改/删除），与归档相同，
+        每日统计、图片引用计数与变更日志保持不变；创建时间仍早于保留期的记录会在下次归档时再次移入
+        :param user: 只恢复该用户创建的记录，None 表示不限
+        :return: 恢复的记录数
+        """
+        from .models import InspectionRecord, ArchivedInspectionRecord, moving_records
+        from .caches import bump_user_version
+        
+        with transaction.atomic():
+            archived = list(cls._filter(ArchivedInspectionRecord, user).filter(pk__in=ids))
+            if not archived:
+                return 0
+            records = [
+                InspectionRecord(**{name: getattr(obj, name) for name in obj.copy_fields()})
+                for obj in archived
+            ]
+            InspectionRecord.objects.bulk_create(records)
+            # bulk_create 按 auto_now/auto_now_add 重新赋值，写回原来的时间（ETag 不变）
+            for record, obj in zip(records, archived):
+                record.created_at, record.updated_at = obj.created_at, obj.updated_at
+            InspectionRecord.objects.bulk_update(records, ['created_at', 'updated_at'])
+            with moving_records():
+                ArchivedInspectionRecord.objects.filter(pk__in=[obj.pk for obj in archived]).delete()
+            
+            user_ids = {obj.created_by_id for obj in archived}
+            
+            def _bump_versions():
+                for user_id in user_ids:
+                    bump_user_version(user_id)
+            transaction.on_commit(_bump_versions)
+        return len(archived)
+    
+    @staticmethod
+    def _filter(model, user):
+        return model.objects.all() if user is None else model.objects.filter(created_by=user)
+    
+    @classmethod
+    def get(cls, pk, user=None):
+        """
+        按id读取检验记录（含已归档记录），不存在时返回 None
+        :param user: 只读取该用户创建的记录，None 表示不限
+        """
+        from .models import InspectionRecord, ArchivedInspectionRecord
+        
+        record = cls._filter(InspectionRecord, user).filter(pk=pk).first()
+        if record is None:
+            archived = cls._filter(ArchivedInspectionRecord, user).filter(pk=pk).first()
+            record = archived.to_record() if archived else None
+        return record
+    
+    @classmethod
+    def in_bulk(cls, ids, user=None):
+        """按id批量读取检验记录（含已归档记录），返回 {id: 记录}"""
+        from .models import InspectionRecord, ArchivedInspectionRecord
+        
+        records = cls._filter(InspectionRecord, user).in_bulk(ids)
+        missing = [pk for pk in ids if pk not in records]
+        if missing:
+            for pk, archived in cls._filter(ArchivedInspectionRecord, user).in_bulk(missing).items():
+                records[pk] = archived.to_record()
+        return records
@@ -0,0 +1,112 @@
+from collections import Counter
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import (
+    InspectionRecord,
+    InspectionChange,
+    InspectionDailyStat,
+    MediaBlob,
+    Vehicle,
+    IMAGE_FIELDS,
+    image_names,
+    is_moving_records,
+)
+from .caches import bump_user_version
+from .services import ImageDerivativeService
+
+
+# 影响每日统计维度的字段
+STAT_FIELDS = {'vehicle_type', 'created_by', 'created_by_id', 'created_at'}
+
+# 同步到农机档案的字段
+VEHICLE_FIELDS = set(Vehicle.SYNC_FIELDS)
+
+IMAGE_FIELD_SET = set(IMAGE_FIELDS)
+
+
+def generate_derivatives(names):
+    for name in names:
+        ImageDerivativeService.generate(name)
+
+
+@receiver(pre_save, sender=InspectionRecord)
+def inspection_record_pre_save(sender, instance, update_fields=None, **kwargs):
+    """
+    更新前读取旧的统计维度与图片引用，只查询本次更新涉及的字段；
+    不涉及这些字段的更新（如修改文字信息）不额外查询
+    """
+    instance._stat_key_before = None
+    instance._image_names_before = None
+    if instance._state.adding or not instance.pk:
+        return
+    
+    need_stat = update_fields is None or bool(STAT_FIELDS.intersection(update_fields))
+    need_images = update_fields is None or bool(IMAGE_FIELD_SET.intersection(update_fields))
+    if not need_stat and not need_images:
+        return
+    
+    fields = []
+    if need_stat:
+        fields += ['created_at', 'vehicle_type', 'created_by']
+    if need_images:
+        fields += IMAGE_FIELDS
+    old = InspectionRecord.objects.filter(pk=instance.pk).only(*fields).first()
+    if old is None:
+        return
+    if need_stat:
+        instance._stat_key_before = InspectionDailyStat.key_for(old)
+    if need_images:
+        instance._image_names_before = image_names(old)
+
+
+@receiver(post_save, sender=InspectionRecord)
+def inspection_record_saved(sender, instance, created, **kwargs):
+    """检验记录创建/更新后记录变更、维护每日统计并刷新创建人的变更标记（视图、后台均会触发）"""
+    InspectionChange.log([instance])
+    
+    new_key = InspectionDailyStat.key_for(instance)
+    old_key = getattr(instance, '_stat_key_before', None)
+    if created:
+        InspectionDailyStat.apply({new_key: 1})
+    elif old_key and old_key != new_key:
+        InspectionDailyStat.apply({old_key: -1, new_key: 1})
+    
+    # 图片引用计数：新增引用 +1，被替换/清空的引用 -1
+    names_before = getattr(instance, '_image_names_before', None)
+    new_names = []
+    if created:
+        MediaBlob.apply(Counter(image_names(instance)))
+        new_names = image_names(instance)
+    elif names_before is not None:
+        deltas = Counter(image_names(instance))
+        deltas.subtract(Counter(names_before))
+        MediaBlob.apply(deltas)
+        new_names = [name for name, delta in deltas.items() if delta > 0]
+    
+    # 新上传的图片在事务提交后生成缩略图/中图
+    if new_names and getattr(settings, 'IMAGE_DERIVATIVES_ON_UPLOAD', True):
+        transaction.on_commit(partial(generate_derivatives, set(new_names)))
+    
+    update_fields = kwargs.get('update_fields')
+    if update_fields is None or VEHICLE_FIELDS.intersection(update_fields):
+        Vehicle.update_from_record(instance)
+    
+    bump_user_version(instance.created_by_id)
+
+
+@receiver(post_delete, sender=InspectionRecord)
+def inspection_record_deleted(sender, instance, **kwargs):
+    """检验记录删除后写入删除标记，供增量同步下发；归档时的删除只是移动记录，跳过"""
+    if is_moving_records():
+        return
+    InspectionChange.log([instance], deleted=True)
+    InspectionDailyStat.apply({InspectionDailyStat.key_for(instance): -1})
+    deltas = Counter()
+    deltas.subtract(image_names(instance))
+    MediaBlob.apply(deltas)
+    bump_user_version(instance.created_by_id)
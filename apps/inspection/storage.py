@@ -0,0 +1,73 @@
+"""
+内容寻址的媒体文件存储
+文件名为内容的 SHA-256：<upload_to>/<前2位>/<sha256><扩展名>，相同内容只存一份，
+重复上传直接复用已有文件，不再写盘
+"""
+import hashlib
+import os
+import re
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+CONTENT_ADDRESSED_RE = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{64}(\.[\w]+)?$')
+
+
+def is_content_addressed(name):
+    """文件名是否已是内容寻址格式"""
+    return bool(name and CONTENT_ADDRESSED_RE.search(name))
+
+
+def hash_file(content, chunk_size=64 * 1024):
+    """计算文件内容的 SHA-256，完成后文件指针回到开头"""
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    if hasattr(content, 'chunks'):
+        chunks = content.chunks(chunk_size)
+    else:
+        chunks = iter(lambda: content.read(chunk_size), b'')
+    for chunk in chunks:
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def content_addressed_name(name, digest):
+    """保留 upload_to 目录与扩展名，文件名替换为内容哈希"""
+    directory = os.path.dirname(name)
+    ext = os.path.splitext(name)[1].lower()
+    return '/'.join(part for part in (directory, digest[:2], f'{digest}{ext}') if part)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """内容寻址存储"""
+
+    def get_available_name(self, name, max_length=None):
+        # 文件名由内容决定，同名即同内容，不追加随机后缀
+        return name
+
+    def _save(self, name, content):
+        name = content_addressed_name(name, hash_file(content))
+        if self.exists(name):
+            # 刷新修改时间，避免垃圾回收在引用写入数据库前删除该文件
+            try:
+                os.utime(self.path(name))
+            except FileNotFoundError:
+                pass
+            else:
+                return name
+
+        # 先写入临时文件再原子重命名，并发写入相同内容时互不影响
+        tmp_name = super()._save(
+            os.path.join(os.path.dirname(name), f'.tmp-{uuid.uuid4().hex}'), content
+        )
+        os.replace(self.path(tmp_name), self.path(name))
+        return name
+
+
+media_storage = ContentAddressedStorage()
@@ -1,3 +1,1410 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import re
+import shutil
+import tempfile
+import time
+import traceback
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from apps.users import urls as users_urls
+from config import metrics, profiling
+from apps.users.models import User
+from . import urls as inspection_urls
+from .models import (
+    ArchivedInspectionRecord, InspectionChange, InspectionDailyStat, InspectionRecord, MediaBlob,
+    UploadSession, Vehicle, parse_count, parse_dimension, parse_weight
+)
+from .admin import CachedCountPaginator
+from .caches import ListResponseCache
+from .services import ImageDerivativeService, InspectionBulkService, OCRService
+from .storage import media_storage
+
+
+# 测试环境未执行 collectstatic，后台页面使用普通静态文件存储
+ADMIN_TEST_SETTINGS = {
+    'STATICFILES_STORAGE': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+}
+
+
+def envelope_exception_handler(exc, context):
+    """测试用异常处理：统一包装为 {'code','message','data'}"""
+    from rest_framework.views import exception_handler
+    
+    response = exception_handler(exc, context)
+    if response is not None:
+        response.data = {'code': response.status_code, 'message': str(exc), 'data': None}
+    return response
+
+
+class InspectorTestCase(TestCase):
+    """接口测试基类：清空缓存，以检验员身份登录"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='inspector', password='p')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+@override_settings(**ADMIN_TEST_SETTINGS)
+class InspectionAdminQueryBudgetTest(TestCase):
+    """检验记录后台列表的查询数预算，查询数不能随行数增长"""
+    
+    # 列表页查询数上限（会话、用户、统计表筛选项、计数、列表）
+    CHANGELIST_QUERY_BUDGET = 10
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(username='admin', password='admin')
+        cls.inspectors = [
+            User.objects.create_user(username=f'inspector{i}', password='p') for i in range(5)
+        ]
+    
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin_user)
+    
+    def create_records(self, count):
+        InspectionRecord.objects.bulk_create([
+            InspectionRecord(
+                license_plate_number=f'豫A{i:05d}',
+                vehicle_type='拖拉机',
+                created_by=self.inspectors[i % len(self.inspectors)],
+            )
+            for i in range(count)
+        ])
+    
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+    
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        url = reverse('admin:inspection_inspectionrecord_changelist')
+        self.create_records(10)
+        small = self.count_queries(url)
+        self.create_records(90)
+        large = self.count_queries(url)
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, self.CHANGELIST_QUERY_BUDGET)
+    
+    def test_search_and_filters(self):
+        url = reverse('admin:inspection_inspectionrecord_changelist')
+        self.create_records(20)
+        response = self.client.get(url, {'q': '豫A0001'})
+        self.assertEqual(response.context['cl'].result_count, 10)
+        response = self.client.get(url, {'vehicle_type': '拖拉机'})
+        self.assertEqual(response.context['cl'].result_count, 20)
+    
+    def test_scaling_mode_switches_per_request(self):
+        """大表模式在请求时读取配置：关闭后恢复默认分页、日期层级与包含匹配搜索"""
+        url = reverse('admin:inspection_inspectionrecord_changelist')
+        self.create_records(20)
+        
+        response = self.client.get(url, {'q': 'A0001'})
+        cl = response.context['cl']
+        self.assertIsInstance(cl.paginator, CachedCountPaginator)
+        self.assertIsNone(cl.date_hierarchy)
+        self.assertEqual(cl.result_count, 0)
+        self.assertContains(response, '按开头匹配')
+        
+        with override_settings(INSPECTION_ADMIN_SCALING_MODE=False):
+            response = self.client.get(url, {'q': 'A0001'})
+        cl = response.context['cl']
+        self.assertNotIsInstance(cl.paginator, CachedCountPaginator)
+        self.assertEqual(cl.date_hierarchy, 'created_at')
+        self.assertEqual(cl.list_filter, ['vehicle_type', 'created_at'])
+        self.assertEqual(cl.result_count, 10)
+        self.assertContains(response, '包含输入内容即匹配')
+
+
+class ConditionalRequestTest(InspectorTestCase):
+    """ETag：未变化时返回304，记录增删改（含批量同步）后ETag变化；If-Match 不一致时返回412"""
+    
+    def setUp(self):
+        super().setUp()
+        self.record = InspectionRecord.objects.create(created_by=self.user, license_plate_number='豫A00001')
+        self.list_url = reverse('inspection-list-create')
+        self.detail_url = reverse('inspection-detail', args=[self.record.pk])
+    
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+    
+    def assert_not_modified(self, url, etag, header=None):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=header or etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+    
+    def test_list_not_modified(self):
+        etag = self.etag(self.list_url)
+        self.assert_not_modified(self.list_url, etag)
+        self.assert_not_modified(self.list_url, etag, f'W/{etag}')
+        # 查询参数顺序不同视为同一请求，参数不同则ETag不同
+        self.assertEqual(self.etag(f'{self.list_url}?page=1&keyword=a'), self.etag(f'{self.list_url}?keyword=a&page=1'))
+        self.assertNotEqual(self.etag(f'{self.list_url}?page=2'), etag)
+    
+    def test_detail_not_modified(self):
+        etag = self.etag(self.detail_url)
+        self.assert_not_modified(self.detail_url, etag)
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+    
+    def test_list_etag_changes_after_writes(self):
+        writes = [
+            lambda: self.client.post(self.list_url, {'license_plate_number': '豫A00002'}, format='json'),
+            lambda: self.client.put(self.detail_url, {'owner': '张三'}, format='json'),
+            lambda: self.client.post(reverse('inspection-bulk'), {'records': [
+                {'license_plate_number': '豫A00003'}, {'id': self.record.pk, 'owner': '李四'},
+            ]}, format='json'),
+            lambda: self.client.delete(self.detail_url),
+        ]
+        etag = self.etag(self.list_url)
+        for write in writes:
+            # 批量同步在事务提交后刷新变更标记
+            with self.captureOnCommitCallbacks(execute=True):
+                response = write()
+            self.assertIn(response.status_code, (200, 201))
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+            etag = response['ETag']
+            self.assert_not_modified(self.list_url, etag)
+    
+    def test_detail_etag_changes_after_update(self):
+        etag = self.etag(self.detail_url)
+        response = self.client.put(self.detail_url, {'owner': '张三'}, format='json')
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.etag(self.detail_url), response['ETag'])
+        
+        # 批量同步更新同样刷新详情ETag
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('inspection-bulk'), {'records': [{'id': self.record.pk, 'owner': '李四'}]}, format='json')
+        self.assertNotEqual(self.etag(self.detail_url), etag)
+    
+    def test_if_match(self):
+        etag = self.etag(self.detail_url)
+        response = self.client.put(self.detail_url, {'owner': '张三'}, format='json', HTTP_IF_MATCH='"stale"')
+        self.assertEqual(response.status_code, 412)
+        self.record.refresh_from_db()
+        self.assertEqual(self.record.owner, '')
+        
+        response = self.client.put(self.detail_url, {'owner': '张三'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        # 原ETag已过期
+        response = self.client.put(self.detail_url, {'owner': '李四'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        # 未携带 If-Match 时不校验
+        response = self.client.put(self.detail_url, {'owner': '李四'}, format='json')
+        self.assertEqual(response.status_code, 200)
+    
+    def test_if_match_delete(self):
+        response = self.client.delete(self.detail_url, HTTP_IF_MATCH='"stale"')
+        self.assertEqual(response.status_code, 412)
+        self.assertTrue(InspectionRecord.objects.filter(pk=self.record.pk).exists())
+        
+        response = self.client.delete(self.detail_url, HTTP_IF_MATCH=self.etag(self.detail_url))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(InspectionRecord.objects.filter(pk=self.record.pk).exists())
+        
+        record = InspectionRecord.objects.create(created_by=self.user, license_plate_number='豫A00002')
+        response = self.client.delete(reverse('inspection-detail', args=[record.pk]))
+        self.assertEqual(response.status_code, 200)
+
+
+class InFlightGaugeTest(TestCase):
+    """处理中的请求数：每次增减立即写入本进程的计数文件，不受指标写入间隔影响"""
+    
+    @staticmethod
+    def read(pid):
+        with open(os.path.join(settings.METRICS_DIR, f'{pid}.inflight')) as f:
+            return int(f.read())
+    
+    def test_written_on_every_change(self):
+        pid = os.getpid()
+        with override_settings(METRICS_FLUSH_INTERVAL=3600):
+            metrics.registry.add_in_flight(1)
+            self.addCleanup(metrics.registry.add_in_flight, -1)
+            base = metrics.registry.in_flight
+            self.assertEqual(self.read(pid), base)
+            metrics.registry.add_in_flight(1)
+            self.assertEqual(self.read(pid), base + 1)
+            metrics.registry.add_in_flight(-1)
+            self.assertEqual(self.read(pid), base)
+        
+        # 其他 worker 的计数文件一并汇总，已退出进程的文件被清理
+        other = os.path.join(settings.METRICS_DIR, f'{os.getppid()}.inflight')
+        with open(other, 'w') as f:
+            f.write(f'{3:>10}\n')
+        self.addCleanup(os.remove, other)
+        dead = os.path.join(settings.METRICS_DIR, '999999999.inflight')
+        open(dead, 'w').close()
+        self.assertEqual(metrics.collect()['in_flight'], {pid: base, os.getppid(): 3})
+        self.assertFalse(os.path.exists(dead))
+
+
+class ListResponseCacheTest(InspectorTestCase):
+    """列表响应缓存：命中统计计入运行指标，读取缓存时不写共享缓存"""
+    
+    def counter(self, result):
+        key = metrics.registry._key(ListResponseCache.METRIC, {'result': result})
+        return metrics.registry.counters.get(key, 0)
+    
+    def test_hits_recorded_in_metrics(self):
+        hits, misses = self.counter('hit'), self.counter('miss')
+        url = reverse('inspection-list-create')
+        self.client.get(url)
+        with mock.patch.object(cache, 'set') as cache_set, mock.patch.object(cache, 'add') as cache_add:
+            self.client.get(url)
+        cache_set.assert_not_called()
+        cache_add.assert_not_called()
+        self.assertEqual(self.counter('miss'), misses + 1)
+        self.assertEqual(self.counter('hit'), hits + 1)
+
+
+class BulkSyncTest(InspectorTestCase):
+    """
+    批量同步：partial=false 任一失败全部回滚，partial=true 部分写入，单次上限，农机档案批量更新，
+    每条记录只写入提交的字段，前置条件不一致的条目返回冲突
+    """
+    
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('inspection-bulk')
+    
+    def post(self, records, **data):
+        return self.client.post(self.url, {'records': records, **data}, format='json')
+    
+    def test_rollback_without_partial(self):
+        response = self.post([{'license_plate_number': '豫A00001'}, {'license_plate_number': ' '}])
+        self.assertEqual(response.status_code, 400)
+        results = response.data['data']['results']
+        self.assertNotIn('errors', results[0])
+        self.assertIn('license_plate_number', results[1]['errors'])
+        self.assertFalse(InspectionRecord.objects.exists())
+        self.assertFalse(Vehicle.objects.exists())
+    
+    def test_partial_success(self):
+        other = User.objects.create_user(username='other', password='p')
+        foreign = InspectionRecord.objects.create(created_by=other, license_plate_number='豫B00001')
+        response = self.post([
+            {'license_plate_number': '豫A00001'},
+            {'license_plate_number': ''},
+            {'id': foreign.pk, 'owner': '张三'},
+            'invalid',
+        ], partial=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['message'], '部分同步成功')
+        results = response.data['data']['results']
+        self.assertEqual(results[0]['action'], 'created')
+        self.assertEqual([sorted(r['errors']) for r in results[1:]],
+                         [['license_plate_number'], ['id'], ['non_field_errors']])
+        self.assertEqual(InspectionRecord.objects.filter(created_by=self.user).count(), 1)
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.owner, '')
+    
+    def test_max_items(self):
+        records = [{'license_plate_number': f'豫A{i:05d}'} for i in range(InspectionBulkService.MAX_ITEMS + 1)]
+        response = self.post(records)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(InspectionRecord.objects.exists())
+        response = self.post(records[:InspectionBulkService.MAX_ITEMS])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(InspectionRecord.objects.count(), InspectionBulkService.MAX_ITEMS)
+    
+    def test_vehicles_merged_by_plate(self):
+        Vehicle.objects.create(plate_key='豫A00001', license_plate_number='豫A00001', brand='旧品牌')
+        response = self.post([
+            {'license_plate_number': '豫A 00001', 'brand': '东方红'},
+            {'license_plate_number': '豫a00001', 'chassis_number': 'LS001'},
+            {'license_plate_number': '豫A00002', 'brand': '雷沃'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        last_id = response.data['data']['results'][1]['id']
+        vehicle = Vehicle.objects.get(plate_key='豫A00001')
+        self.assertEqual((vehicle.brand, vehicle.chassis_number, vehicle.last_record_id), ('东方红', 'LS001', last_id))
+        self.assertEqual(Vehicle.objects.get(plate_key='豫A00002').brand, '雷沃')
+    
+    def test_updates_only_submitted_fields(self):
+        first, second = [
+            InspectionRecord.objects.create(created_by=self.user, license_plate_number=f'豫A0000{i}')
+            for i in range(2)
+        ]
+        key_for = InspectionDailyStat.key_for
+        
+        def concurrent_edit(record):
+            # 校验期间其他设备修改了第二条记录的所有人
+            InspectionRecord.objects.filter(pk=second.pk).update(owner='其他设备')
+            return key_for(record)
+        
+        with mock.patch.object(InspectionDailyStat, 'key_for', side_effect=concurrent_edit):
+            response = self.post([{'id': first.pk, 'owner': '张三'}, {'id': second.pk, 'brand': '东方红'}])
+        self.assertEqual(response.status_code, 200)
+        second.refresh_from_db()
+        self.assertEqual((second.owner, second.brand), ('其他设备', '东方红'))
+        first.refresh_from_db()
+        self.assertEqual((first.owner, first.brand), ('张三', ''))
+    
+    def test_per_item_precondition(self):
+        record = InspectionRecord.objects.create(created_by=self.user, license_plate_number='豫A00001')
+        detail_url = reverse('inspection-detail', args=[record.pk])
+        response = self.client.get(detail_url)
+        etag, updated_at = response['ETag'], response.data['data']['updated_at']
+        
+        response = self.post([
+            {'id': record.pk, 'owner': '张三', 'if_match': etag},
+            {'id': record.pk, 'brand': '东方红', 'updated_at': updated_at},
+        ])
+        self.assertEqual(response.status_code, 200)
+        
+        # 记录已变化，旧的 ETag / 更新时间均冲突
+        response = self.post([
+            {'id': record.pk, 'owner': '李四', 'if_match': etag},
+            {'id': record.pk, 'owner': '李四', 'updated_at': updated_at},
+            {'license_plate_number': '豫A00002'},
+        ], partial=True)
+        self.assertEqual(response.status_code, 200)
+        results = response.data['data']['results']
+        self.assertEqual([r.get('code') for r in results], [412, 412, None])
+        record.refresh_from_db()
+        self.assertEqual(record.owner, '张三')
+        
+        response = self.post([{'id': record.pk, 'owner': '李四', 'if_match': self.client.get(detail_url)['ETag']}])
+        self.assertEqual(response.status_code, 200)
+    
+    def test_queries_do_not_grow_with_items(self):
+        def count(size, offset):
+            records = [{'license_plate_number': f'豫C{i:05d}'} for i in range(offset, offset + size)]
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.post(records).status_code, 200)
+            return len(ctx)
+        count(1, 0)
+        # 20 条以内 bulk_create 不会按 SQLite 参数个数上限分批
+        self.assertEqual(count(2, 100), count(20, 200))
+
+
+class ChangesFeedTest(InspectorTestCase):
+    """增量同步：按游标分页拉取，更新的记录只下发最新一次，删除的记录下发删除标记"""
+    
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('inspection-changes')
+        self.records = [
+            InspectionRecord.objects.create(created_by=self.user, license_plate_number=f'豫A0000{i}')
+            for i in range(5)
+        ]
+        other = User.objects.create_user(username='other', password='p')
+        InspectionRecord.objects.create(created_by=other, license_plate_number='豫B00001')
+    
+    def pull(self, cursor=0, limit=2):
+        """从游标开始拉取全部变更，返回 (更新的记录, 删除的id, 最终游标, 请求次数)"""
+        updated, deleted, pages = {}, [], 0
+        while True:
+            response = self.client.get(self.url, {'cursor': cursor, 'limit': limit})
+            self.assertEqual(response.status_code, 200)
+            data = response.data['data']
+            pages += 1
+            updated.update({item['id']: item for item in data['updated']})
+            deleted.extend(data['deleted'])
+            self.assertGreaterEqual(data['cursor'], cursor)
+            cursor = data['cursor']
+            if not data['has_more']:
+                return updated, deleted, cursor, pages
+    
+    def test_pages_through_updates_and_deletes(self):
+        updated, deleted, cursor, pages = self.pull()
+        self.assertEqual(sorted(updated), [r.pk for r in self.records])
+        self.assertEqual(deleted, [])
+        self.assertEqual(pages, 3)
+        
+        first, second = self.records[0], self.records[1]
+        deleted_id = second.pk
+        first.owner = '张三'
+        first.save()
+        first.owner = '李四'
+        first.save()
+        second.delete()
+        
+        updated, deleted, new_cursor, _ = self.pull(cursor)
+        # 多次更新只下发最新状态，其他用户的记录不下发
+        self.assertEqual(list(updated), [first.pk])
+        self.assertEqual(updated[first.pk]['owner'], '李四')
+        self.assertEqual(deleted, [deleted_id])
+        self.assertGreater(new_cursor, cursor)
+        
+        # 游标已是最新时没有变更
+        updated, deleted, cursor, pages = self.pull(new_cursor)
+        self.assertEqual((updated, deleted, cursor, pages), ({}, [], new_cursor, 1))
+    
+    def test_limit_and_cursor_params(self):
+        response = self.client.get(self.url, {'limit': 0})
+        self.assertEqual(len(response.data['data']['updated']), 1)
+        with mock.patch('apps.inspection.views.InspectionChangesView.MAX_LIMIT', 3):
+            response = self.client.get(self.url, {'limit': 1000})
+        self.assertEqual(len(response.data['data']['updated']), 3)
+        self.assertTrue(response.data['data']['has_more'])
+        response = self.client.get(self.url, {'cursor': -5, 'limit': 100})
+        self.assertEqual(len(response.data['data']['updated']), 5)
+        response = self.client.get(self.url, {'cursor': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class MediaTestCase(InspectorTestCase):
+    """媒体文件测试基类：MEDIA_ROOT 指向临时目录"""
+    
+    def setUp(self):
+        super().setUp()
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        override = override_settings(
+            MEDIA_ROOT=tmpdir,
+            CHUNKED_UPLOAD_DIR=os.path.join(tmpdir, 'upload_sessions'),
+            IMAGE_DERIVATIVES_ON_UPLOAD=False,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+    
+    @staticmethod
+    def png(color='red'):
+        from PIL import Image
+        
+        buffer = io.BytesIO()
+        Image.new('RGB', (32, 32), color).save(buffer, 'PNG')
+        return buffer.getvalue()
+    
+    def create_record(self, plate='豫A00001'):
+        return InspectionRecord.objects.create(created_by=self.user, license_plate_number=plate)
+    
+    def upload(self, record, content, *fields):
+        response = self.client.post(
+            reverse('inspection-upload-image', args=[record.pk]),
+            {field: SimpleUploadedFile(f'{field}.png', content, 'image/png') for field in fields},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, 200)
+        record.refresh_from_db()
+        return record
+    
+    def refcount(self, name):
+        return MediaBlob.objects.get(name=name).refcount
+
+
+class ContentAddressedMediaTest(MediaTestCase):
+    """相同内容只存一份，引用计数随上传、替换、删除增减"""
+    
+    def test_same_content_stored_once(self):
+        first = self.upload(self.create_record(), self.png(), 'plate_image')
+        second = self.upload(self.create_record('豫A00002'), self.png(), 'plate_image')
+        name = first.plate_image.name
+        self.assertEqual(second.plate_image.name, name)
+        self.assertEqual(name, f'inspection/plate/{name.split("/")[-2]}/{hashlib.sha256(self.png()).hexdigest()}.png')
+        self.assertEqual(os.listdir(os.path.dirname(media_storage.path(name))), [os.path.basename(name)])
+        self.assertEqual(self.refcount(name), 2)
+    
+    def test_refcount_on_replace_and_delete(self):
+        # 正面、副页存放在同一目录，相同内容为同一文件，被两个字段引用
+        record = self.upload(self.create_record(), self.png(), 'license_front_image', 'license_back_image')
+        red = record.license_front_image.name
+        self.assertEqual(record.license_back_image.name, red)
+        self.assertEqual(self.refcount(red), 2)
+        
+        record = self.upload(record, self.png('blue'), 'license_front_image')
+        blue = record.license_front_image.name
+        self.assertEqual((self.refcount(red), self.refcount(blue)), (1, 1))
+        
+        other = self.upload(self.create_record('豫A00002'), self.png('blue'), 'license_front_image')
+        self.assertEqual(self.refcount(blue), 2)
+        
+        with override_settings(MEDIA_GC_QUEUE_ON_RELEASE=True):
+            record.delete()
+        self.assertEqual((self.refcount(red), self.refcount(blue)), (0, 1))
+        self.assertIsNotNone(MediaBlob.objects.get(name=red).released_at)
+        self.assertIsNone(MediaBlob.objects.get(name=blue).released_at)
+        # 引用降为0只进入待删除队列，文件仍在
+        self.assertTrue(media_storage.exists(red))
+        
+        other.delete()
+        self.assertEqual(self.refcount(blue), 0)
+    
+    def test_rebuild_refcounts_in_place(self):
+        """dedupe_media 重建引用计数：只修正偏差，保留已在队列中的 released_at，不删除已有行"""
+        from .management.commands.dedupe_media import Command as DedupeCommand
+        old = timezone.now() - timedelta(hours=48)
+        referenced = MediaBlob.objects.create(name='inspection/plate/aa/referenced.png', refcount=5, released_at=old)
+        queued = MediaBlob.objects.create(name='inspection/plate/aa/queued.png', refcount=0, released_at=old)
+        dropped = MediaBlob.objects.create(name='inspection/plate/aa/dropped.png', refcount=2)
+        self.create_record()
+        InspectionRecord.objects.update(plate_image=referenced.name, brake_report_image='inspection/brake/bb/new.png')
+        
+        with override_settings(MEDIA_GC_QUEUE_ON_RELEASE=True):
+            DedupeCommand().rebuild_refcounts()
+        blobs = MediaBlob.objects.in_bulk(field_name='name')
+        self.assertEqual((blobs[referenced.name].pk, blobs[referenced.name].refcount), (referenced.pk, 1))
+        self.assertIsNone(blobs[referenced.name].released_at)
+        self.assertEqual((blobs[queued.name].refcount, blobs[queued.name].released_at), (0, old))
+        self.assertEqual(blobs[dropped.name].refcount, 0)
+        self.assertIsNotNone(blobs[dropped.name].released_at)
+        self.assertEqual(blobs['inspection/brake/bb/new.png'].refcount, 1)
+
+
+class GarbageCollectMediaTest(MediaTestCase):
+    """gc_media：只删除无引用且超过宽限期的文件（连同衍生图），--dry-run 不删除"""
+    
+    def write(self, name, content=b'x', age_hours=48):
+        path = media_storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        mtime = (timezone.now() - timedelta(hours=age_hours)).timestamp()
+        os.utime(path, (mtime, mtime))
+        return name
+    
+    def gc(self, *args):
+        out = io.StringIO()
+        call_command('gc_media', '--grace-hours', '24', *args, stdout=out)
+        return out.getvalue()
+    
+    def test_sweep(self):
+        referenced = self.write('inspection/plate/aa/referenced.png')
+        self.create_record()
+        InspectionRecord.objects.update(plate_image=referenced)
+        archived = self.write('inspection/plate/aa/archived.png')
+        ArchivedInspectionRecord.objects.create(
+            id=10 ** 6, created_by=self.user, license_plate_number='豫A00009', plate_image=archived,
+            created_at=timezone.now(), updated_at=timezone.now()
+        )
+        orphan = self.write('inspection/plate/bb/orphan.png')
+        orphan_thumb = self.write(ImageDerivativeService.derivative_name(orphan, 'thumb', 'jpeg'))
+        referenced_thumb = self.write(ImageDerivativeService.derivative_name(referenced, 'thumb', 'jpeg'))
+        recent = self.write('inspection/plate/cc/recent.png', age_hours=1)
+        
+        output = self.gc('--dry-run')
+        self.assertIn(orphan, output)
+        self.assertNotIn(referenced, output.replace(referenced_thumb, ''))
+        for name in (referenced, archived, orphan, orphan_thumb, referenced_thumb, recent):
+            self.assertTrue(media_storage.exists(name), name)
+        
+        self.gc()
+        self.assertFalse(media_storage.exists(orphan))
+        self.assertFalse(media_storage.exists(orphan_thumb))
+        # 有引用的文件（含归档记录引用）及其衍生图、宽限期内的文件保留
+        for name in (referenced, archived, referenced_thumb, recent):
+            self.assertTrue(media_storage.exists(name), name)
+    
+    def test_queue(self):
+        released = self.write('inspection/plate/aa/released.png')
+        drifted = self.write('inspection/plate/aa/drifted.png')
+        self.create_record()
+        InspectionRecord.objects.update(plate_image=drifted)
+        old = timezone.now() - timedelta(hours=48)
+        MediaBlob.objects.create(name=released, refcount=0, released_at=old)
+        # 引用计数有偏差：记录仍引用该文件
+        MediaBlob.objects.create(name=drifted, refcount=0, released_at=old)
+        
+        self.gc('--queue-only', '--dry-run')
+        self.assertTrue(media_storage.exists(released))
+        self.assertEqual(MediaBlob.objects.count(), 2)
+        
+        self.gc('--queue-only')
+        self.assertFalse(media_storage.exists(released))
+        self.assertFalse(MediaBlob.objects.filter(name=released).exists())
+        self.assertTrue(media_storage.exists(drifted))
+        self.assertIsNone(MediaBlob.objects.get(name=drifted).released_at)
+
+
+class ImageDerivativeTest(MediaTestCase):
+    """请求中不生成衍生图：缺失时返回原图地址，事务提交后在后台补齐，也可由 generate_derivatives 命令批量生成"""
+    
+    def test_missing_derivatives_fall_back_to_original(self):
+        record = self.upload(self.create_record(), self.png(), 'plate_image')
+        name = record.plate_image.name
+        detail_url = reverse('inspection-detail', args=[record.pk])
+        
+        with mock.patch.object(ImageDerivativeService, 'generate') as generate:
+            detail = self.client.get(detail_url).data['data']
+            listing = self.client.get(reverse('inspection-list-create')).data['data']
+        generate.assert_not_called()
+        original = detail['plate_image']
+        self.assertEqual(detail['image_derivatives']['plate_image']['thumb']['jpeg'], original)
+        self.assertEqual(listing['results'][0]['thumbnail']['jpeg'], original)
+        self.assertTrue(ImageDerivativeService.missing(name))
+        
+        call_command('generate_derivatives', '--dry-run', stdout=io.StringIO())
+        self.assertTrue(ImageDerivativeService.missing(name))
+        call_command('generate_derivatives', stdout=io.StringIO())
+        self.assertEqual(ImageDerivativeService.missing(name), [])
+        
+        cache.clear()
+        detail = self.client.get(detail_url).data['data']
+        thumb = detail['image_derivatives']['plate_image']['thumb']['jpeg']
+        self.assertNotEqual(thumb, original)
+        self.assertIn(ImageDerivativeService.derivative_name(name, 'thumb', 'jpeg'), thumb)
+    
+    def test_missing_derivatives_generated_in_background(self):
+        record = self.upload(self.create_record(), self.png(), 'plate_image', 'license_front_image')
+        name = record.plate_image.name
+        # 后台线程池替换为同步执行，便于断言
+        executor = mock.Mock(submit=lambda fn, *args: fn(*args))
+        
+        with mock.patch.object(ImageDerivativeService, '_get_executor', return_value=executor), \
+                mock.patch.object(ImageDerivativeService, 'generate', wraps=ImageDerivativeService.generate) as generate, \
+                self.captureOnCommitCallbacks(execute=True):
+            listing = self.client.get(reverse('inspection-list-create')).data['data']
+            # 响应返回前不生成
+            generate.assert_not_called()
+        self.assertEqual(listing['results'][0]['thumbnail']['jpeg'], listing['results'][0]['thumbnail']['webp'])
+        # 列表只用到车牌照片的缩略图
+        generate.assert_called_once_with(name)
+        self.assertEqual(ImageDerivativeService.missing(name), [])
+        
+        cache.clear()
+        thumbnail = self.client.get(reverse('inspection-list-create')).data['data']['results'][0]['thumbnail']
+        self.assertIn(ImageDerivativeService.derivative_name(name, 'thumb', 'jpeg'), thumbnail['jpeg'])
+
+
+class SignedMediaURLTest(MediaTestCase):
+    """图片地址为短期签名地址：签名覆盖文件路径 + 用户 + 签发时间，不再接受查询参数中的token"""
+    
+    def setUp(self):
+        super().setUp()
+        self.record = self.upload(self.create_record(), self.png(), 'plate_image')
+        self.url = self.client.get(
+            reverse('inspection-detail', args=[self.record.pk])
+        ).data['data']['plate_image']
+        self.anonymous = APIClient()
+    
+    def test_signed_url_serves_file_without_credentials(self):
+        response = self.anonymous.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.png())
+        # 没有签名也没有认证信息
+        self.assertEqual(self.anonymous.get(self.url.split('?')[0]).status_code, 401)
+    
+    def test_raw_token_in_query_rejected(self):
+        token = Token.objects.create(user=self.user)
+        response = self.anonymous.get(self.url.split('?')[0], {'token': token.key})
+        self.assertEqual(response.status_code, 401)
+    
+    def test_tampered_url_rejected(self):
+        other = User.objects.create_user(username='other', password='p')
+        path, query = self.url.split('?')
+        # 换成其他用户、换成其他文件
+        forged = query.replace(f'uid={self.user.pk}', f'uid={other.pk}')
+        self.assertEqual(self.anonymous.get(f'{path}?{forged}').status_code, 403)
+        other_name = self.record.plate_image.name.replace('.png', '.thumb.jpg')
+        self.assertEqual(self.anonymous.get(f'{media_storage.url(other_name)}?{query}').status_code, 403)
+        # 用户停用后签名地址失效
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.anonymous.get(self.url).status_code, 403)
+    
+    def test_signed_url_expires(self):
+        with mock.patch('time.time', return_value=time.time() + settings.MEDIA_URL_EXPIRE_SECONDS + 1):
+            self.assertEqual(self.anonymous.get(self.url).status_code, 403)
+    
+    def test_etag_changes_with_signing_epoch(self):
+        """签发周期切换后304失效以便客户端获取新地址，If-Match 不受影响"""
+        detail_url = reverse('inspection-detail', args=[self.record.pk])
+        etag = self.client.get(detail_url)['ETag']
+        list_etag = self.client.get(reverse('inspection-list-create'))['ETag']
+        
+        later = time.time() + settings.MEDIA_URL_EXPIRE_SECONDS
+        with mock.patch('time.time', return_value=later):
+            response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.data['data']['plate_image'], self.url)
+            self.assertEqual(self.anonymous.get(response.data['data']['plate_image']).status_code, 200)
+            response = self.client.get(reverse('inspection-list-create'), HTTP_IF_NONE_MATCH=list_etag)
+            self.assertEqual(response.status_code, 200)
+            
+            response = self.client.put(
+                detail_url, {'owner': '张三'}, format='json', HTTP_IF_MATCH=etag
+            )
+            self.assertEqual(response.status_code, 200)
+
+
+class UploadSessionTest(MediaTestCase):
+    """分片上传：断点续传、乱序分片、SHA-256 校验、会话过期、非图片内容"""
+    
+    def setUp(self):
+        super().setUp()
+        self.record = self.create_record()
+        self.content = self.png()
+    
+    def start(self, content, filename='plate.png'):
+        response = self.client.post(
+            reverse('upload-session-create', args=[self.record.pk]),
+            {'field': 'plate_image', 'filename': filename, 'size': len(content)}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        return UploadSession.objects.get(pk=response.data['data']['upload_id'])
+    
+    def put_chunk(self, session, content, start, end):
+        return self.client.put(
+            reverse('upload-session', args=[session.pk]), content[start:end],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end - 1}/{len(content)}'
+        )
+    
+    def complete(self, session, content):
+        return self.client.post(
+            reverse('upload-session-complete', args=[session.pk]),
+            {'sha256': hashlib.sha256(content).hexdigest()}, format='json'
+        )
+    
+    def assert_discarded(self, session):
+        self.assertFalse(UploadSession.objects.filter(pk=session.pk).exists())
+        self.assertFalse(os.path.exists(session.path))
+    
+    def test_resume_and_complete(self):
+        session = self.start(self.content)
+        half = len(self.content) // 2
+        self.assertEqual(self.put_chunk(session, self.content, 0, half).data['data']['offset'], half)
+        # 断线重连后查询偏移量继续上传
+        response = self.client.get(reverse('upload-session', args=[session.pk]))
+        self.assertEqual(response.data['data']['offset'], half)
+        self.put_chunk(session, self.content, half, len(self.content))
+        
+        self.assertEqual(self.complete(session, self.content).status_code, 200)
+        self.record.refresh_from_db()
+        self.assertEqual(self.record.plate_image.read(), self.content)
+        self.assert_discarded(session)
+    
+    def test_out_of_order_chunk(self):
+        session = self.start(self.content)
+        half = len(self.content) // 2
+        response = self.put_chunk(session, self.content, half, len(self.content))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['data']['offset'], 0)
+        
+        # 未完成时不能提交
+        self.put_chunk(session, self.content, 0, half)
+        response = self.complete(session, self.content)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['data'], {'offset': half, 'size': len(self.content)})
+        # 重复提交已接收的分片同样返回当前偏移量
+        response = self.put_chunk(session, self.content, 0, half)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['data']['offset'], half)
+    
+    def test_sha256_mismatch_discards_upload(self):
+        session = self.start(self.content)
+        self.put_chunk(session, self.content, 0, len(self.content))
+        response = self.complete(session, self.png('blue'))
+        self.assertEqual(response.status_code, 400)
+        self.assert_discarded(session)
+        self.record.refresh_from_db()
+        self.assertFalse(self.record.plate_image)
+    
+    def test_expired_session(self):
+        session = self.start(self.content)
+        self.put_chunk(session, self.content, 0, len(self.content))
+        expired = timezone.now() - timedelta(hours=settings.CHUNKED_UPLOAD_EXPIRE_HOURS, minutes=1)
+        UploadSession.objects.filter(pk=session.pk).update(updated_at=expired)
+        
+        self.assertEqual(self.complete(session, self.content).status_code, 404)
+        self.assert_discarded(session)
+        self.assertEqual(self.client.get(reverse('upload-session', args=[session.pk])).status_code, 404)
+    
+    def test_non_image_payload_rejected(self):
+        content = b'not an image at all'
+        session = self.start(content)
+        self.put_chunk(session, content, 0, len(content))
+        response = self.complete(session, content)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['message'], '请上传图片文件')
+        self.assert_discarded(session)
+        self.record.refresh_from_db()
+        self.assertFalse(self.record.plate_image)
+        
+        # 扩展名不是图片时不创建会话
+        response = self.client.post(
+            reverse('upload-session-create', args=[self.record.pk]),
+            {'field': 'plate_image', 'filename': 'a.exe', 'size': 10}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class AsyncAPIViewTest(InspectorTestCase):
+    """异步视图走 DRF 的内容协商、渲染器与异常处理"""
+    
+    def setUp(self):
+        super().setUp()
+        User.objects.filter(pk=self.user.pk).update(role=User.Role.OCR_USER)
+        self.user.refresh_from_db()
+        self.client.force_authenticate(self.user)
+        patch = mock.patch.object(OCRService, 'arecognize_car_number', side_effect=self.afake_ocr)
+        patch.start()
+        self.addCleanup(patch.stop)
+    
+    @staticmethod
+    async def afake_ocr(*args, **kwargs):
+        return fake_ocr_result()
+    
+    def recognize(self, **extra):
+        image = SimpleUploadedFile('a.png', png_bytes(), content_type='image/png')
+        return self.client.post(reverse('ocr-license-plate'), {'image': image}, format='multipart', **extra)
+    
+    def test_content_negotiation(self):
+        response = self.recognize()
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json()['data']['plate_number'], '豫A00001')
+        
+        if settings.MSGPACK_ENABLED:
+            import msgpack
+            
+            response = self.recognize(HTTP_ACCEPT='application/msgpack')
+            self.assertEqual(response['Content-Type'], 'application/msgpack')
+            self.assertEqual(msgpack.unpackb(response.content)['data']['plate_number'], '豫A00001')
+    
+    def test_exception_handler_and_authentication(self):
+        rest_framework = {**settings.REST_FRAMEWORK, 'EXCEPTION_HANDLER': f'{__name__}.envelope_exception_handler'}
+        with override_settings(REST_FRAMEWORK=rest_framework):
+            response = self.client.get(reverse('inspection-export', args=[999999]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['code'], 404)
+        
+        response = APIClient().post(reverse('ocr-license-plate'))
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response)
+        response = self.client.get(reverse('ocr-license-plate'))
+        self.assertEqual(response.status_code, 405)
+
+
+# ---------- 查询数预算 ----------
+
+def project_stack(tail=8):
+    """
+    当前调用栈：本项目代码的帧，加上触发查询的最内层若干帧（可能位于 Django/DRF 内部，
+    如后台列表逐行读取外键）；去掉数据库执行层与 execute_wrapper
+    """
+    root = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()[:-2]
+        if '/django/db/' not in frame.filename
+        and frame.filename not in (__file__, metrics.__file__, profiling.__file__)
+    ]
+    inner = set(range(max(len(frames) - tail, 0), len(frames)))
+    frames = [
+        frame for i, frame in enumerate(frames)
+        if i in inner or (frame.filename.startswith(root) and 'site-packages' not in frame.filename)
+    ]
+    return ''.join(traceback.format_list(frames))
+
+
+def normalize_sql(sql):
+    """去掉参数个数的差异（IN 列表），便于按语句归类"""
+    return re.sub(r'\(\s*%s(?:\s*,\s*%s)*\s*\)', '(...)', sql)
+
+
+class QueryLog:
+    """记录请求期间执行的SQL及其调用栈（execute_wrapper）"""
+    
+    def __init__(self):
+        self.queries = []
+    
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append({'sql': sql, 'params': params, 'stack': project_stack()})
+        return execute(sql, params, many, context)
+    
+    def __len__(self):
+        return len(self.queries)
+    
+    def report(self):
+        """全部SQL，以及重复执行的语句（疑似 N+1）最常见的调用栈"""
+        stacks = {}
+        for query in self.queries:
+            stacks.setdefault(normalize_sql(query['sql']), Counter())[query['stack']] += 1
+        lines = [f'{i}. {normalize_sql(query["sql"])}' for i, query in enumerate(self.queries, 1)]
+        for sql, counter in stacks.items():
+            total = sum(counter.values())
+            if total > 1:
+                stack, count = counter.most_common(1)[0]
+                lines.append(f'\n重复 {total} 次（以下调用栈 {count} 次）: {sql}\n{stack}')
+        return '\n'.join(lines)
+
+
+class QueryBudget:
+    """
+    一个接口/后台页面的查询数预算
+    url_name: URL 名称（后台页面带 admin: 前缀）；args/data/extra 为 lambda test: ...，在计数前求值
+    """
+    
+    def __init__(self, url_name, method, budget, args=None, data=None, format=None,
+                 extra=None, status=200, admin=False):
+        self.url_name = url_name
+        self.method = method
+        self.budget = budget
+        self.args = args
+        self.data = data
+        self.format = format
+        self.extra = extra
+        self.status = status
+        self.admin = admin
+    
+    def __str__(self):
+        return f'{self.method.upper()} {self.url_name}'
+
+
+def png_bytes():
+    from PIL import Image
+    
+    buffer = io.BytesIO()
+    Image.new('RGB', (32, 32), 'red').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def fake_ocr_result(*args, **kwargs):
+    return {'raw_data': {}, 'license_plate_number': '豫A00001'}
+
+
+# 接口查询数预算：覆盖 apps/inspection/urls.py 与 apps/users/urls.py 的全部接口
+API_QUERY_BUDGETS = [
+    QueryBudget('login', 'post', 3, data=lambda t: {'username': 'inspector', 'password': 'p'},
+                format='json'),
+    QueryBudget('logout', 'post', 2),
+    QueryBudget('profile', 'get', 1),
+    QueryBudget('ocr-driving-license', 'post', 1, format='multipart',
+                data=lambda t: {'image': t.image_file()}),
+    QueryBudget('ocr-license-plate', 'post', 1, format='multipart',
+                data=lambda t: {'image': t.image_file()}),
+    QueryBudget('vehicle-lookup', 'get', 2, data=lambda t: {'plate': t.record.license_plate_number}),
+    QueryBudget('inspection-list-create', 'get', 3, data={'page_size': 100}),
+    QueryBudget('inspection-list-create', 'post', 7, format='json', status=201,
+                data=lambda t: {'license_plate_number': '豫B00001', 'vehicle_type': '拖拉机'}),
+    QueryBudget('inspection-changes', 'get', 3, data={'limit': 500}),
+    QueryBudget('inspection-bulk', 'post', 9, format='json',
+                data=lambda t: {'records': [
+                    {'license_plate_number': f'豫C{i:05d}', 'vehicle_type': '拖拉机'} for i in range(10)
+                ]}),
+    QueryBudget('inspection-detail', 'get', 2, args=lambda t: [t.record.pk]),
+    QueryBudget('inspection-detail', 'put', 8, args=lambda t: [t.record.pk], format='json',
+                data={'owner': '张三'}),
+    QueryBudget('inspection-detail', 'delete', 7, args=lambda t: [t.create_record().pk]),
+    QueryBudget('inspection-upload-image', 'post', 7, args=lambda t: [t.create_record().pk],
+                format='multipart', data=lambda t: {'plate_image': t.image_file()}),
+    QueryBudget('inspection-statistics', 'get', 4),
+    QueryBudget('upload-session-create', 'post', 3, args=lambda t: [t.record.pk], format='json',
+                status=201, data={'field': 'plate_image', 'filename': 'a.png', 'size': 100}),
+    QueryBudget('upload-session', 'get', 2, args=lambda t: [t.upload_session().pk]),
+    QueryBudget('upload-session', 'put', 4, args=lambda t: [t.upload_session().pk],
+                extra=lambda t: {'data': b'x' * 10, 'content_type': 'application/octet-stream',
+                                 'HTTP_CONTENT_RANGE': 'bytes 0-9/100'}),
+    QueryBudget('upload-session-complete', 'post', 8, args=lambda t: [t.upload_session(complete=True).pk],
+                format='json', data=lambda t: {'sha256': hashlib.sha256(t.png).hexdigest()}),
+    QueryBudget('inspection-export', 'get', 2, args=lambda t: [t.record.pk]),
+    QueryBudget('inspection-batch-export', 'post', 2, format='json',
+                data=lambda t: {'ids': t.record_ids(50)}),
+]
+
+# 后台页面查询数预算：每个已注册模型的列表页，以及检验记录的修改页与自定义页面
+ADMIN_QUERY_BUDGETS = [
+    QueryBudget('admin:inspection_inspectionrecord_changelist', 'get', 6, admin=True),
+    QueryBudget('admin:inspection_inspectionrecord_change', 'get', 6, admin=True,
+                args=lambda t: [t.record.pk]),
+    QueryBudget('admin:inspection_inspectionrecord_changelist', 'post', 7, admin=True,
+                data=lambda t: {'action': 'export_selected_records', '_selected_action': t.record_ids(50)}),
+    QueryBudget('admin:inspection_export_single', 'get', 3, admin=True, args=lambda t: [t.record.pk]),
+    QueryBudget('admin:inspection_ocr_recognize', 'post', 2, admin=True, format='multipart',
+                data=lambda t: {'plate_image': t.image_file()}),
+    QueryBudget('admin:inspection_inspectiondailystat_changelist', 'get', 9, admin=True),
+    QueryBudget('admin:inspection_vehicle_changelist', 'get', 6, admin=True),
+    QueryBudget('admin:inspection_vehicle_change', 'get', 5, admin=True,
+                args=lambda t: [t.record_vehicle().pk]),
+    QueryBudget('admin:inspection_archivedinspectionrecord_changelist', 'get', 5, admin=True),
+    QueryBudget('admin:users_user_changelist', 'get', 5, admin=True),
+    QueryBudget('admin:users_user_change', 'get', 5, admin=True, args=lambda t: [t.user.pk]),
+    QueryBudget('admin:users_systemconfig_changelist', 'get', 5, admin=True),
+]
+
+
+@override_settings(**ADMIN_TEST_SETTINGS)
+class QueryBudgetTest(TestCase):
+    """
+    查询数预算：每个接口与后台页面分别在 10 条和 1000 条检验记录下请求一次，
+    查询数必须相同（不随行数增长）且不超过预算；失败时输出全部SQL与重复语句的调用栈
+    """
+    
+    SMALL_ROWS = 10
+    LARGE_ROWS = 1000
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.tmpdir, ignore_errors=True)
+        override = override_settings(
+            MEDIA_ROOT=os.path.join(cls.tmpdir, 'media'),
+            CHUNKED_UPLOAD_DIR=os.path.join(cls.tmpdir, 'upload_sessions'),
+        )
+        override.enable()
+        cls.addClassCleanup(override.disable)
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(username='admin', password='admin')
+        cls.user = User.objects.create_user(username='inspector', password='p', role=User.Role.OCR_USER)
+        cls.png = png_bytes()
+    
+    def setUp(self):
+        patches = [
+            mock.patch.object(OCRService, 'arecognize_vehicle_license', side_effect=self.afake_ocr),
+            mock.patch.object(OCRService, 'arecognize_car_number', side_effect=self.afake_ocr),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+    
+    @staticmethod
+    async def afake_ocr(*args, **kwargs):
+        return fake_ocr_result()
+    
+    # ---------- 测试数据 ----------
+    
+    def seed_records(self, count):
+        """通过批量同步写入，变更日志、统计表与农机档案随记录一起增长"""
+        existing = InspectionRecord.objects.filter(created_by=self.user).count()
+        for start in range(existing, existing + count, InspectionBulkService.MAX_ITEMS):
+            items = [
+                {
+                    'license_plate_number': f'豫A{i:05d}',
+                    'vehicle_type': ['拖拉机', '联合收割机'][i % 2],
+                    'owner': f'农户{i}',
+                    'chassis_number': f'LS{i:08d}',
+                }
+                for i in range(start, min(start + InspectionBulkService.MAX_ITEMS, existing + count))
+            ]
+            InspectionBulkService.save(self.user, items, False)
+        # 带图片的记录（列表缩略图、详情衍生图）
+        InspectionRecord.objects.filter(created_by=self.user).update(
+            plate_image='inspection/plate/plate.png', license_front_image='inspection/license/front.png'
+        )
+        self.record = InspectionRecord.objects.filter(created_by=self.user).order_by('id').first()
+    
+    def create_record(self):
+        return InspectionRecord.objects.create(created_by=self.user, license_plate_number='豫Z00001')
+    
+    def record_ids(self, limit):
+        return list(
+            InspectionRecord.objects.filter(created_by=self.user).order_by('id')
+            .values_list('id', flat=True)[:limit]
+        )
+    
+    def record_vehicle(self):
+        return Vehicle.objects.order_by('id').first()
+    
+    def image_file(self):
+        return SimpleUploadedFile('a.png', self.png, content_type='image/png')
+    
+    def upload_session(self, complete=False):
+        size = len(self.png) if complete else 100
+        session = UploadSession.objects.create(
+            user=self.user, record=self.create_record(), field='plate_image', filename='a.png', size=size,
+            received=size if complete else 0
+        )
+        os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+        with open(session.path, 'wb') as f:
+            f.write(self.png if complete else b'')
+        return session
+    
+    # ---------- 计数 ----------
+    
+    def client_for(self, budget):
+        if budget.admin:
+            client = Client()
+            client.force_login(self.admin_user)
+            return client
+        client = APIClient()
+        token, _ = Token.objects.get_or_create(user=self.user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+    
+    def measure(self, budget):
+        client = self.client_for(budget)
+        args = budget.args(self) if budget.args else []
+        data = budget.data(self) if callable(budget.data) else budget.data
+        kwargs = budget.extra(self) if budget.extra else {}
+        if data is not None:
+            kwargs['data'] = data
+        if budget.format and not budget.admin:
+            kwargs['format'] = budget.format
+        url = reverse(budget.url_name, args=args)
+        # 冷缓存：计入缓存未命中时的全部查询
+        cache.clear()
+        log = QueryLog()
+        with connection.execute_wrapper(log):
+            response = getattr(client, budget.method)(url, **kwargs)
+        self.assertEqual(
+            response.status_code, budget.status,
+            f'{budget}: {getattr(response, "content", b"")[:500]!r}'
+        )
+        return log
+    
+    def check_budgets(self, budgets):
+        self.seed_records(self.SMALL_ROWS)
+        # 预热一轮：首次请求才会执行的写入（新建农机档案、统计行等）不计入对比
+        for budget in budgets:
+            self.measure(budget)
+        small = {budget: self.measure(budget) for budget in budgets}
+        self.seed_records(self.LARGE_ROWS - self.SMALL_ROWS)
+        large = {budget: self.measure(budget) for budget in budgets}
+        
+        for budget in budgets:
+            with self.subTest(str(budget)):
+                if len(large[budget]) != len(small[budget]):
+                    self.fail(
+                        f'{budget} 查询数随行数增长: {self.SMALL_ROWS} 行 {len(small[budget])} 条，'
+                        f'{self.LARGE_ROWS} 行 {len(large[budget])} 条\n{large[budget].report()}'
+                    )
+                if len(large[budget]) > budget.budget:
+                    self.fail(
+                        f'{budget} 查询数 {len(large[budget])} 超出预算 {budget.budget}\n'
+                        f'{large[budget].report()}'
+                    )
+    
+    def test_api_query_budgets(self):
+        self.check_budgets(API_QUERY_BUDGETS)
+    
+    def test_admin_query_budgets(self):
+        self.check_budgets(ADMIN_QUERY_BUDGETS)
+    
+    def test_budgets_cover_all_endpoints(self):
+        """新增接口或请求方式时必须声明预算"""
+        declared = {(budget.url_name, budget.method) for budget in API_QUERY_BUDGETS}
+        for urlpatterns in (inspection_urls.urlpatterns, users_urls.urlpatterns):
+            for pattern in urlpatterns:
+                view_class = pattern.callback.view_class
+                for method in view_class.http_method_names:
+                    if method in ('options', 'head') or not hasattr(view_class, method):
+                        continue
+                    with self.subTest(f'{method.upper()} {pattern.name}'):
+                        self.assertIn((pattern.name, method), declared)
+        
+        declared_admin = {budget.url_name for budget in ADMIN_QUERY_BUDGETS}
+        for model in admin.site._registry:
+            with self.subTest(model._meta.label):
+                self.assertIn(
+                    f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist', declared_admin
+                )
+
+
+class NumericFieldsTest(InspectorTestCase):
+    """副页文字字段解析为数值字段，列表接口按数值范围筛选"""
+    
+    def test_parse(self):
+        self.assertEqual(parse_weight('3500kg'), 3500)
+        self.assertEqual(parse_weight('3,500 千克'), 3500)
+        self.assertEqual(parse_weight('3.5t'), 3500)
+        self.assertEqual(parse_weight('５２００ＫＧ'), 5200)
+        self.assertIsNone(parse_weight('--'))
+        self.assertEqual(parse_count('2人'), 2)
+        # 超出准乘人数字段（PositiveSmallIntegerField）范围视为识别错误
+        self.assertEqual(parse_count('32767'), 32767)
+        self.assertIsNone(parse_count('40000人'))
+        self.assertEqual(parse_dimension('4200×2000×2800'), (4200, 2000, 2800))
+        self.assertEqual(parse_dimension('4200*2000*2800mm'), (4200, 2000, 2800))
+        self.assertEqual(parse_dimension('4.2x2.0x2.8'), (4200, 2000, 2800))
+        self.assertEqual(parse_dimension('4200×2000'), (None, None, None))
+    
+    def test_filled_on_save_and_bulk(self):
+        record = InspectionRecord.objects.create(
+            created_by=self.user, license_plate_number='豫A00001',
+            harvester_weight='5200kg', overall_dimension='4200×2000×2800'
+        )
+        self.assertEqual(record.harvester_weight_kg, 5200)
+        self.assertEqual(record.overall_height_mm, 2800)
+        
+        record.harvester_weight = '4.8t'
+        record.save(update_fields=['harvester_weight'])
+        record.refresh_from_db()
+        self.assertEqual(record.harvester_weight_kg, 4800)
+        
+        results, has_errors = InspectionBulkService.save(self.user, [
+            {'id': record.pk, 'overall_dimension': '5000×2200×3000'},
+            {'license_plate_number': '豫A00002', 'tractor_max_load': '1200kg'},
+        ])
+        self.assertFalse(has_errors)
+        record.refresh_from_db()
+        self.assertEqual(record.overall_length_mm, 5000)
+        self.assertEqual(InspectionRecord.objects.get(pk=results[1]['id']).tractor_max_load_kg, 1200)
+    
+    def test_list_range_filters(self):
+        for i, weight in enumerate(['3000kg', '5200kg', '7000kg', '']):
+            InspectionRecord.objects.create(
+                created_by=self.user, license_plate_number=f'豫A0000{i}', harvester_weight=weight
+            )
+        url = reverse('inspection-list-create')
+        response = self.client.get(url, {'harvester_weight_kg_min': 5000})
+        self.assertEqual(response.data['data']['total'], 2)
+        response = self.client.get(url, {'harvester_weight_kg_min': 5000, 'harvester_weight_kg_max': 6000})
+        self.assertEqual(response.data['data']['total'], 1)
+        response = self.client.get(url, {'harvester_weight_kg_min': 'abc'})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_backfill_command(self):
+        record = InspectionRecord.objects.create(
+            created_by=self.user, license_plate_number='豫A00001', tractor_min_weight='2500kg'
+        )
+        InspectionRecord.objects.filter(pk=record.pk).update(tractor_min_weight_kg=None)
+        archived = ArchivedInspectionRecord.objects.create(
+            id=record.pk + 1000, created_by=self.user, license_plate_number='豫A00002',
+            passenger_capacity='3人', created_at=timezone.now(), updated_at=timezone.now()
+        )
+        url = reverse('inspection-list-create')
+        etag = self.client.get(url)['ETag']
+        
+        call_command('backfill_numeric_fields', stdout=io.StringIO())
+        record.refresh_from_db()
+        self.assertEqual(record.tractor_min_weight_kg, 2500)
+        archived.refresh_from_db()
+        self.assertEqual(archived.passenger_capacity_num, 3)
+        # 数值字段变化后列表ETag失效
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ArchiveTest(InspectorTestCase):
+    """归档：旧记录分批移入归档表，按id读取、增量同步与导出透明回查，修改/删除时先恢复到热表"""
+    
+    def setUp(self):
+        super().setUp()
+        self.old = [
+            InspectionRecord.objects.create(
+                created_by=self.user, license_plate_number=f'豫A0000{i}', vehicle_type='拖拉机',
+                plate_image=f'inspection/plate/{i}.png'
+            )
+            for i in range(3)
+        ]
+        InspectionRecord.objects.filter(pk__in=[r.pk for r in self.old]).update(
+            created_at=timezone.now() - timedelta(days=800)
+        )
+        self.new = InspectionRecord.objects.create(created_by=self.user, license_plate_number='豫A00009')
+    
+    def archive(self, **options):
+        call_command('archive_inspections', days=730, batch_size=2, stdout=io.StringIO(), **options)
+    
+    def test_archive_command(self):
+        UploadSession.objects.create(
+            user=self.user, record=self.old[0], field='plate_image', filename='a.png', size=10
+        )
+        stat_total = sum(InspectionDailyStat.objects.values_list('count', flat=True))
+        refcounts = dict(MediaBlob.objects.values_list('name', 'refcount'))
+        
+        self.archive(dry_run=True)
+        self.assertEqual(InspectionRecord.objects.count(), 4)
+        self.archive(limit=2)
+        self.assertEqual(ArchivedInspectionRecord.objects.count(), 2)
+        # 中断后重新执行，从剩余记录继续
+        self.archive()
+        self.archive()
+        
+        self.assertEqual(list(InspectionRecord.objects.values_list('pk', flat=True)), [self.new.pk])
+        archived = ArchivedInspectionRecord.objects.get(pk=self.old[0].pk)
+        self.assertEqual(archived.plate_image.name, 'inspection/plate/0.png')
+        self.assertEqual(archived.created_by, self.user)
+        self.assertFalse(UploadSession.objects.exists())
+        # 记录并未删除：不写删除标记，统计与图片引用计数不变
+        self.assertFalse(InspectionChange.objects.filter(deleted=True).exists())
+        self.assertEqual(sum(InspectionDailyStat.objects.values_list('count', flat=True)), stat_total)
+        self.assertEqual(dict(MediaBlob.objects.values_list('name', 'refcount')), refcounts)
+    
+    def test_read_through(self):
+        self.archive()
+        pk = self.old[0].pk
+        
+        response = self.client.get(reverse('inspection-detail', args=[pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['license_plate_number'], '豫A00000')
+        
+        response = self.client.get(reverse('inspection-changes'))
+        self.assertEqual(
+            sorted(item['id'] for item in response.data['data']['updated']),
+            sorted([r.pk for r in self.old] + [self.new.pk])
+        )
+        
+        response = self.client.get(reverse('inspection-list-create'))
+        self.assertEqual(response.data['data']['total'], 1)
+        
+        response = self.client.get(reverse('inspection-export', args=[pk]))
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(
+            reverse('inspection-batch-export'), {'ids': [pk, self.new.pk]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        
+        other = User.objects.create_user(username='other', password='p')
+        self.client.force_authenticate(other)
+        response = self.client.get(reverse('inspection-detail', args=[pk]))
+        self.assertEqual(response.status_code, 404)
+    
+    def test_modify_and_delete_archived(self):
+        self.archive()
+        edited, deleted, restored = self.old
+        stat_total = sum(InspectionDailyStat.objects.values_list('count', flat=True))
+        
+        # 其他用户不能恢复
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(username='other', password='p'))
+        response = other.put(reverse('inspection-detail', args=[edited.pk]), {'owner': '李四'}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(ArchivedInspectionRecord.objects.filter(pk=edited.pk).exists())
+        
+        # 修改：恢复到热表后更新，恢复不改变 ETag
+        url = reverse('inspection-detail', args=[edited.pk])
+        etag = self.client.get(url)['ETag']
+        response = self.client.put(url, {'owner': '张三'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ArchivedInspectionRecord.objects.filter(pk=edited.pk).exists())
+        record = InspectionRecord.objects.get(pk=edited.pk)
+        self.assertEqual(record.owner, '张三')
+        self.assertLess(record.created_at, timezone.now() - timedelta(days=730))
+        
+        # 删除：下发删除标记，统计与图片引用计数减少
+        response = self.client.delete(reverse('inspection-detail', args=[deleted.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ArchivedInspectionRecord.objects.filter(pk=deleted.pk).exists())
+        self.assertFalse(InspectionRecord.objects.filter(pk=deleted.pk).exists())
+        self.assertTrue(InspectionChange.objects.get(record_id=deleted.pk).deleted)
+        self.assertEqual(sum(InspectionDailyStat.objects.values_list('count', flat=True)), stat_total - 1)
+        self.assertEqual(self.refcount_of(deleted.plate_image.name), 0)
+        
+        call_command('restore_inspections', '--user', 'inspector', stdout=io.StringIO())
+        self.assertFalse(ArchivedInspectionRecord.objects.exists())
+        self.assertEqual(InspectionRecord.objects.get(pk=restored.pk).plate_image.name, restored.plate_image.name)
+        self.assertEqual(self.refcount_of(restored.plate_image.name), 1)
+        self.assertFalse(InspectionChange.objects.filter(record_id=restored.pk, deleted=True).exists())
+    
+    @override_settings(**ADMIN_TEST_SETTINGS)
+    def test_admin_restore_action(self):
+        self.archive()
+        admin_client = Client()
+        admin_client.force_login(User.objects.create_superuser(username='admin', password='admin'))
+        response = admin_client.post(reverse('admin:inspection_archivedinspectionrecord_changelist'), {
+            'action': 'restore_selected', '_selected_action': [self.old[0].pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(InspectionRecord.objects.filter(pk=self.old[0].pk).exists())
+        self.assertEqual(ArchivedInspectionRecord.objects.count(), 2)
+    
+    @staticmethod
+    def refcount_of(name):
+        return MediaBlob.objects.get(name=name).refcount
@@ -6,11 +6,24 @@ urlpatterns = [
     path('ocr/driving-license/', views.OCRDrivingLicenseView.as_view(), name='ocr-driving-license'),
     path('ocr/license-plate/', views.OCRLicensePlateView.as_view(), name='ocr-license-plate'),
     
+    # 农机档案
+    path('vehicles/lookup/', views.VehicleLookupView.as_view(), name='vehicle-lookup'),
+    
     # 检验记录 CRUD
     path('inspections/', views.InspectionListCreateView.as_view(), name='inspection-list-create'),
+    path('inspections/changes/', views.InspectionChangesView.as_view(), name='inspection-changes'),
+    path('inspections/bulk/', views.InspectionBulkView.as_view(), name='inspection-bulk'),
     path('inspections/<int:pk>/', views.InspectionDetailView.as_view(), name='inspection-detail'),
     path('inspections/<int:pk>/upload-image/', views.InspectionUploadImageView.as_view(), name='inspection-upload-image'),
     
+    # 统计
+    path('statistics/', views.InspectionStatisticsView.as_view(), name='inspection-statistics'),
+    
+    # 分片上传（断点续传）
+    path('inspections/<int:pk>/uploads/', views.UploadSessionCreateView.as_view(), name='upload-session-create'),
+    path('uploads/<uuid:upload_id>/', views.UploadSessionView.as_view(), name='upload-session'),
+    path('uploads/<uuid:upload_id>/complete/', views.UploadSessionCompleteView.as_view(), name='upload-session-complete'),
+    
     # 导出
     path('inspections/<int:pk>/export/', views.InspectionExportView.as_view(), name='inspection-export'),
     path('inspections/export-batch/', views.InspectionBatchExportView.as_view(), name='inspection-batch-export'),
@@ -1,34 +1,117 @@
+import hashlib
+import inspect
+import os
+import re
+
+from asgiref.sync import sync_to_async
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.files import File
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.db.models import Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+
+from config.renderers import MessagePackParser
 
-from .models import InspectionRecord
+from .models import (
+    InspectionRecord,
+    InspectionChange,
+    InspectionDailyStat,
+    UploadSession,
+    Vehicle,
+    NUMERIC_FIELDS,
+    normalize_plate,
+)
 from .serializers import (
     InspectionListSerializer, 
     InspectionDetailSerializer, 
     InspectionCreateSerializer,
-    OCRResultSerializer
+    OCRResultSerializer,
+    VehiclePrefillSerializer
 )
-from .services import OCRService, WordExportService
+from .services import OCRService, WordExportService, InspectionBulkService, InspectionArchiveService
 from .permissions import CanUseOCR
+from .media import signed_media_url
+from .caches import (
+    ListResponseCache,
+    get_user_version,
+    normalize_query,
+    record_etag,
+    list_etag,
+    if_none_match,
+    if_match_failed,
+)
 
 
-class OCRDrivingLicenseView(APIView):
-    """OCR识别行驶证（正面/副页）"""
+def not_modified(etag):
+    """304响应，不返回响应体"""
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    response['ETag'] = etag
+    return response
+
+
+def precondition_failed():
+    """412响应，记录已被其他设备修改"""
+    return Response({
+        'code': 412,
+        'message': '记录已被修改，请刷新后重试',
+        'data': None
+    }, status=status.HTTP_412_PRECONDITION_FAILED)
+
+
+class AsyncAPIView(APIView):
+    """
+    异步视图基类 - ASGI 部署时等待外部接口、渲染文档期间不占用 worker
+    DRF 的 APIView.dispatch 只支持同步处理函数，这里保留相同的流程，只把处理函数改为 await：
+    initial（内容协商、版本、认证、权限、限流）、handle_exception（EXCEPTION_HANDLER）
+    与 finalize_response（渲染器）均为 DRF 原实现，在线程中执行；请求体也在线程中解析
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, FormParser, MultiPartParser]
+    
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # 预先解析请求体，处理函数中访问 request.data / request.FILES 不阻塞事件循环
+        request.data
+    
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            # OPTIONS 等 DRF 自带的处理函数为同步
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = await sync_to_async(self.handle_exception)(exc)
+        
+        self.response = await sync_to_async(self.finalize_response)(request, response, *args, **kwargs)
+        return self.response
+
+
+class OCRImageView(AsyncAPIView):
+    """OCR识别视图基类 - 调用阿里云OCR期间不阻塞事件循环"""
     permission_classes = [IsAuthenticated, CanUseOCR]
     parser_classes = [MultiPartParser, FormParser]
     
-    def post(self, request):
-        """
-        识别行驶证图片，返回结构化数据
-        """
-        image = request.FILES.get('image')
-        
+    def validate_image(self, image):
+        """校验上传的图片，返回错误响应或 None"""
         if not image:
             return Response({
                 'code': 400,
@@ -51,9 +134,23 @@ class OCRDrivingLicenseView(APIView):
                 'message': '图片大小不能超过5MB',
                 'data': None
             }, status=status.HTTP_400_BAD_REQUEST)
+        return None
+
+
+class OCRDrivingLicenseView(OCRImageView):
+    """OCR识别行驶证（正面/副页）"""
+    
+    async def post(self, request):
+        """
+        识别行驶证图片，返回结构化数据
+        """
+        image = request.FILES.get('image')
+        error = self.validate_image(image)
+        if error:
+            return error
         
         try:
-            result = OCRService.recognize_vehicle_license(image)
+            result = await OCRService.arecognize_vehicle_license(image)
             result.pop('raw_data', None)
             return Response({
                 'code': 200,
@@ -68,40 +165,20 @@ class OCRDrivingLicenseView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class OCRLicensePlateView(APIView):
+class OCRLicensePlateView(OCRImageView):
     """OCR识别车牌号"""
-    permission_classes = [IsAuthenticated, CanUseOCR]
-    parser_classes = [MultiPartParser, FormParser]
     
-    def post(self, request):
+    async def post(self, request):
         """
         识别车牌图片，返回车牌号
         """
         image = request.FILES.get('image')
-        
-        if not image:
-            return Response({
-                'code': 400,
-                'message': '请上传图片',
-                'data': None
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        if not image.content_type.startswith('image/'):
-            return Response({
-                'code': 400,
-                'message': '请上传图片文件',
-                'data': None
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        if image.size > 5 * 1024 * 1024:
-            return Response({
-                'code': 400,
-                'message': '图片大小不能超过5MB',
-                'data': None
-            }, status=status.HTTP_400_BAD_REQUEST)
+        error = self.validate_image(image)
+        if error:
+            return error
         
         try:
-            result = OCRService.recognize_car_number(image)
+            result = await OCRService.arecognize_car_number(image)
             result.pop('raw_data', None)
             return Response({
                 'code': 200,
@@ -118,16 +195,96 @@ class OCRLicensePlateView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class VehicleLookupView(APIView):
+    """按号牌/底盘号查询农机档案，用于复检时预填，免去OCR识别"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        """
+        查询参数 plate（号牌号码）或 chassis_number（底盘号/机架号）
+        """
+        plate = normalize_plate(request.query_params.get('plate', ''))
+        chassis_number = request.query_params.get('chassis_number', '').strip()
+        if not plate and not chassis_number:
+            return Response({
+                'code': 400,
+                'message': '请输入号牌号码或底盘号',
+                'data': None
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if plate:
+            vehicle = Vehicle.objects.filter(plate_key=plate).first()
+        else:
+            vehicle = Vehicle.objects.filter(chassis_number=chassis_number).first()
+        
+        if vehicle is None:
+            return Response({
+                'code': 404,
+                'message': '未找到车辆档案',
+                'data': None
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'code': 200,
+            'message': 'success',
+            'data': VehiclePrefillSerializer(vehicle).data
+        })
+
+
 class InspectionListCreateView(APIView):
     """检验记录列表/创建"""
     permission_classes = [IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser, JSONParser]
+    parser_classes = [MultiPartParser, FormParser, JSONParser, MessagePackParser]
     
     def get(self, request):
         """
         获取检验记录列表（仅返回当前用户的记录）
+        数值范围筛选：<数值字段>_min / <数值字段>_max，如 harvester_weight_kg_min=5000
+        """
+        try:
+            ranges = self.range_filters(request.query_params)
+        except ValueError:
+            return Response({
+                'code': 400,
+                'message': '范围筛选参数必须为整数',
+                'data': None
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        version = get_user_version(request.user.pk)
+        query = normalize_query(request.query_params)
+        etag = list_etag(request.user.pk, version, query)
+        if if_none_match(request, etag):
+            return not_modified(etag)
+        
+        data = ListResponseCache.get(request.user.pk, version, query)
+        if data is None:
+            data = self.get_list_data(request, ranges)
+            ListResponseCache.set(request.user.pk, version, query, data)
+        
+        response = Response({
+            'code': 200,
+            'message': 'success',
+            'data': data
+        })
+        response['ETag'] = etag
+        return response
+    
+    @staticmethod
+    def range_filters(query_params):
+        """解析数值范围参数为查询条件，参数不是整数时抛出 ValueError"""
+        filters = {}
+        for field in NUMERIC_FIELDS:
+            for suffix, lookup in (('min', 'gte'), ('max', 'lte')):
+                value = query_params.get(f'{field}_{suffix}', '').strip()
+                if value:
+                    filters[f'{field}__{lookup}'] = int(value)
+        return filters
+    
+    def get_list_data(self, request, ranges):
+        """
+        查询并序列化列表数据
         """
-        queryset = InspectionRecord.objects.filter(created_by=request.user)
+        queryset = InspectionRecord.objects.filter(created_by=request.user, **ranges)
         
         # 搜索筛选
         keyword = request.query_params.get('keyword', '').strip()
@@ -153,19 +310,17 @@ class InspectionListCreateView(APIView):
         end = start + page_size
         
         total = queryset.count()
-        results = InspectionListSerializer(queryset[start:end], many=True).data
+        results = InspectionListSerializer(
+            queryset[start:end], many=True, context={'request': request}
+        ).data
         
-        return Response({
-            'code': 200,
-            'message': 'success',
-            'data': {
-                'total': total,
-                'page': page,
-                'page_size': page_size,
-                'total_pages': (total + page_size - 1) // page_size,
-                'results': results
-            }
-        })
+        return {
+            'total': total,
+            'page': page,
+            'page_size': page_size,
+            'total_pages': (total + page_size - 1) // page_size,
+            'results': results
+        }
     
     def post(self, request):
         """
@@ -191,34 +346,144 @@ class InspectionListCreateView(APIView):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+class InspectionBulkView(APIView):
+    """批量创建/更新检验记录"""
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, MessagePackParser]
+    
+    def post(self, request):
+        """
+        批量同步检验记录，单个事务内写入
+        请求体: {"records": [...], "partial": false}
+        更新条目可携带 if_match（详情ETag）或 updated_at，记录已被修改时该条目返回 code=412
+        """
+        items = request.data.get('records')
+        if not isinstance(items, list) or not items:
+            return Response({
+                'code': 400,
+                'message': '请提交要同步的记录',
+                'data': None
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if len(items) > InspectionBulkService.MAX_ITEMS:
+            return Response({
+                'code': 400,
+                'message': f'单次最多同步{InspectionBulkService.MAX_ITEMS}条记录',
+                'data': None
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        partial_success = str(request.data.get('partial', '')).lower() in ('1', 'true')
+        results, has_errors = InspectionBulkService.save(request.user, items, partial_success)
+        
+        if has_errors and not partial_success:
+            return Response({
+                'code': 400,
+                'message': '参数错误',
+                'data': {'results': results}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'code': 200,
+            'message': '部分同步成功' if has_errors else '同步成功',
+            'data': {'results': results}
+        })
+
+
+class InspectionChangesView(APIView):
+    """增量同步 - 获取游标之后的变更"""
+    permission_classes = [IsAuthenticated]
+    
+    # 单次最多返回的变更数
+    MAX_LIMIT = 500
+    
+    def get(self, request):
+        """
+        返回变更序号大于 cursor 的记录与删除标记，按变更序号升序
+        客户端保存返回的 cursor，has_more 为 true 时继续拉取
+        """
+        try:
+            cursor = max(int(request.query_params.get('cursor', 0)), 0)
+            limit = min(max(int(request.query_params.get('limit', 100)), 1), self.MAX_LIMIT)
+        except ValueError:
+            return Response({
+                'code': 400,
+                'message': '参数错误',
+                'data': None
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        changes = list(
+            InspectionChange.objects
+            .filter(user_id=request.user.pk, seq__gt=cursor)
+            .order_by('seq')[:limit + 1]
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        
+        upsert_ids = [c.record_id for c in changes if not c.deleted]
+        # 已归档的记录回查归档表
+        records = InspectionArchiveService.in_bulk(upsert_ids, request.user)
+        # 同步过程中被删除的记录跳过，其删除标记会在后续批次下发
+        updated = [records[pk] for pk in upsert_ids if pk in records]
+        
+        return Response({
+            'code': 200,
+            'message': 'success',
+            'data': {
+                'updated': InspectionDetailSerializer(
+                    updated, many=True, context={'request': request}
+                ).data,
+                'deleted': [c.record_id for c in changes if c.deleted],
+                'cursor': changes[-1].seq if changes else cursor,
+                'has_more': has_more
+            }
+        })
+
+
 class InspectionDetailView(APIView):
     """检验记录详情/更新/删除"""
     permission_classes = [IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser, JSONParser]
+    parser_classes = [MultiPartParser, FormParser, JSONParser, MessagePackParser]
     
     def get_object(self, pk, user):
-        return get_object_or_404(InspectionRecord, pk=pk, created_by=user)
+        """更新/删除针对热表，已归档的记录先移回热表"""
+        obj = InspectionRecord.objects.filter(pk=pk, created_by=user).first()
+        if obj is None and InspectionArchiveService.restore([pk], user):
+            obj = InspectionRecord.objects.filter(pk=pk, created_by=user).first()
+        if obj is None:
+            raise Http404
+        return obj
     
     def get(self, request, pk):
         """
-        获取检验记录详情
+        获取检验记录详情（含已归档记录）
         """
-        obj = self.get_object(pk, request.user)
-        return Response({
+        obj = InspectionArchiveService.get(pk, request.user)
+        if obj is None:
+            raise Http404
+        etag = record_etag(obj)
+        if if_none_match(request, etag):
+            return not_modified(etag)
+        
+        response = Response({
             'code': 200,
             'message': 'success',
-            'data': InspectionDetailSerializer(obj).data
+            'data': InspectionDetailSerializer(obj, context={'request': request}).data
         })
+        response['ETag'] = etag
+        return response
     
     def put(self, request, pk):
         """
         更新检验记录
         """
         obj = self.get_object(pk, request.user)
+        if if_match_failed(request, record_etag(obj)):
+            return precondition_failed()
+        
         serializer = InspectionCreateSerializer(obj, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
-            return Response({
+            response = Response({
                 'code': 200,
                 'message': '更新成功',
                 'data': {
@@ -227,6 +492,8 @@ class InspectionDetailView(APIView):
                     'updated_at': obj.updated_at.isoformat()
                 }
             })
+            response['ETag'] = record_etag(obj)
+            return response
         return Response({
             'code': 400,
             'message': '参数错误',
@@ -238,6 +505,9 @@ class InspectionDetailView(APIView):
         删除检验记录
         """
         obj = self.get_object(pk, request.user)
+        if if_match_failed(request, record_etag(obj)):
+            return precondition_failed()
+        
         obj.delete()
         return Response({
             'code': 200,
@@ -262,68 +532,310 @@ class InspectionUploadImageView(APIView):
     
     def post(self, request, pk):
         """
-        上传单张图片到检验记录
+        上传图片到检验记录，一次请求可同时上传五个图片字段中的任意多个，
+        全部校验通过后一次保存
         """
         obj = get_object_or_404(InspectionRecord, pk=pk, created_by=request.user)
         
         # 查找上传的图片字段
-        uploaded_field = None
-        uploaded_file = None
-        for field in self.ALLOWED_FIELDS:
-            if field in request.FILES:
-                uploaded_field = field
-                uploaded_file = request.FILES[field]
-                break
+        uploaded = {
+            field: request.FILES[field]
+            for field in self.ALLOWED_FIELDS
+            if field in request.FILES
+        }
         
-        if not uploaded_field:
+        if not uploaded:
             return Response({
                 'code': 400,
                 'message': '请上传图片',
                 'data': None
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # 验证文件类型
-        if not uploaded_file.content_type.startswith('image/'):
+        errors = {}
+        for field, uploaded_file in uploaded.items():
+            # 验证文件类型
+            if not uploaded_file.content_type.startswith('image/'):
+                errors[field] = '请上传图片文件'
+            # 验证文件大小（最大5MB）
+            elif uploaded_file.size > 5 * 1024 * 1024:
+                errors[field] = '图片大小不能超过5MB'
+        
+        # 任一图片校验失败则全部不保存
+        if errors:
+            return Response({
+                'code': 400,
+                'message': next(iter(errors.values())) if len(errors) == 1 else '图片校验失败',
+                'data': {'errors': errors}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # 保存图片
+        for field, uploaded_file in uploaded.items():
+            setattr(obj, field, uploaded_file)
+        obj.save(update_fields=[*uploaded, 'updated_at'])
+        
+        fields = list(uploaded)
+        return Response({
+            'code': 200,
+            'message': '上传成功',
+            'data': {
+                'id': obj.id,
+                'field': fields[0],
+                'fields': fields,
+                'results': {
+                    field: signed_media_url(getattr(obj, field).name, request.user)
+                    for field in fields
+                }
+            }
+        })
+
+
+class UploadSessionCreateView(APIView):
+    """创建分片上传会话（断点续传）"""
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, FormParser]
+    
+    # 允许的图片扩展名
+    ALLOWED_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.webp', '.bmp', '.gif']
+    
+    def post(self, request, pk):
+        """
+        请求体: {"field": "license_front_image", "filename": "a.jpg", "size": 3145728}
+        """
+        obj = get_object_or_404(InspectionRecord, pk=pk, created_by=request.user)
+        
+        field = request.data.get('field')
+        if field not in InspectionUploadImageView.ALLOWED_FIELDS:
+            return Response({
+                'code': 400,
+                'message': '图片字段错误',
+                'data': None
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        filename = os.path.basename(str(request.data.get('filename', '')))[:100]
+        if os.path.splitext(filename)[1].lower() not in self.ALLOWED_EXTENSIONS:
             return Response({
                 'code': 400,
                 'message': '请上传图片文件',
                 'data': None
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        try:
+            size = int(request.data.get('size', 0))
+        except (TypeError, ValueError):
+            size = 0
+        if size <= 0:
+            return Response({
+                'code': 400,
+                'message': '文件大小错误',
+                'data': None
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         # 验证文件大小（最大5MB）
-        if uploaded_file.size > 5 * 1024 * 1024:
+        if size > 5 * 1024 * 1024:
             return Response({
                 'code': 400,
                 'message': '图片大小不能超过5MB',
                 'data': None
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # 保存图片
-        setattr(obj, uploaded_field, uploaded_file)
-        obj.save(update_fields=[uploaded_field, 'updated_at'])
+        session = UploadSession.objects.create(
+            user=request.user, record=obj, field=field, filename=filename, size=size
+        )
+        os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+        open(session.path, 'wb').close()
+        
+        return Response({
+            'code': 201,
+            'message': '创建成功',
+            'data': {
+                'upload_id': str(session.pk),
+                'offset': 0,
+                'size': size,
+                'chunk_size': settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE
+            }
+        }, status=status.HTTP_201_CREATED)
+
+
+class UploadSessionView(APIView):
+    """分片上传：查询已接收偏移量 / 上传分片"""
+    permission_classes = [IsAuthenticated]
+    
+    CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+    
+    def get_session(self, upload_id, user):
+        session = get_object_or_404(UploadSession, pk=upload_id, user=user)
+        if session.is_expired:
+            session.discard()
+            return None
+        return session
+    
+    def session_data(self, session):
+        return {
+            'upload_id': str(session.pk),
+            'offset': session.received,
+            'size': session.size
+        }
+    
+    def get(self, request, upload_id):
+        """
+        查询已接收的字节数，断线重连后从该偏移量继续上传
+        """
+        session = self.get_session(upload_id, request.user)
+        if session is None:
+            return Response({
+                'code': 404,
+                'message': '上传会话已过期',
+                'data': None
+            }, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'code': 200,
+            'message': 'success',
+            'data': self.session_data(session)
+        })
+    
+    def put(self, request, upload_id):
+        """
+        上传分片，请求体为原始字节
+        偏移量取自 Content-Range 请求头（bytes start-end/total）或 offset 查询参数
+        """
+        session = self.get_session(upload_id, request.user)
+        if session is None:
+            return Response({
+                'code': 404,
+                'message': '上传会话已过期',
+                'data': None
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        match = self.CONTENT_RANGE_RE.match(request.META.get('HTTP_CONTENT_RANGE', ''))
+        try:
+            offset = int(match.group(1)) if match else int(request.query_params.get('offset', ''))
+        except ValueError:
+            return Response({
+                'code': 400,
+                'message': '缺少分片偏移量',
+                'data': None
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # 偏移量与已接收字节数不一致时返回当前偏移量，客户端从该位置重传
+        if offset != session.received:
+            return Response({
+                'code': 409,
+                'message': '分片偏移量不匹配',
+                'data': self.session_data(session)
+            }, status=status.HTTP_409_CONFLICT)
+        
+        chunk = request.body
+        if not chunk:
+            return Response({
+                'code': 400,
+                'message': '分片内容为空',
+                'data': None
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(chunk) > settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE or offset + len(chunk) > session.size:
+            return Response({
+                'code': 400,
+                'message': '分片大小超出限制',
+                'data': None
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        with open(session.path, 'r+b') as f:
+            f.seek(offset)
+            f.write(chunk)
+        
+        # 以旧偏移量为条件更新，并发重复提交同一分片时只生效一次
+        UploadSession.objects.filter(pk=session.pk, received=offset).update(
+            received=offset + len(chunk), updated_at=timezone.now()
+        )
+        session.refresh_from_db(fields=['received'])
+        return Response({
+            'code': 200,
+            'message': 'success',
+            'data': self.session_data(session)
+        })
+
+
+class UploadSessionCompleteView(APIView):
+    """完成分片上传：校验并写入检验记录"""
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, FormParser]
+    
+    def post(self, request, upload_id):
+        """
+        请求体: {"sha256": "<文件内容的SHA-256>"}
+        """
+        session = get_object_or_404(
+            UploadSession.objects.select_related('record'), pk=upload_id, user=request.user
+        )
+        if session.is_expired:
+            session.discard()
+            return Response({
+                'code': 404,
+                'message': '上传会话已过期',
+                'data': None
+            }, status=status.HTTP_404_NOT_FOUND)
+        if session.received != session.size:
+            return Response({
+                'code': 400,
+                'message': '文件尚未上传完成',
+                'data': {'offset': session.received, 'size': session.size}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        digest = hashlib.sha256()
+        with open(session.path, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                digest.update(chunk)
+        if digest.hexdigest() != str(request.data.get('sha256', '')).lower():
+            # 校验失败时丢弃已上传内容，客户端需重新创建会话
+            session.discard()
+            return Response({
+                'code': 400,
+                'message': '文件校验失败，请重新上传',
+                'data': None
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        from PIL import Image
+        
+        try:
+            with Image.open(session.path) as img:
+                img.verify()
+        except Exception:
+            session.discard()
+            return Response({
+                'code': 400,
+                'message': '请上传图片文件',
+                'data': None
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        obj = session.record
+        with open(session.path, 'rb') as f:
+            setattr(obj, session.field, File(f, name=session.filename))
+            obj.save(update_fields=[session.field, 'updated_at'])
+        session.discard()
         
         return Response({
             'code': 200,
             'message': '上传成功',
             'data': {
                 'id': obj.id,
-                'field': uploaded_field
+                'field': session.field
             }
         })
 
 
-class InspectionExportView(APIView):
+class InspectionExportView(AsyncAPIView):
     """导出单个Word文档"""
     permission_classes = [IsAuthenticated]
     
-    def get(self, request, pk):
+    async def get(self, request, pk):
         """
-        导出单个检验记录为Word文档
+        导出单个检验记录为Word文档，文档在线程池中渲染
         """
-        obj = get_object_or_404(InspectionRecord, pk=pk, created_by=request.user)
+        obj = await sync_to_async(InspectionArchiveService.get)(pk, request.user)
+        if obj is None:
+            raise Http404
         
         try:
-            doc_buffer, filename = WordExportService.export_single(obj)
+            doc_buffer, filename = await WordExportService.aexport_single(obj)
             response = HttpResponse(
                 doc_buffer.getvalue(),
                 content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
@@ -338,13 +850,13 @@ class InspectionExportView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class InspectionBatchExportView(APIView):
+class InspectionBatchExportView(AsyncAPIView):
     """批量导出ZIP"""
     permission_classes = [IsAuthenticated]
     
-    def post(self, request):
+    async def post(self, request):
         """
-        批量导出检验记录为ZIP压缩包
+        批量导出检验记录为ZIP压缩包，文档在线程池中渲染
         """
         ids = request.data.get('ids', [])
         if not ids:
@@ -361,8 +873,9 @@ class InspectionBatchExportView(APIView):
                 'data': None
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        records = InspectionRecord.objects.filter(id__in=ids, created_by=request.user)
-        if not records.exists():
+        records = await sync_to_async(InspectionArchiveService.in_bulk)(ids, request.user)
+        records = sorted(records.values(), key=lambda record: record.created_at, reverse=True)
+        if not records:
             return Response({
                 'code': 404,
                 'message': '未找到记录',
@@ -370,7 +883,7 @@ class InspectionBatchExportView(APIView):
             }, status=status.HTTP_404_NOT_FOUND)
         
         try:
-            zip_buffer, filename = WordExportService.export_batch(records)
+            zip_buffer, filename = await WordExportService.aexport_batch(records)
             response = HttpResponse(zip_buffer.getvalue(), content_type='application/zip')
             response['Content-Disposition'] = f'attachment; filename="{filename}"'
             return response
@@ -380,3 +893,63 @@ class InspectionBatchExportView(APIView):
                 'message': f'导出失败: {str(e)}',
                 'data': None
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class InspectionStatisticsView(APIView):
+    """检验统计 - 仅读取每日统计表"""
+    permission_classes = [IsAuthenticated]
+    
+    # 默认统计天数
+    DEFAULT_DAYS = 30
+    
+    def get(self, request):
+        """
+        按日期/类型/检验员统计检验数量
+        超级管理员统计全部记录，其他用户只统计自己的记录
+        """
+        end_date = parse_date(request.query_params.get('end_date', '') or '') or timezone.localdate()
+        start_date = (
+            parse_date(request.query_params.get('start_date', '') or '')
+            or end_date - timedelta(days=self.DEFAULT_DAYS - 1)
+        )
+        if start_date > end_date:
+            return Response({
+                'code': 400,
+                'message': '起始日期不能晚于结束日期',
+                'data': None
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        stats = InspectionDailyStat.objects.filter(date__gte=start_date, date__lte=end_date)
+        if not request.user.is_superuser:
+            stats = stats.filter(inspector=request.user)
+        
+        daily = stats.values('date').annotate(count=Sum('count')).order_by('date')
+        by_vehicle_type = stats.values('vehicle_type').annotate(count=Sum('count')).order_by('-count')
+        by_inspector = (
+            stats.values('inspector_id', 'inspector__username')
+            .annotate(count=Sum('count'))
+            .order_by('-count')
+        )
+        
+        return Response({
+            'code': 200,
+            'message': 'success',
+            'data': {
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+                'total': sum(row['count'] for row in daily),
+                'daily': [
+                    {'date': row['date'].isoformat(), 'count': row['count']}
+                    for row in daily
+                ],
+                'by_vehicle_type': list(by_vehicle_type),
+                'by_inspector': [
+                    {
+                        'inspector_id': row['inspector_id'],
+                        'username': row['inspector__username'],
+                        'count': row['count']
+                    }
+                    for row in by_inspector
+                ]
+            }
+        })
@@ -0,0 +1,68 @@
+"""
+带缓存的Token认证
+- token -> 用户 的解析结果缓存在共享缓存中，避免每个请求查询 Token/User 表
+- 退出登录、删除Token、用户信息变更（禁用、修改角色等）时立即失效
+- 可选的Token有效期：TOKEN_EXPIRE_SECONDS > 0 时生效
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+
+TOKEN_CACHE_KEY = 'auth:token:{digest}'
+
+
+def token_cache_key(key):
+    return TOKEN_CACHE_KEY.format(digest=hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+
+def invalidate_token(key):
+    """清除指定token的缓存"""
+    if key:
+        cache.delete(token_cache_key(key))
+
+
+def invalidate_user_tokens(user_id):
+    """清除用户所有token的缓存"""
+    from rest_framework.authtoken.models import Token
+    for key in Token.objects.filter(user_id=user_id).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """带缓存的Token认证，request.auth 为token字符串"""
+    
+    @staticmethod
+    def _expire_seconds():
+        return getattr(settings, 'TOKEN_EXPIRE_SECONDS', 0)
+    
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            user, expires_at = cached
+            if expires_at is None or timezone.now() < expires_at:
+                return (user, key)
+            cache.delete(cache_key)
+        
+        user, token = super().authenticate_credentials(key)
+        
+        expires_at = None
+        timeout = getattr(settings, 'TOKEN_CACHE_TIMEOUT', 300)
+        expire_seconds = self._expire_seconds()
+        if expire_seconds:
+            expires_at = token.created + timedelta(seconds=expire_seconds)
+            remaining = (expires_at - timezone.now()).total_seconds()
+            if remaining <= 0:
+                token.delete()
+                raise AuthenticationFailed('登录已过期，请重新登录')
+            timeout = min(timeout, int(remaining) + 1)
+        
+        cache.set(cache_key, (user, expires_at), timeout)
+        return (user, key)
+
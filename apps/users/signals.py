@@ -0,0 +1,47 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .models import User
+from .authentication import invalidate_token, invalidate_user_tokens
+
+
+# 影响认证与权限判断的字段，变更后清除该用户的token缓存
+# 注意：QuerySet.update() 不触发信号，批量修改这些字段后需调用 invalidate_user_tokens
+AUTH_FIELDS = ('is_active', 'password', 'role', 'is_superuser', 'is_staff')
+
+
+@receiver(pre_save, sender=User)
+def user_pre_save(sender, instance, update_fields=None, **kwargs):
+    """
+    保存前读取认证相关字段的旧值；update_fields 不涉及这些字段时
+    （如后台登录时更新 last_login）不额外查询
+    """
+    instance._auth_values_before = None
+    if instance._state.adding or not instance.pk:
+        return
+    if update_fields is not None and not set(AUTH_FIELDS).intersection(update_fields):
+        return
+    instance._auth_values_before = (
+        User.objects.filter(pk=instance.pk).values_list(*AUTH_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    """禁用、修改密码/角色/管理员权限后清除其token缓存，其他字段变更不影响缓存"""
+    before = getattr(instance, '_auth_values_before', None)
+    if before is not None and before != tuple(getattr(instance, field) for field in AUTH_FIELDS):
+        invalidate_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    invalidate_user_tokens(instance.pk)
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def token_changed(sender, instance, **kwargs):
+    """token删除（退出登录）后立即失效"""
+    invalidate_token(instance.key)
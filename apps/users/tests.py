@@ -1,3 +1,83 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import update_last_login
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import CachedTokenAuthentication, token_cache_key
+from .models import User
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    """Token认证缓存：命中时不查询数据库，只有影响认证/权限的变更才清除缓存"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='inspector', password='p')
+        self.token = Token.objects.create(user=self.user)
+        self.key = self.token.key
+        self.auth = CachedTokenAuthentication()
+    
+    def authenticate(self):
+        return self.auth.authenticate_credentials(self.key)[0]
+    
+    def is_cached(self):
+        return cache.get(token_cache_key(self.key)) is not None
+    
+    def test_cache_hit_without_queries(self):
+        self.assertEqual(self.authenticate(), self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.authenticate(), self.user)
+        self.assertEqual(len(ctx), 0)
+    
+    def test_unrelated_changes_keep_cache(self):
+        self.authenticate()
+        update_last_login(None, self.user)
+        self.user.first_name = '张三'
+        self.user.save()
+        self.assertTrue(self.is_cached())
+    
+    def test_deactivate_invalidates(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(self.is_cached())
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+    
+    def test_role_and_password_change_invalidate(self):
+        for change in (lambda u: setattr(u, 'role', User.Role.OCR_USER), lambda u: u.set_password('new')):
+            self.authenticate()
+            change(self.user)
+            self.user.save()
+            self.assertFalse(self.is_cached())
+    
+    def test_token_delete_invalidates(self):
+        self.authenticate()
+        self.token.delete()
+        self.assertFalse(self.is_cached())
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+    
+    @override_settings(TOKEN_EXPIRE_SECONDS=3600)
+    def test_token_expiry(self):
+        self.authenticate()
+        # 缓存中的用户同样按过期时间失效
+        later = timezone.now() + timedelta(hours=2)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            with self.assertRaises(AuthenticationFailed):
+                self.authenticate()
+        self.assertFalse(Token.objects.filter(pk=self.key).exists())
+    
+    @override_settings(TOKEN_EXPIRE_SECONDS=3600)
+    def test_expired_token_rejected(self):
+        Token.objects.filter(pk=self.key).update(created=timezone.now() - timedelta(hours=2))
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+        self.assertFalse(self.is_cached())
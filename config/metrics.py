@@ -0,0 +1,439 @@
+"""
+运行指标（Prometheus 文本格式）
+- MetricsMiddleware：按路由统计请求耗时、每个请求的 SQL 次数与耗时、处理中的请求数
+- observe_ocr / observe_export：OCR 调用耗时与错误、Word 导出渲染耗时与文件大小
+- 各 worker 在内存中累计，定期写入 METRICS_DIR/<pid>.json；
+  MetricsView 读取时合并全部 worker，已退出 worker 的计数并入 archive.json，保证计数单调递增
+- 处理中的请求数每次增减都写入 METRICS_DIR/<pid>.inflight（定长，原位覆盖），不受写入间隔影响
+"""
+import atexit
+import contextvars
+import fcntl
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from rest_framework.permissions import BasePermission, IsAuthenticated
+from rest_framework.views import APIView
+
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (10e3, 50e3, 100e3, 500e3, 1e6, 5e6, 20e6, 50e6)
+
+# 指标名 -> (说明, 分桶)
+HISTOGRAMS = {
+    'http_request_duration_seconds': ('请求耗时', DURATION_BUCKETS),
+    'http_request_db_queries': ('每个请求的SQL次数', QUERY_COUNT_BUCKETS),
+    'http_request_db_duration_seconds': ('每个请求的SQL总耗时', DURATION_BUCKETS),
+    'ocr_request_duration_seconds': ('OCR调用耗时', DURATION_BUCKETS),
+    'word_export_render_seconds': ('Word导出渲染耗时', DURATION_BUCKETS),
+    'word_export_output_bytes': ('Word导出文件大小', SIZE_BUCKETS),
+}
+COUNTERS = {
+    'ocr_errors_total': 'OCR调用失败次数',
+    'inspection_list_cache_requests_total': '检验记录列表缓存读取次数（按是否命中）',
+}
+GAUGES = {
+    'http_requests_in_flight': '处理中的请求数（按worker）',
+}
+
+METRIC_PREFIX = 'nongji_'
+
+
+class MetricsRegistry:
+    """单个进程内的指标累计，线程安全"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}  # (指标名, 标签) -> [各分桶计数..., 总和, 次数]
+        self.counters = {}    # (指标名, 标签) -> 值
+        self.in_flight = 0
+        self._in_flight_fd = None
+        self._in_flight_pid = None
+        self._last_flush = 0.0
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, name, value, **labels):
+        buckets = HISTOGRAMS[name][1]
+        key = self._key(name, labels)
+        with self._lock:
+            data = self.histograms.get(key)
+            if data is None:
+                data = self.histograms[key] = [0] * (len(buckets) + 2)
+            index = bisect_left(buckets, value)
+            if index < len(buckets):
+                data[index] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def add_in_flight(self, delta):
+        with self._lock:
+            self.in_flight += delta
+            self._write_in_flight()
+
+    def _write_in_flight(self):
+        """写入本进程的处理中请求数（调用方持有锁）；fork 后的子进程重新打开自己的文件"""
+        pid = os.getpid()
+        if self._in_flight_pid != pid:
+            os.makedirs(settings.METRICS_DIR, exist_ok=True)
+            path = os.path.join(settings.METRICS_DIR, f'{pid}.inflight')
+            self._in_flight_fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+            self._in_flight_pid = pid
+        os.pwrite(self._in_flight_fd, f'{self.in_flight:>10}\n'.encode(), 0)
+
+    def reset(self):
+        """丢弃本进程累计的指标并关闭计数文件（测试结束时调用）"""
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.in_flight = 0
+            if self._in_flight_fd is not None and self._in_flight_pid == os.getpid():
+                os.close(self._in_flight_fd)
+            self._in_flight_fd = None
+            self._in_flight_pid = None
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'histograms': [[name, list(labels), list(data)] for (name, labels), data in self.histograms.items()],
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+            }
+
+    def flush(self, force=False):
+        """写入本进程的指标文件；未到写入间隔时跳过"""
+        if not settings.METRICS_ENABLED:
+            return
+        # 未处理过请求的进程（管理命令等）不写文件
+        if not self.histograms and not self.counters:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = os.path.join(settings.METRICS_DIR, f'{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+
+registry = MetricsRegistry()
+atexit.register(registry.flush, force=True)
+
+
+# ---------- SQL 统计 ----------
+
+_request_stats = contextvars.ContextVar('metrics_request_stats', default=None)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    """数据库 execute_wrapper：累计当前请求的 SQL 次数与耗时（经 contextvar 传入 sync_to_async 线程）"""
+    stats = _request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - start
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_recorder)
+
+
+# ---------- 中间件 ----------
+
+class MetricsMiddleware:
+    """按路由统计请求耗时与SQL，支持同步与异步请求（不影响异步视图）"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        # 启用前已建立的连接（如持久连接）补装统计
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        token, stats, start = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            self.end(token)
+        self.finish(request, response, stats, start)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        token, stats, start = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.end(token)
+        self.finish(request, response, stats, start)
+        return response
+
+    def start(self):
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        registry.add_in_flight(1)
+        return token, stats, time.perf_counter()
+
+    def end(self, token):
+        _request_stats.reset(token)
+        registry.add_in_flight(-1)
+
+    def finish(self, request, response, stats, start):
+        duration = time.perf_counter() - start
+        match = getattr(request, 'resolver_match', None)
+        # 未匹配路由统一归类，避免任意路径产生大量标签
+        route = match.route if match else 'unmatched'
+        registry.observe(
+            'http_request_duration_seconds', duration,
+            route=route, method=request.method, status=f'{response.status_code // 100}xx'
+        )
+        registry.observe('http_request_db_queries', stats.queries, route=route)
+        registry.observe('http_request_db_duration_seconds', stats.db_time, route=route)
+        registry.flush()
+
+
+# ---------- 服务埋点 ----------
+
+def observe_ocr(api):
+    """OCRService 方法装饰器：记录调用耗时与失败次数，同步/异步方法均可"""
+    def decorator(func):
+        if iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    registry.inc('ocr_errors_total', api=api)
+                    raise
+                finally:
+                    registry.observe('ocr_request_duration_seconds', time.perf_counter() - start, api=api)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                registry.inc('ocr_errors_total', api=api)
+                raise
+            finally:
+                registry.observe('ocr_request_duration_seconds', time.perf_counter() - start, api=api)
+        return wrapper
+    return decorator
+
+
+def observe_export(kind):
+    """WordExportService 方法装饰器：记录渲染耗时与输出大小（方法返回 (buffer, filename)）"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            buffer, filename = func(*args, **kwargs)
+            registry.observe('word_export_render_seconds', time.perf_counter() - start, kind=kind)
+            registry.observe('word_export_output_bytes', buffer.getbuffer().nbytes, kind=kind)
+            return buffer, filename
+        return wrapper
+    return decorator
+
+
+# ---------- 汇总与输出 ----------
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge(target, snapshot):
+    histograms = {(name, tuple(map(tuple, labels))): data for name, labels, data in target.get('histograms', [])}
+    for name, labels, data in snapshot.get('histograms', []):
+        key = (name, tuple(map(tuple, labels)))
+        current = histograms.get(key)
+        histograms[key] = [a + b for a, b in zip(current, data)] if current else list(data)
+    counters = {(name, tuple(map(tuple, labels))): value for name, labels, value in target.get('counters', [])}
+    for name, labels, value in snapshot.get('counters', []):
+        key = (name, tuple(map(tuple, labels)))
+        counters[key] = counters.get(key, 0) + value
+    target['histograms'] = [[name, [list(label) for label in labels], data] for (name, labels), data in histograms.items()]
+    target['counters'] = [[name, [list(label) for label in labels], value] for (name, labels), value in counters.items()]
+    return target
+
+
+def _read_in_flight(path):
+    try:
+        with open(path) as f:
+            return int(f.read())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def collect():
+    """合并全部 worker 的指标；已退出 worker 的文件并入 archive.json 后删除"""
+    registry.flush(force=True)
+    directory = settings.METRICS_DIR
+    os.makedirs(directory, exist_ok=True)
+    archive_path = os.path.join(directory, 'archive.json')
+
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive = _read_json(archive_path) or {}
+        archived = False
+        live = []
+        in_flight = {}
+        for entry in os.scandir(directory):
+            name, ext = os.path.splitext(entry.name)
+            if not name.isdigit():
+                continue
+            if ext == '.inflight':
+                if not _pid_alive(int(name)):
+                    os.remove(entry.path)
+                    continue
+                value = _read_in_flight(entry.path)
+                if value is not None:
+                    in_flight[int(name)] = value
+                continue
+            if ext != '.json':
+                continue
+            snapshot = _read_json(entry.path)
+            if snapshot is None:
+                continue
+            if _pid_alive(int(name)):
+                live.append(snapshot)
+            else:
+                _merge(archive, snapshot)
+                os.remove(entry.path)
+                archived = True
+        if archived:
+            tmp_path = f'{archive_path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(archive, f)
+            os.replace(tmp_path, archive_path)
+
+    total = {}
+    _merge(total, archive)
+    for snapshot in live:
+        _merge(total, snapshot)
+    total['in_flight'] = in_flight
+    return total
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def render_prometheus(data):
+    lines = []
+    histograms = {}
+    for name, labels, values in data.get('histograms', []):
+        histograms.setdefault(name, []).append((labels, values))
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        metric = METRIC_PREFIX + name
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} histogram')
+        for labels, values in sorted(histograms.get(name, [])):
+            cumulative = 0
+            for bound, count in zip(buckets, values):
+                cumulative += count
+                lines.append(f'{metric}_bucket{_format_labels(labels + [["le", f"{bound:g}"]])} {cumulative}')
+            lines.append(f'{metric}_bucket{_format_labels(labels + [["le", "+Inf"]])} {values[-1]}')
+            lines.append(f'{metric}_sum{_format_labels(labels)} {values[-2]:.6f}')
+            lines.append(f'{metric}_count{_format_labels(labels)} {values[-1]}')
+
+    counters = {}
+    for name, labels, value in data.get('counters', []):
+        counters.setdefault(name, []).append((labels, value))
+    for name, help_text in COUNTERS.items():
+        metric = METRIC_PREFIX + name
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} counter')
+        for labels, value in sorted(counters.get(name, [])):
+            lines.append(f'{metric}{_format_labels(labels)} {value}')
+
+    metric = METRIC_PREFIX + 'http_requests_in_flight'
+    lines.append(f'# HELP {metric} {GAUGES["http_requests_in_flight"]}')
+    lines.append(f'# TYPE {metric} gauge')
+    for pid, value in sorted(data.get('in_flight', {}).items()):
+        lines.append(f'{metric}{_format_labels([["pid", pid]])} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+class IsSuperUser(BasePermission):
+    message = '仅超级管理员可查看运行指标'
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_superuser)
+
+
+class MetricsView(APIView):
+    """运行指标（Prometheus 文本格式），仅超级管理员可访问（抓取时使用超级管理员的 Token）"""
+    permission_classes = [IsAuthenticated, IsSuperUser]
+
+    def get(self, request):
+        return HttpResponse(
+            render_prometheus(collect()), content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
@@ -0,0 +1,324 @@
+"""
+按请求的性能分析（仅超级管理员，按需开启）
+- 对 /api/v1/ 与 /admin/ 下的请求添加请求头 X-Profile: 1 或查询参数 _profile=1 即可开启
+- 请求在 cProfile 下执行并记录全部 SQL，报告保存在 PROFILING_DIR（<id>.json 与可用 snakeviz 打开的 <id>.prof）
+- 后台 /admin/profiles/ 浏览报告
+- 线程池中执行的代码（如 Word 导出渲染）通过 profiled() 包装后一并采集
+"""
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import FileResponse, Http404
+from django.template.response import TemplateResponse
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = '_profile'
+PROFILED_PREFIXES = ('/api/v1/', '/admin/')
+EXCLUDED_PREFIXES = ('/admin/profiles/',)
+
+# 报告编号以时间（精确到微秒）开头，按编号排序即按时间排序
+REPORT_ID_RE = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9]{6}-[0-9a-f]{4}$')
+NUMBER_RE = re.compile(r'\b\d+\b')
+
+# 报告中保留的 SQL 条数与调用统计行数
+MAX_QUERIES = 1000
+STATS_LINES = 80
+
+_current_session = contextvars.ContextVar('profiling_session', default=None)
+
+
+class ProfileSession:
+    """一次请求的分析数据，可由多个线程写入"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.profiles = []
+        self.queries = []
+        self.query_count = 0
+        self.query_time = 0.0
+
+    def add_profile(self, profiler):
+        with self._lock:
+            self.profiles.append(profiler)
+
+    def add_query(self, sql, params, many, duration):
+        with self._lock:
+            self.query_count += 1
+            self.query_time += duration
+            if len(self.queries) < MAX_QUERIES:
+                self.queries.append({
+                    'sql': sql,
+                    'params': repr(params)[:500],
+                    'many': many,
+                    'time': duration,
+                })
+
+    def stats(self):
+        stats = pstats.Stats(self.profiles[0])
+        for profiler in self.profiles[1:]:
+            stats.add(profiler)
+        return stats
+
+
+def capture_query(execute, sql, params, many, context):
+    """数据库 execute_wrapper：分析中的请求记录每条 SQL"""
+    session = _current_session.get()
+    if session is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        session.add_query(sql, params, many, time.perf_counter() - start)
+
+
+def install_query_capture(connection, **kwargs):
+    if capture_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(capture_query)
+
+
+connection_created.connect(install_query_capture)
+
+
+def profiled(func):
+    """
+    包装提交到线程池的函数：当前请求正在分析时，在执行线程中单独采集并并入报告；
+    未分析时直接调用
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.run(_run_profiled, func, args, kwargs)
+    return run
+
+
+def _run_profiled(func, args, kwargs):
+    session = _current_session.get()
+    if session is None:
+        return func(*args, **kwargs)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.disable()
+        session.add_profile(profiler)
+
+
+# ---------- 中间件 ----------
+
+class ProfilingMiddleware:
+    """超级管理员按需分析单个请求，未开启时只检查请求头/参数"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.requested(request) or not self.allowed(request):
+            return self.get_response(request)
+
+        for connection in connections.all(initialized_only=True):
+            install_query_capture(connection)
+        session = ProfileSession()
+        token = _current_session.set(session)
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            _current_session.reset(token)
+        session.add_profile(profiler)
+        return self.save(request, response, session, time.perf_counter() - start, 'sync')
+
+    async def __acall__(self, request):
+        if not self.requested(request) or not await sync_to_async(self.allowed)(request):
+            return await self.get_response(request)
+
+        session = ProfileSession()
+        token = _current_session.set(session)
+        # 异步请求在事件循环线程中采集（同一时刻的其他协程也会计入），线程池部分由 profiled() 采集
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+            _current_session.reset(token)
+        session.add_profile(profiler)
+        return await sync_to_async(self.save)(request, response, session, time.perf_counter() - start, 'async')
+
+    @staticmethod
+    def requested(request):
+        if not settings.PROFILING_ENABLED:
+            return False
+        if not request.path.startswith(PROFILED_PREFIXES) or request.path.startswith(EXCLUDED_PREFIXES):
+            return False
+        return request.META.get(PROFILE_HEADER) == '1' or request.GET.get(PROFILE_PARAM) == '1'
+
+    @staticmethod
+    def allowed(request):
+        """后台会话或 API Token 对应的用户必须是超级管理员"""
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user.is_superuser
+        from apps.users.authentication import CachedTokenAuthentication
+        try:
+            result = CachedTokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        return bool(result and result[0].is_superuser)
+
+    def save(self, request, response, session, duration, mode):
+        now = timezone.localtime()
+        report_id = f"{now:%Y%m%d-%H%M%S-%f}-{uuid.uuid4().hex[:4]}"
+        directory = settings.PROFILING_DIR
+        os.makedirs(directory, exist_ok=True)
+
+        stats = session.stats()
+        stats.dump_stats(os.path.join(directory, f'{report_id}.prof'))
+        user = getattr(request, 'user', None)
+        report = {
+            'id': report_id,
+            'created_at': now.isoformat(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'user': user.get_username() if user is not None and user.is_authenticated else '',
+            'status': response.status_code,
+            'mode': mode,
+            'duration': duration,
+            'query_count': session.query_count,
+            'query_time': session.query_time,
+            'queries': session.queries,
+            'cumulative': self.format_stats(stats, 'cumulative'),
+            'tottime': self.format_stats(stats, 'tottime'),
+        }
+        path = os.path.join(directory, f'{report_id}.json')
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(report, f, ensure_ascii=False)
+        os.replace(f'{path}.tmp', path)
+        prune_reports()
+
+        response['X-Profile-Report'] = report_id
+        return response
+
+    @staticmethod
+    def format_stats(stats, sort):
+        buffer = io.StringIO()
+        stats.stream = buffer
+        stats.sort_stats(sort).print_stats(STATS_LINES)
+        return buffer.getvalue()
+
+
+# ---------- 报告存储 ----------
+
+def list_reports():
+    """按时间倒序列出报告（不含 SQL 与调用统计）"""
+    try:
+        names = sorted(
+            (name for name in os.listdir(settings.PROFILING_DIR) if name.endswith('.json')),
+            reverse=True
+        )
+    except FileNotFoundError:
+        return []
+    reports = []
+    for name in names:
+        report = load_report(name[:-len('.json')])
+        if report is None:
+            continue
+        for key in ('queries', 'cumulative', 'tottime'):
+            report.pop(key, None)
+        reports.append(report)
+    return reports
+
+
+def load_report(report_id):
+    if not REPORT_ID_RE.match(report_id):
+        return None
+    try:
+        with open(os.path.join(settings.PROFILING_DIR, f'{report_id}.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def prune_reports():
+    """只保留最近 PROFILING_MAX_REPORTS 份报告"""
+    directory = settings.PROFILING_DIR
+    ids = sorted(name[:-len('.json')] for name in os.listdir(directory) if name.endswith('.json'))
+    for report_id in ids[:-settings.PROFILING_MAX_REPORTS]:
+        for ext in ('.json', '.prof'):
+            try:
+                os.remove(os.path.join(directory, report_id + ext))
+            except FileNotFoundError:
+                pass
+
+
+# ---------- 后台页面 ----------
+
+def superuser_view(view):
+    def inner(request, *args, **kwargs):
+        if not request.user.is_superuser:
+            raise PermissionDenied
+        return view(request, *args, **kwargs)
+    return admin.site.admin_view(inner)
+
+
+def report_list_view(request):
+    context = {
+        **admin.site.each_context(request),
+        'title': '性能分析报告',
+        'reports': list_reports(),
+        'enabled': settings.PROFILING_ENABLED,
+    }
+    return TemplateResponse(request, 'admin/profiling/report_list.html', context)
+
+
+def report_detail_view(request, report_id):
+    report = load_report(report_id)
+    if report is None:
+        raise Http404('报告不存在')
+    # 去掉数字后相同的 SQL 归为一类，便于发现 N+1 查询
+    repeated = Counter(NUMBER_RE.sub('?', query['sql']) for query in report['queries'])
+    context = {
+        **admin.site.each_context(request),
+        'title': f"性能分析 {report['method']} {report['path']}",
+        'report': report,
+        'repeated': [(sql, count) for sql, count in repeated.most_common(10) if count > 1],
+    }
+    return TemplateResponse(request, 'admin/profiling/report_detail.html', context)
+
+
+def report_download_view(request, report_id):
+    if not REPORT_ID_RE.match(report_id):
+        raise Http404('报告不存在')
+    path = os.path.join(settings.PROFILING_DIR, f'{report_id}.prof')
+    if not os.path.exists(path):
+        raise Http404('报告不存在')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{report_id}.prof')
@@ -0,0 +1,81 @@
+"""
+DRF 渲染器/解析器
+- FastJSONRenderer：优先使用 orjson，输出紧凑的 UTF-8 JSON（中文不转义）
+- MessagePackRenderer / MessagePackParser：Accept / Content-Type 为 application/msgpack 时使用
+orjson、msgpack 为可选依赖，未安装时 JSON 回退到标准库，MessagePack 不可用
+"""
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    """orjson / msgpack 不支持的类型交给 DRF 的 JSONEncoder 处理（Decimal、惰性翻译字符串等）"""
+    return _encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """高性能JSON渲染器"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        # 带缩进的请求（如可浏览API）保留默认行为
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if orjson is None:
+            return json.dumps(
+                data, cls=self.encoder_class, ensure_ascii=False,
+                separators=(',', ':'), allow_nan=not self.strict,
+            ).encode('utf-8')
+
+        # 日期时间交给 DRF 编码器，保持与默认渲染器一致的格式
+        return orjson.dumps(
+            data, default=_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack渲染器"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    """MessagePack解析器"""
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if msgpack is None:
+            raise ParseError('服务端未启用MessagePack')
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except Exception as e:
+            raise ParseError(f'MessagePack解析失败: {str(e)}')
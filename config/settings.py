@@ -1,6 +1,7 @@
 """
 Django settings for config project.
 """
+import importlib.util
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -29,6 +30,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.metrics.MetricsMiddleware',  # 运行指标，放在最前面以统计完整耗时
     'corsheaders.middleware.CorsMiddleware',  # CORS中间件，必须放在最前面
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -38,6 +40,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'config.profiling.ProfilingMiddleware',  # 按需性能分析，需在认证之后
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -61,13 +64,69 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 # Database
+# 数据库配置档：production 使用下方 SQLITE_PRODUCTION_PROFILE，未设置时 DEBUG=False 即为 production
+DATABASE_PROFILE = os.getenv('DATABASE_PROFILE', 'default' if DEBUG else 'production')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv('SQLITE_PATH', str(BASE_DIR / 'db.sqlite3')),
     }
 }
 
+# production 配置：WAL 等 SQLite 参数与持久连接（benchmark_sqlite 命令也使用该配置做对比）
+SQLITE_PRODUCTION_PROFILE = {
+    'ENGINE': 'config.sqlite',
+    # 持久连接，每个请求开始前检查连接是否可用
+    'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '600')),
+    'CONN_HEALTH_CHECKS': True,
+    'OPTIONS': {
+        # 等待写锁的秒数（sqlite3.connect 的 timeout，即 busy_timeout）
+        'timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000')) / 1000,
+        # 写事务开始即获取写锁，避免事务中途升级写锁失败
+        'transaction_mode': 'IMMEDIATE',
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000')),
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64 * 1024,  # 负数单位为 KiB，即 64MB
+            'temp_store': 'MEMORY',
+        },
+    },
+}
+
+if DATABASE_PROFILE == 'production':
+    DATABASES['default'].update(SQLITE_PRODUCTION_PROFILE)
+
+# Cache - 多个gunicorn worker之间共享，配置REDIS_URL时使用Redis，否则使用文件缓存
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'cache')),
+            'TIMEOUT': 300,
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000,
+            },
+        }
+    }
+
+# 测试使用独立的内存缓存与临时目录（见 config/test_runner.py）
+TEST_RUNNER = 'config.test_runner.IsolatedTestRunner'
+
+# 检验记录列表响应缓存有效期（秒），记录变更时立即失效
+INSPECTION_LIST_CACHE_TIMEOUT = int(os.getenv('INSPECTION_LIST_CACHE_TIMEOUT', '300'))
+
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
 
@@ -90,29 +149,92 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 # Media files
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
+MEDIA_ROOT = Path(os.getenv('MEDIA_ROOT', str(BASE_DIR / 'media')))
+
+# 运行指标：各 worker 定期（秒）写入 METRICS_DIR，/metrics/ 汇总输出
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+METRICS_DIR = os.getenv('METRICS_DIR', str(BASE_DIR / 'metrics'))
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+
+# 按请求性能分析：超级管理员加 X-Profile: 1 或 ?_profile=1 开启，报告在 /admin/profiles/ 查看
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'True').lower() == 'true'
+PROFILING_DIR = os.getenv('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+PROFILING_MAX_REPORTS = int(os.getenv('PROFILING_MAX_REPORTS', '200'))
+
+# Word导出渲染线程池大小（异步导出视图使用）
+EXPORT_MAX_WORKERS = int(os.getenv('EXPORT_MAX_WORKERS', '2'))
+
+# 分片上传：临时文件目录、单片最大字节数、会话过期时间（小时）
+CHUNKED_UPLOAD_DIR = os.getenv('CHUNKED_UPLOAD_DIR', str(BASE_DIR / 'upload_sessions'))
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 1024 * 1024
+CHUNKED_UPLOAD_EXPIRE_HOURS = 24
+
+# 媒体文件交由 nginx 发送的内部路径（如 /protected-media/），为空时由 Django 发送
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '')
+
+# 接口返回的图片签名地址有效期（秒），同一半个有效期内签发的地址相同
+MEDIA_URL_EXPIRE_SECONDS = int(os.getenv('MEDIA_URL_EXPIRE_SECONDS', '3600'))
+
+# 上传图片时生成缩略图/中图（WebP、JPEG）；缺失的衍生图在接口访问时于后台线程补齐
+# （也可用 generate_derivatives 命令批量生成），生成前接口返回原图地址
+IMAGE_DERIVATIVES_ON_UPLOAD = os.getenv('IMAGE_DERIVATIVES_ON_UPLOAD', 'True').lower() == 'true'
+IMAGE_DERIVATIVE_MAX_WORKERS = int(os.getenv('IMAGE_DERIVATIVE_MAX_WORKERS', '1'))
+
+# 图片被替换/记录被删除后，将不再引用的文件加入待删除队列（由 gc_media 命令清理）
+MEDIA_GC_QUEUE_ON_RELEASE = os.getenv('MEDIA_GC_QUEUE_ON_RELEASE', 'False').lower() == 'true'
+# 垃圾回收扫描的媒体目录（相对 MEDIA_ROOT）
+MEDIA_GC_ROOTS = ['inspection']
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'apps.users.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'config.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
 
+# 安装 msgpack 后启用 application/msgpack 内容协商
+MSGPACK_ENABLED = importlib.util.find_spec('msgpack') is not None
+if MSGPACK_ENABLED:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(1, 'config.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append('config.renderers.MessagePackParser')
+
+# 检验记录后台大表模式（缓存总数、统计表驱动的筛选、走索引的搜索）
+INSPECTION_ADMIN_SCALING_MODE = os.getenv('INSPECTION_ADMIN_SCALING_MODE', 'True').lower() == 'true'
+
+# 检验记录归档：创建超过该天数的记录由 archive_inspections 命令移入归档表
+INSPECTION_ARCHIVE_DAYS = int(os.getenv('INSPECTION_ARCHIVE_DAYS', '730'))
+
+# Token认证缓存时间（秒），退出登录/用户变更时立即失效
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', '300'))
+# Token有效期（秒），0 表示永不过期
+TOKEN_EXPIRE_SECONDS = int(os.getenv('TOKEN_EXPIRE_SECONDS', '0'))
+
 # Django Admin 配置
 ADMIN_SITE_HEADER = '农机检测管理系统'
 
 # 阿里云OCR配置
 ALIBABA_CLOUD_ACCESS_KEY_ID = os.getenv('ALIBABA_CLOUD_ACCESS_KEY_ID', '')
 ALIBABA_CLOUD_ACCESS_KEY_SECRET = os.getenv('ALIBABA_CLOUD_ACCESS_KEY_SECRET', '')
+# OCR接口地址，压测时指向本地模拟服务（loadtest 命令自动设置）
+ALIBABA_CLOUD_OCR_ENDPOINT = os.getenv('ALIBABA_CLOUD_OCR_ENDPOINT', 'ocr-api.cn-hangzhou.aliyuncs.com')
+ALIBABA_CLOUD_OCR_PROTOCOL = os.getenv('ALIBABA_CLOUD_OCR_PROTOCOL', 'https')
 
 # CORS配置 - 测试环境允许所有跨域请求
 CORS_ALLOW_ALL_ORIGINS = True
@@ -0,0 +1,30 @@
+"""
+SQLite 生产环境数据库后端
+在 Django 自带 sqlite3 后端的基础上：
+- 新建连接时执行 OPTIONS['pragmas'] 中的 PRAGMA（WAL、busy_timeout、mmap_size 等）
+- OPTIONS['transaction_mode'] 为 IMMEDIATE 时，事务开始即获取写锁，
+  避免多个 worker 在事务中途由读锁升级为写锁时直接报 database is locked
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # 以下为本后端自用的选项，不传给 sqlite3.connect
+        self.pragmas = kwargs.pop('pragmas', {})
+        self.transaction_mode = kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,40 @@
+"""
+测试运行器
+- 缓存改用进程内的 LocMemCache：测试中的 cache.clear() 不会清空部署环境的文件缓存 / Redis（Token、列表缓存）
+- 媒体、分片上传、运行指标与性能分析报告写入临时目录，测试结束后删除
+"""
+import os
+import shutil
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from config.metrics import registry
+
+
+class IsolatedTestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._tmpdir = tempfile.mkdtemp(prefix='nongji-test-')
+        self._override = override_settings(
+            CACHES={
+                'default': {
+                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                    'LOCATION': 'nongji-test',
+                }
+            },
+            MEDIA_ROOT=os.path.join(self._tmpdir, 'media'),
+            CHUNKED_UPLOAD_DIR=os.path.join(self._tmpdir, 'upload_sessions'),
+            METRICS_DIR=os.path.join(self._tmpdir, 'metrics'),
+            PROFILING_DIR=os.path.join(self._tmpdir, 'profiles'),
+        )
+        self._override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        # 丢弃测试中累计的指标，进程退出时不再写入部署环境的 METRICS_DIR
+        registry.reset()
+        self._override.disable()
+        shutil.rmtree(self._tmpdir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
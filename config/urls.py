@@ -1,13 +1,24 @@
 from django.contrib import admin
 from django.urls import path, include
-from django.conf import settings
-from django.conf.urls.static import static
+
+from apps.inspection.media import MediaFileView
+from config.metrics import MetricsView
+from config.profiling import (
+    report_detail_view, report_download_view, report_list_view, superuser_view
+)
 
 urlpatterns = [
+    # 性能分析报告（需放在 admin/ 之前），仅超级管理员
+    path('admin/profiles/', superuser_view(report_list_view), name='profiling-report-list'),
+    path('admin/profiles/<str:report_id>/', superuser_view(report_detail_view),
+         name='profiling-report-detail'),
+    path('admin/profiles/<str:report_id>/download/', superuser_view(report_download_view),
+         name='profiling-report-download'),
     path('admin/', admin.site.urls),
     path('api/v1/', include('apps.users.urls')),
     path('api/v1/', include('apps.inspection.urls')),
+    # 媒体文件需校验权限，不再直接公开 MEDIA_ROOT
+    path('media/<path:name>', MediaFileView.as_view(), name='media-file'),
+    # 运行指标（Prometheus），仅超级管理员
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
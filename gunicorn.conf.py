@@ -0,0 +1,118 @@
+"""
+Gunicorn 配置（03-deploy.sh 通过 -c gunicorn.conf.py 加载）
+- 默认 gthread worker：OCR 等待阿里云响应时只占用一个线程，不占满整个 worker
+- preload_app：主进程预先加载 Django、docxtpl、Pillow、阿里云 SDK，worker 通过 fork 写时复制共享内存
+- max_requests + jitter：worker 处理一定请求数后错开重启，释放内存碎片
+- 平滑重载：HUP 仅重启 worker（preload 模式下不会加载新代码）；
+  部署新代码使用 USR2 启动新主进程，新主进程就绪后向旧主进程发送 TERM（见 03-deploy.sh reload）
+
+所有参数均可通过环境变量覆盖，命令行参数优先于本文件
+"""
+import gc
+import importlib
+import multiprocessing
+import os
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+CPU_COUNT = multiprocessing.cpu_count()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8062')
+
+# worker 模型：gthread（默认）、sync，或 ASGI 模式的 uvicorn.workers.UvicornWorker
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+# SQLite 只有一个写入者，worker 过多只会增加锁等待，上限 8 个
+workers = _env_int('GUNICORN_WORKERS', min(CPU_COUNT * 2 + 1, 8))
+# gthread 每个 worker 的线程数，OCR 等 I/O 密集请求在线程间并发
+threads = _env_int('GUNICORN_THREADS', 4) if worker_class == 'gthread' else 1
+
+timeout = _env_int('GUNICORN_TIMEOUT', 120)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+# 处理 max_requests 个请求后重启 worker，jitter 使各 worker 错开重启
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True').lower() == 'true'
+
+# 主进程中预先导入的模块（函数内延迟导入的模块也在 fork 前加载，worker 共享）
+PRELOAD_MODULES = [
+    'docxtpl',
+    'docx',
+    'PIL.Image',
+    'alibabacloud_ocr_api20210707.client',
+    'alibabacloud_tea_openapi.models',
+    'alibabacloud_tea_util.models',
+]
+
+
+def when_ready(server):
+    """主进程就绪、fork worker 之前：预热路由与重量级依赖，冻结已有对象"""
+    if not preload_app:
+        return
+    from django.urls import get_resolver
+
+    # 导入全部 URLconf（连带各视图模块）
+    get_resolver().url_patterns
+    for module in PRELOAD_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            server.log.warning('预加载模块失败: %s', module)
+    # 已加载的对象移出垃圾回收跟踪，避免 worker 中的 GC 写入引用计数页面破坏写时复制
+    gc.freeze()
+    server.log.info('预加载完成，worker 共享 %d 个对象', gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    """worker 启动：关闭从主进程继承的数据库/缓存连接，由各 worker 重新建立"""
+    from django.core.cache import caches
+    from django.db import connections
+
+    connections.close_all()
+    for cache in caches.all(initialized_only=True):
+        cache.close()
+    server.log.info('worker 启动 (pid: %s)', worker.pid)
+
+
+def worker_int(worker):
+    """worker 收到 INT/QUIT（快速关闭）时记录日志"""
+    worker.log.info('worker 被中断 (pid: %s)', worker.pid)
+
+
+def worker_abort(worker):
+    """worker 超时被主进程终止（SIGABRT），记录当前请求堆栈便于排查慢请求"""
+    import sys
+    import threading
+    import traceback
+
+    frames = sys._current_frames()
+    for thread in threading.enumerate():
+        frame = frames.get(thread.ident)
+        if frame is not None:
+            worker.log.error(
+                'worker 超时 (pid: %s) 线程 %s:\n%s',
+                worker.pid, thread.name, ''.join(traceback.format_stack(frame))
+            )
+
+
+def worker_exit(server, worker):
+    """worker 退出（max_requests 到达、重载或关闭）时关闭数据库连接并写出运行指标"""
+    from django.db import connections
+    from config.metrics import registry
+
+    connections.close_all()
+    registry.flush(force=True)
+
+
+def on_reload(server):
+    server.log.info('收到 HUP，重启全部 worker')
+
+
+def pre_exec(server):
+    server.log.info('收到 USR2，启动新主进程加载新代码')